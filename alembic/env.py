@@ -15,7 +15,7 @@ sys.path.insert(0, os.path.join(PROJECT_ROOT, "backend"))
 # ── Import your Base where models are defined ─────────────────────────
 # Adjust this import if you have a different module path.
 from db import Base  
-import backend.models
+import models  # registers every table on Base.metadata
 # ── Tell Alembic to autogenerate against your metadata ───────────────
 target_metadata = Base.metadata
 
@@ -23,6 +23,9 @@ target_metadata = Base.metadata
 config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
+# DATABASE_URL (as used by the app) wins over the ini file's sqlalchemy.url
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
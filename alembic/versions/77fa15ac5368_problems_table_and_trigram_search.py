@@ -0,0 +1,84 @@
+"""problems table, concepts.problem_id and trigram search index
+
+Revision ID: 77fa15ac5368
+Revises: a787de9dad42
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+import hashlib
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77fa15ac5368'
+down_revision: Union[str, Sequence[str], None] = 'a787de9dad42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _content_hash(text: str) -> str:
+    # frozen copy of embedding.content_hash -- migrations must not import app code
+    return hashlib.sha256(_WS_RE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    is_pg = bind.dialect.name == "postgresql"
+
+    problems = op.create_table(
+        "problems",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("content_hash", sa.String(length=64), nullable=False, unique=True),
+        sa.Column("problem_statement", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_problems_id", "problems", ["id"])
+
+    with op.batch_alter_table("concepts") as batch:
+        batch.add_column(sa.Column("problem_id", sa.Integer(), nullable=True))
+        batch.create_foreign_key("fk_concepts_problem_id", "problems", ["problem_id"], ["id"])
+    op.create_index("ix_concepts_problem_id", "concepts", ["problem_id"])
+
+    # ── Backfill: one problems row per normalized statement ───────────────
+    statements = [s for (s,) in bind.execute(sa.text("SELECT DISTINCT problem_statement FROM concepts"))]
+    by_hash: dict[str, str] = {}
+    for stmt in statements:
+        by_hash.setdefault(_content_hash(stmt), stmt)
+    if by_hash:
+        op.bulk_insert(problems, [{"content_hash": h, "problem_statement": s} for h, s in by_hash.items()])
+    ids = dict(bind.execute(sa.text("SELECT content_hash, id FROM problems")).all())
+    if statements:
+        bind.execute(
+            sa.text("UPDATE concepts SET problem_id = :pid WHERE problem_statement = :stmt"),
+            [{"pid": ids[_content_hash(s)], "stmt": s} for s in statements],
+        )
+
+    # ── Substring search: trigram GIN (Postgres only) ─────────────────────
+    if is_pg:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_problems_problem_statement_trgm",
+            "problems",
+            ["problem_statement"],
+            postgresql_using="gin",
+            postgresql_ops={"problem_statement": "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_problems_problem_statement_trgm", table_name="problems")
+    op.drop_index("ix_concepts_problem_id", table_name="concepts")
+    with op.batch_alter_table("concepts") as batch:
+        batch.drop_constraint("fk_concepts_problem_id", type_="foreignkey")
+        batch.drop_column("problem_id")
+    op.drop_index("ix_problems_id", table_name="problems")
+    op.drop_table("problems")
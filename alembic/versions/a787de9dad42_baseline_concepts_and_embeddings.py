@@ -0,0 +1,88 @@
+"""baseline: concepts and problem_embeddings
+
+Databases created before migrations existed already have these tables
+(main.py used to call create_all); on those this revision only adds what
+is missing, so `alembic upgrade head` works on both fresh and old DBs.
+
+Revision ID: a787de9dad42
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a787de9dad42'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    insp = sa.inspect(op.get_bind())
+    tables = set(insp.get_table_names())
+
+    if "concepts" not in tables:
+        op.create_table(
+            "concepts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("problem_statement", sa.Text(), nullable=False),
+            sa.Column("agent", sa.String(length=100), nullable=True),
+            sa.Column("title", sa.String(length=255), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("novelty_reasoning", sa.Text(), nullable=True),
+            sa.Column("feasibility_reasoning", sa.Text(), nullable=True),
+            sa.Column("cost_estimate", sa.Text(), nullable=True),
+            sa.Column("industry", sa.String(), nullable=True),
+            sa.Column("original_solution", sa.Text(), nullable=True),
+            sa.Column("adaptation_challenges", sa.Text(), nullable=True),
+            sa.Column("trl", sa.Float(), nullable=True),
+            sa.Column("trl_reasoning", sa.Text(), nullable=True),
+            sa.Column("trl_citations", sa.JSON(), nullable=True),
+            sa.Column("validated_trl", sa.Float(), nullable=True),
+            sa.Column("validated_trl_reasoning", sa.Text(), nullable=True),
+            sa.Column("validated_trl_citations", sa.JSON(), nullable=True),
+            sa.Column("components", sa.JSON(), nullable=True),
+            sa.Column("references", sa.JSON(), nullable=True),
+            sa.Column("constructive_critique", sa.Text(), nullable=True),
+            sa.Column("proposal_url", sa.String(length=512), nullable=True),
+            sa.Column("generated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_concepts_id", "concepts", ["id"])
+
+    concept_indexes = {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("concepts")}
+    if "ix_concepts_problem_statement_hash" not in concept_indexes:
+        op.create_index(
+            "ix_concepts_problem_statement_hash",
+            "concepts",
+            ["problem_statement"],
+            postgresql_using="hash",
+        )
+
+    if "problem_embeddings" not in tables:
+        op.create_table(
+            "problem_embeddings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("content_hash", sa.String(length=64), nullable=False),
+            sa.Column("problem_statement", sa.Text(), nullable=False),
+            sa.Column("model", sa.String(length=100), nullable=False),
+            sa.Column("dim", sa.Integer(), nullable=False),
+            sa.Column("vector", sa.LargeBinary(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("content_hash", "model", name="uq_problem_embeddings_hash_model"),
+        )
+        op.create_index("ix_problem_embeddings_id", "problem_embeddings", ["id"])
+        op.create_index("ix_problem_embeddings_content_hash", "problem_embeddings", ["content_hash"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_problem_embeddings_content_hash", table_name="problem_embeddings")
+    op.drop_index("ix_problem_embeddings_id", table_name="problem_embeddings")
+    op.drop_table("problem_embeddings")
+    op.drop_index("ix_concepts_problem_statement_hash", table_name="concepts")
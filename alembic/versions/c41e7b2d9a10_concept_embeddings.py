@@ -0,0 +1,43 @@
+"""concept_embeddings table for semantic concept search
+
+Revision ID: c41e7b2d9a10
+Revises: 77fa15ac5368
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7b2d9a10'
+down_revision: Union[str, Sequence[str], None] = '77fa15ac5368'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # vectors for existing concepts come from `python backfill_embeddings.py`
+    op.create_table(
+        "concept_embeddings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("concept_id", sa.Integer(), sa.ForeignKey("concepts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("dim", sa.Integer(), nullable=False),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("concept_id", "model", name="uq_concept_embeddings_concept_model"),
+    )
+    op.create_index("ix_concept_embeddings_id", "concept_embeddings", ["id"])
+    op.create_index("ix_concept_embeddings_concept_id", "concept_embeddings", ["concept_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_concept_embeddings_concept_id", table_name="concept_embeddings")
+    op.drop_index("ix_concept_embeddings_id", table_name="concept_embeddings")
+    op.drop_table("concept_embeddings")
@@ -0,0 +1,52 @@
+"""indexes for server-side concept filters and aggregates
+
+Revision ID: e8a1f4c3b927
+Revises: 5b9d03e6f2c7
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a1f4c3b927'
+down_revision: Union[str, Sequence[str], None] = '5b9d03e6f2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (problem_id, generated_at, id) serves the per-problem listing's
+    # filter and ORDER BY together and makes the single-column index redundant
+    op.create_index("ix_concepts_problem_id_generated_at", "concepts", ["problem_id", "generated_at", "id"])
+    op.drop_index("ix_concepts_problem_id", table_name="concepts")
+    op.create_index("ix_concepts_agent_generated_at", "concepts", ["agent", "generated_at", "id"])
+    op.create_index("ix_concepts_generated_at_id", "concepts", ["generated_at", "id"])
+    # expression indexes: the queries must use the same expressions
+    # (crud.EFFECTIVE_TRL, lower(industry), CAST(components AS JSONB))
+    op.create_index("ix_concepts_effective_trl", "concepts", [sa.text("coalesce(validated_trl, trl)")])
+    op.create_index("ix_concepts_industry_lower", "concepts", [sa.text("lower(industry)")])
+    if op.get_bind().dialect.name == "postgresql":
+        # jsonb_path_ops: smaller than the default opclass, supports only @>
+        op.create_index(
+            "ix_concepts_components_gin",
+            "concepts",
+            [sa.text("(components::jsonb) jsonb_path_ops")],
+            postgresql_using="gin",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_concepts_components_gin", table_name="concepts")
+    op.drop_index("ix_concepts_industry_lower", table_name="concepts")
+    op.drop_index("ix_concepts_effective_trl", table_name="concepts")
+    op.drop_index("ix_concepts_generated_at_id", table_name="concepts")
+    op.drop_index("ix_concepts_agent_generated_at", table_name="concepts")
+    op.create_index("ix_concepts_problem_id", "concepts", ["problem_id"])
+    op.drop_index("ix_concepts_problem_id_generated_at", table_name="concepts")
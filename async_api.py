@@ -0,0 +1,264 @@
+# async_api.py
+"""`async def` versions of the I/O-bound routes, used when ASYNC_IO is set.
+
+ORM work runs on an AsyncSession via `run_sync`, reusing the sync crud
+helpers without holding a threadpool thread.  Embedding and blob calls
+use the asyncio Azure clients, so a single worker can keep hundreds of
+slow requests in flight.
+"""
+from typing import List, Optional
+import logging
+import uuid
+
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import embedding_queue
+from db import get_async_db, get_async_read_db, settings
+from embedding import aembed_text, aembed_texts, normalize_text
+from schemas import (
+    ConceptBatchLookup,
+    ConceptCreate,
+    ConceptFilters,
+    ConceptRead,
+    ConceptSearchHit,
+    ConceptStats,
+    ConceptView,
+    ProblemConcepts,
+    ProblemOut,
+    SimilarConcepts,
+    concept_filters,
+    concept_rows_for_workflow,
+)
+from pagination import MAX_PAGE_SIZE, decode_cursor
+import listing
+import streaming
+import timing
+from timing import span
+from similarity_index import DEFAULT_MIN_SIMILARITY
+from storage import get_async_container_client, blob_name_from_url
+from http_ranges import plan_download
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotFoundError
+
+router = APIRouter(route_class=timing.TimedRoute)
+logger = logging.getLogger("uvicorn.error")
+
+UPLOAD_CHUNK = 4 * 1024 * 1024
+
+
+async def _embed_new_problem(db: AsyncSession, problem_statement: str) -> None:
+    # mirrors crud._embed_new_problem, but awaits Azure OpenAI
+    try:
+        if await db.run_sync(crud.get_problem_embedding, problem_statement):
+            return
+        vec = await aembed_text(normalize_text(problem_statement))
+        await db.run_sync(crud.store_problem_embedding, problem_statement, vec)
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Could not embed problem statement, left for backfill: {e}")
+
+
+async def _embed_new_concepts(db: AsyncSession, items: list[tuple[int, str]]) -> None:
+    # mirrors crud._embed_new_concepts; `items` are taken before any
+    # rollback can expire the concepts
+    try:
+        vectors = await aembed_texts([text for _, text in items])
+        await db.run_sync(crud.store_concept_embeddings, items, vectors)
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Could not embed {len(items)} concept(s), left for backfill: {e}")
+
+
+@router.get("/concepts", response_model=List[ConceptRead])
+async def read_concepts(
+    request: Request,
+    response: Response,
+    filters: ConceptFilters = Depends(concept_filters),
+    problem_statement: Optional[str] = Query(None, description="Substring of the problem statement; omit for every problem"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all rows"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    view: ConceptView = Query("full", description="'summary' skips the large text/JSON columns"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if streaming.wants_ndjson(request):
+        return streaming.concepts_stream(problem_statement, limit, cursor, view, use_async=True, filters=filters)
+    return await db.run_sync(
+        listing.concepts_page, request, response, problem_statement, limit, cursor, view, filters
+    )
+
+
+@router.get("/concepts/stats", response_model=ConceptStats)
+async def concept_stats_endpoint(
+    filters: ConceptFilters = Depends(concept_filters),
+    problem_statement: Optional[str] = Query(None, description="Substring of the problem statement; omit for every problem"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(crud.concept_stats, filters, problem_statement)
+
+
+@router.post("/concepts", response_model=List[ConceptRead])
+async def create_concepts_endpoint(
+    *,
+    workflow: str = Query("traditional", description="Ideation workflow: 'cross-industry' for cross-industry, else traditional"),
+    bulk: bool = Query(False, description="Insert the whole batch in one all-or-nothing transaction"),
+    concepts: List[ConceptCreate] = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not concepts:
+        return []
+    if embedding_queue.overloaded():
+        raise HTTPException(503, "Embedding backlog is full; retry later", headers={"Retry-After": "30"})
+    problem = concepts[0].problem_statement
+    new_data = concept_rows_for_workflow(concepts, workflow)
+
+    if bulk:
+        try:
+            created = await db.run_sync(crud.bulk_create_concepts, problem, new_data, False)
+        except crud.ConceptValidationError as e:
+            raise HTTPException(422, e.errors)
+    else:
+        created = await db.run_sync(crud.create_concepts, problem, new_data, False)
+    if settings.EMBED_WRITE_MODE == "background":
+        # the jobs were committed with the concepts and already queued
+        return created
+    items = crud.concept_embedding_items(created)
+    await _embed_new_problem(db, problem)
+    await _embed_new_concepts(db, items)
+    return created
+
+
+@router.post("/concepts/batch-lookup", response_model=List[ProblemConcepts])
+async def batch_lookup_concepts(
+    req: ConceptBatchLookup,
+    view: ConceptView = Query("full", description="'summary' skips the large text/JSON columns"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(listing.batch_lookup, req.problem_statements, view)
+
+
+@router.get("/problems", response_model=List[ProblemOut])
+async def list_problems(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all rows"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return await db.run_sync(listing.problems_page, request, response, limit, cursor)
+
+
+@router.get("/concepts/similar", response_model=List[SimilarConcepts])
+async def get_similar_concepts_endpoint(
+    request: Request,
+    response: Response,
+    problem_statement: str,
+    top_k: int = 50,
+    min_similarity: float = Query(DEFAULT_MIN_SIMILARITY, ge=-1.0, le=1.0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Problem groups per page; omit for all"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    view: ConceptView = Query("full", description="'summary' skips the large text/JSON columns"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        q_emb = await aembed_text(normalize_text(problem_statement))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if streaming.wants_ndjson(request):
+        after = decode_cursor(cursor, float, str) if cursor else None
+        ranked = await db.run_sync(
+            crud.rank_similar_statements, q_emb, top_k, min_similarity, limit, after
+        )
+        return streaming.similar_stream(ranked, view, use_async=True)
+    return await db.run_sync(
+        listing.similar_page, request, response, q_emb, top_k, min_similarity, limit, cursor, view
+    )
+
+
+@router.get("/concepts/search", response_model=List[ConceptSearchHit])
+async def search_concepts_endpoint(
+    q: str = Query(..., min_length=1, description="Free text matched against concept titles and descriptions"),
+    agent: Optional[List[str]] = Query(None, description="Only concepts from these agents"),
+    industry: Optional[List[str]] = Query(None, description="Only these industries (case-insensitive)"),
+    trl_min: Optional[float] = Query(None, ge=0, le=9),
+    trl_max: Optional[float] = Query(None, ge=0, le=9),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    min_score: float = Query(-1.0, ge=-1.0, le=1.0),
+    nprobe: Optional[int] = Query(None, ge=1, description="Index clusters scanned; higher is slower but finds more"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if trl_min is not None and trl_max is not None and trl_min > trl_max:
+        raise HTTPException(400, "trl_min must not exceed trl_max")
+    try:
+        q_emb = await aembed_text(normalize_text(q))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    hits = await db.run_sync(
+        crud.search_concepts, q_emb, limit, agent, industry, trl_min, trl_max, min_score, nprobe
+    )
+    return [{"score": score, "concept": concept} for concept, score in hits]
+
+
+@router.post("/concepts/{concept_id}/proposal", response_model=ConceptRead)
+async def upload_proposal(
+    concept_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    container=Depends(get_async_container_client),
+):
+    blob_name = f"{concept_id}/{uuid.uuid4()}-{file.filename}"
+
+    async def chunks():
+        while data := await file.read(UPLOAD_CHUNK):
+            yield data
+
+    try:
+        with span("blob"):
+            await container.upload_blob(
+                name=blob_name,
+                data=chunks(),
+                overwrite=True,
+                max_concurrency=settings.UPLOAD_MAX_CONCURRENCY,
+                timeout=300,
+            )
+    except Exception as e:
+        raise HTTPException(500, f"Blob upload failed: {e}")
+    url = container.get_blob_client(blob_name).url
+    updated = await db.run_sync(crud.update_concept, concept_id, {"proposal_url": url})
+    if not updated:
+        raise HTTPException(404, f"Concept {concept_id} not found")
+    return updated
+
+
+@router.get("/concepts/{concept_id}/download")
+async def download_proposal(
+    concept_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    container=Depends(get_async_container_client),
+):
+    concept = await db.run_sync(crud.get_concept, concept_id)
+    if not concept or not concept.proposal_url:
+        raise HTTPException(404, "Not found or no proposal attached")
+    try:
+        blob_name = blob_name_from_url(container, concept.proposal_url)
+        with span("blob"):
+            props = await container.get_blob_client(blob_name).get_blob_properties()
+    except (ValueError, ResourceNotFoundError):
+        raise HTTPException(404, "Proposal file not found in storage")
+    except Exception as e:
+        raise HTTPException(500, f"Blob download failed: {e}")
+    status, headers, offset, length = plan_download(request, blob_name, props)
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    try:
+        with span("blob"):
+            stream = await container.download_blob(
+                blob_name, offset=offset, length=length,
+                etag=props.etag, match_condition=MatchConditions.IfNotModified,
+            )
+        return StreamingResponse(stream.chunks(), status_code=status, headers=headers)
+    except Exception as e:
+        raise HTTPException(500, f"Blob download failed: {e}")
@@ -0,0 +1,38 @@
+# backfill_embeddings.py
+"""Embed every stored problem statement and concept that has no persisted
+vector yet, run any write-behind embedding jobs still outstanding
+(including those out of retries), then re-train and save the concept
+search index.
+
+Run after `alembic upgrade head` has created the `problem_embeddings` /
+`concept_embeddings` tables, or whenever EMBED_MODEL changes:
+
+    python backfill_embeddings.py
+"""
+import sys
+
+from db import engine, SessionLocal, check_schema
+import crud
+import concept_index
+import embedding_queue
+
+if __name__ == "__main__":
+    if not check_schema(engine):
+        sys.exit("Run `alembic upgrade head` before backfilling.")
+    db = SessionLocal()
+    try:
+        print("Running outstanding embedding jobs...")
+        n = embedding_queue.get_queue().drain(include_parked=True)
+        print(f"Completed {n} job(s).")
+        print("Backfilling problem embeddings...")
+        n = crud.backfill_problem_embeddings(db)
+        print(f"Embedded {n} problem statement(s).")
+        print("Backfilling concept embeddings...")
+        n = crud.backfill_concept_embeddings(db)
+        print(f"Embedded {n} concept(s).")
+        index = concept_index.get_index(db)
+        index.train()
+        path = index.save()
+        print(f"Concept index: {len(index)} vectors in {index.nlist} lists" + (f", saved to {path}" if path else ""))
+    finally:
+        db.close()
@@ -0,0 +1,461 @@
+# bench.py
+"""Offline benchmark of the API's hot endpoints.
+
+Runs the real FastAPI app in-process (httpx over ASGI, no network) against
+a throwaway database, with the Azure dependencies swapped for fakes:
+
+* embeddings come from a deterministic bag-of-words fake with a
+  configurable per-call latency, so similar statements really are
+  similar and /concepts/similar returns matches;
+* proposals live in an in-memory blob container.
+
+For every data size it seeds N problems (and N * --concepts-per-problem
+concepts with stored problem embeddings), then measures throughput and
+p50/p95/p99 latency for each scenario.  Results are written as JSON so
+runs can be diffed release to release:
+
+    python bench.py --sizes 100,1000,10000 --requests 300 --concurrency 8
+    python bench.py --database-url postgresql://localhost/bench_db --async-io
+
+To compare the FAST_JSON serializer with the default path on large
+result sets, run the same sizes twice and diff the two files:
+
+    python bench.py --sizes 1000 --scenarios concepts_large,batch_lookup --output default.json
+    python bench.py --sizes 1000 --scenarios concepts_large,batch_lookup --fast-json --output fast.json
+
+The database is dropped and recreated for every size, so this script
+never reads DATABASE_URL from the environment; pass --database-url to
+point it at a disposable Postgres.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timezone
+
+import numpy as np
+
+SCENARIOS = (
+    "problems",
+    "concepts",
+    "concepts_summary",
+    "concepts_large",
+    "batch_lookup",
+    "similar",
+    "bulk_post",
+    "proposal_upload",
+    "proposal_download",
+)
+VOCABULARY = [f"term{i}" for i in range(400)]
+TERMS_PER_STATEMENT = 12
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--sizes", default="100,1000", help="comma-separated problem counts to seed")
+    p.add_argument("--concepts-per-problem", type=int, default=5)
+    p.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    p.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    p.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    p.add_argument("--embed-latency-ms", type=float, default=20.0, help="fake Azure OpenAI latency per call")
+    p.add_argument("--embed-dim", type=int, default=3072, help="fake embedding width")
+    p.add_argument("--bulk-size", type=int, default=20, help="concepts per bulk POST")
+    p.add_argument("--blob-kb", type=int, default=512, help="proposal size for upload/download")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS))
+    p.add_argument("--database-url", default=None, help="disposable DB (default: a temp SQLite file)")
+    p.add_argument("--async-io", action="store_true", help="benchmark the ASYNC_IO routes")
+    p.add_argument("--response-cache", action="store_true", help="leave the response cache on")
+    p.add_argument("--fast-json", action="store_true", help="serve full-view listings through fast_json")
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--output", default="bench_output.json", help="JSON results file ('-' for stdout)")
+    return p.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the app at the bench database and fakes *before* it is imported."""
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ["ASYNC_IO"] = "true" if args.async_io else "false"
+    os.environ["RESPONSE_CACHE"] = "memory" if args.response_cache else "off"
+    os.environ["FAST_JSON"] = "true" if args.fast_json else "false"
+    os.environ["TIMING_LOG_MIN_MS"] = "1e9"
+    os.environ["PROFILER"] = "off"
+    os.environ["CONCEPT_INDEX_PATH"] = ""
+    os.environ.setdefault("AZURE_STORAGE_CONNECTION_STRING", "UseDevelopmentStorage=true")
+    for key in ("AZURE_ENDPOINT", "PRODUCTS_ENDPOINT"):
+        os.environ.setdefault(key, "https://bench.invalid")
+    for key in ("AZURE_OPENAI_KEY", "PRODUCTS_OPENAI_KEY", "SERP_API_KEY"):
+        os.environ.setdefault(key, "bench")
+
+
+# ─── Fakes ─────────────────────────────────────────────────────────────────────
+class FakeEmbeddings:
+    """Bag-of-words vectors: statements sharing terms have high cosine similarity."""
+
+    def __init__(self, dim: int, latency: float):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    @functools.lru_cache(maxsize=None)
+    def _term(self, term: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(term.encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def vector(self, text: str) -> list[float]:
+        v = sum(self._term(t) for t in text.lower().split())
+        return (v / (np.linalg.norm(v) or 1.0)).tolist()
+
+    def _response(self, input):
+        self.calls += 1
+        items = input if isinstance(input, list) else [input]
+        data = [types.SimpleNamespace(embedding=self.vector(t), index=i) for i, t in enumerate(items)]
+        return types.SimpleNamespace(data=data)
+
+    def create(self, model, input):
+        time.sleep(self.latency)
+        return self._response(input)
+
+
+class AsyncFakeEmbeddings(FakeEmbeddings):
+    async def create(self, model, input):
+        await asyncio.sleep(self.latency)
+        return self._response(input)
+
+
+class _Blob:
+    def __init__(self, data: bytes, content_type: str = "application/octet-stream"):
+        self.data = data
+        self.etag = '"0x' + hashlib.md5(data).hexdigest()[:16].upper() + '"'
+        self.last_modified = datetime.now(timezone.utc)
+        self.content_type = content_type
+
+
+class FakeBlobClient:
+    def __init__(self, container: "FakeContainer", name: str):
+        self.container = container
+        self.name = name
+        self.url = f"https://{container.account_name}.blob.core.windows.net/{container.container_name}/{name}"
+
+    def get_blob_properties(self):
+        blob = self.container.blobs[self.name]
+        return types.SimpleNamespace(
+            size=len(blob.data), etag=blob.etag, last_modified=blob.last_modified,
+            content_settings=types.SimpleNamespace(content_type=blob.content_type),
+        )
+
+    def exists(self) -> bool:
+        return self.name in self.container.blobs
+
+    def stage_block(self, block_id, data, length=None, **kwargs):
+        self.container.blocks.setdefault(self.name, {})[block_id] = bytes(data)
+
+    def get_block_list(self, kind="committed"):
+        staged = self.container.blocks.get(self.name, {})
+        return [], [types.SimpleNamespace(id=k, size=len(v)) for k, v in staged.items()]
+
+    def commit_block_list(self, blocks, content_settings=None, **kwargs):
+        staged = self.container.blocks.pop(self.name)
+        content_type = getattr(content_settings, "content_type", None) or "application/octet-stream"
+        self.container.blobs[self.name] = _Blob(b"".join(staged[b.id] for b in blocks), content_type)
+
+
+class _Download:
+    def __init__(self, data: bytes, chunk: int = 4 * 1024 * 1024):
+        self.data, self.chunk = data, chunk
+
+    def chunks(self):
+        for i in range(0, len(self.data), self.chunk):
+            yield self.data[i:i + self.chunk]
+
+
+class FakeContainer:
+    """The subset of azure.storage.blob.ContainerClient the API uses, in memory."""
+
+    container_name = "bench"
+    account_name = "benchaccount"
+    credential = None
+
+    def __init__(self):
+        self.blobs: dict[str, _Blob] = {}
+        self.blocks: dict[str, dict[str, bytes]] = {}
+
+    def get_blob_client(self, name: str) -> FakeBlobClient:
+        return FakeBlobClient(self, name)
+
+    def upload_blob(self, name, data, overwrite=False, **kwargs):
+        raw = data.read() if hasattr(data, "read") else bytes(data)
+        self.blobs[name] = _Blob(raw)
+
+    def download_blob(self, name, offset=None, length=None, **kwargs):
+        data = self.blobs[name].data
+        start = offset or 0
+        return _Download(data[start:start + length] if length is not None else data[start:])
+
+
+class _AsyncDownload(_Download):
+    async def chunks(self):
+        for piece in super().chunks():
+            yield piece
+
+
+class AsyncFakeBlobClient(FakeBlobClient):
+    async def get_blob_properties(self):
+        return super().get_blob_properties()
+
+
+class AsyncFakeContainer(FakeContainer):
+    def get_blob_client(self, name: str) -> AsyncFakeBlobClient:
+        return AsyncFakeBlobClient(self, name)
+
+    async def upload_blob(self, name, data, overwrite=False, **kwargs):
+        self.blobs[name] = _Blob(b"".join([piece async for piece in data]))
+
+    async def download_blob(self, name, offset=None, length=None, **kwargs):
+        sync = super().download_blob(name, offset, length)
+        return _AsyncDownload(sync.data)
+
+
+# ─── Seeding ───────────────────────────────────────────────────────────────────
+def statement(rng: random.Random) -> str:
+    return "Reduce " + " ".join(rng.sample(VOCABULARY, TERMS_PER_STATEMENT))
+
+
+def near_duplicate(stmt: str, rng: random.Random, swaps: int = 2) -> str:
+    """A new statement sharing all but `swaps` terms with `stmt`."""
+    words = stmt.split()
+    for i in rng.sample(range(1, len(words)), swaps):
+        words[i] = rng.choice(VOCABULARY)
+    return " ".join(words)
+
+
+def concept_row(stmt: str, i: int, rng: random.Random) -> dict:
+    return {
+        "problem_statement": stmt,
+        "agent": rng.choice(["TRIZ Ideation Agent", "Product Ideation Agent", "Cross-Industry Translation Agent"]),
+        "title": f"Concept {i}",
+        "description": "Lorem ipsum dolor sit amet. " * 20,
+        "novelty_reasoning": "Novel because " + "reasons " * 30,
+        "feasibility_reasoning": "Feasible because " + "reasons " * 30,
+        "industry": rng.choice(["energy", "automotive", "medical", "aerospace"]),
+        "trl": float(rng.randint(1, 9)),
+        "trl_citations": [{"title": "ref", "url": "https://example.org"}],
+        "components": [{"name": f"c{j}", "role": "part"} for j in range(5)],
+    }
+
+
+def seed(n_problems: int, per_problem: int, fake: FakeEmbeddings, container: FakeContainer,
+         blob: bytes, rng: random.Random) -> dict:
+    """Recreate the schema and fill it; returns what the scenarios need."""
+    from sqlalchemy import insert, select
+
+    import db as db_module
+    import embedding
+    import models
+    import similarity_index
+    import concept_index
+
+    models.Base.metadata.drop_all(bind=db_module.engine)
+    models.Base.metadata.create_all(bind=db_module.engine)
+    similarity_index._index = None
+    concept_index._index = None
+
+    stmts = list(dict.fromkeys(statement(rng) for _ in range(n_problems)))
+    with db_module.SessionLocal() as session:
+        for start in range(0, len(stmts), 1000):
+            chunk = stmts[start:start + 1000]
+            problem_ids = session.scalars(
+                insert(models.Problem).returning(models.Problem.id, sort_by_parameter_order=True),
+                [{"content_hash": embedding.content_hash(s), "problem_statement": s} for s in chunk],
+            ).all()
+            session.execute(insert(models.ProblemEmbedding), [
+                {
+                    "content_hash": embedding.content_hash(s),
+                    "problem_statement": s,
+                    "model": embedding.EMBED_MODEL,
+                    "dim": fake.dim,
+                    "vector": embedding.vector_to_bytes(fake.vector(s)),
+                }
+                for s in chunk
+            ])
+            session.execute(insert(models.Concept), [
+                {**concept_row(s, j, rng), "problem_id": pid}
+                for s, pid in zip(chunk, problem_ids)
+                for j in range(per_problem)
+            ])
+        session.commit()
+
+        # a handful of concepts carry a proposal for the download scenario
+        ids = session.scalars(select(models.Concept.id).order_by(models.Concept.id).limit(50)).all()
+        for cid in ids:
+            name = f"{cid}/seed-proposal.pdf"
+            container.blobs[name] = _Blob(blob, "application/pdf")
+            session.get(models.Concept, cid).proposal_url = container.get_blob_client(name).url
+        session.commit()
+        concept_ids = session.scalars(select(models.Concept.id)).all()
+    return {"statements": stmts, "concept_ids": concept_ids, "proposal_ids": ids}
+
+
+# ─── Scenarios ─────────────────────────────────────────────────────────────────
+def build_request(name: str, data: dict, args, rng: random.Random, blob: bytes) -> tuple[str, str, dict]:
+    """(method, url, httpx kwargs) for one request of scenario `name`."""
+    if name == "problems":
+        return "GET", "/problems", {"params": {"limit": 100}}
+    if name in ("concepts", "concepts_summary"):
+        params = {"problem_statement": rng.choice(data["statements"]), "limit": 50}
+        if name == "concepts_summary":
+            params["view"] = "summary"
+        return "GET", "/concepts", {"params": params}
+    if name == "concepts_large":
+        # a full page of full-view concepts across every problem
+        return "GET", "/concepts", {"params": {"limit": 1000}}
+    if name == "batch_lookup":
+        # one portfolio view: the concepts of 20 problems in one request
+        stmts = rng.sample(data["statements"], min(20, len(data["statements"])))
+        return "POST", "/concepts/batch-lookup", {"json": {"problem_statements": stmts}}
+    if name == "similar":
+        query = near_duplicate(rng.choice(data["statements"]), rng)
+        return "GET", "/concepts/similar", {"params": {"problem_statement": query, "limit": 20}}
+    if name == "bulk_post":
+        stmt = statement(rng)
+        body = [concept_row(stmt, i, rng) for i in range(args.bulk_size)]
+        return "POST", "/concepts", {"params": {"bulk": "true"}, "json": body}
+    if name == "proposal_upload":
+        cid = rng.choice(data["concept_ids"])
+        files = {"file": ("proposal.pdf", io.BytesIO(blob), "application/pdf")}
+        return "POST", f"/concepts/{cid}/proposal", {"files": files}
+    if name == "proposal_download":
+        return "GET", f"/concepts/{rng.choice(data['proposal_ids'])}/download", {}
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+async def run_scenario(client, name: str, data: dict, args, rng: random.Random, blob: bytes) -> dict:
+    async def one(req) -> tuple[float, int]:
+        method, url, kwargs = req
+        start = time.perf_counter()
+        resp = await client.request(method, url, **kwargs)
+        await resp.aread()
+        return time.perf_counter() - start, resp.status_code
+
+    async def run(n: int) -> list[tuple[float, int]]:
+        # requests are built up front so the RNG stays reproducible under concurrency
+        pending = [build_request(name, data, args, rng, blob) for _ in range(n)]
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(req):
+            async with slots:
+                return await one(req)
+
+        return await asyncio.gather(*(bounded(r) for r in pending))
+
+    await run(args.warmup)
+    start = time.perf_counter()
+    samples = await run(args.requests)
+    wall = time.perf_counter() - start
+
+    latencies = np.array([s for s, _ in samples]) * 1000
+    errors = sum(1 for _, status in samples if status >= 400)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "scenario": name,
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / wall, 2),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(latencies.max()), 3),
+    }
+
+
+# ─── Driver ────────────────────────────────────────────────────────────────────
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+async def bench(args: argparse.Namespace) -> dict:
+    import httpx
+
+    import embedding
+    import main
+    import storage
+
+    latency = args.embed_latency_ms / 1000
+    fake = FakeEmbeddings(args.embed_dim, latency)
+    embedding._embed_client = types.SimpleNamespace(embeddings=fake)
+    async_fake = AsyncFakeEmbeddings(args.embed_dim, latency)
+    embedding._aembed_client = types.SimpleNamespace(embeddings=async_fake)
+
+    container = AsyncFakeContainer() if args.async_io else FakeContainer()
+    # installed as the blob service rather than via app.dependency_overrides:
+    # with any override set, FastAPI re-analyses every dependency per request
+    fake_service = types.SimpleNamespace(get_container_client=lambda name: container)
+    storage._blob_svc = storage._async_blob_svc = fake_service
+
+    rng = random.Random(args.seed)
+    blob = rng.randbytes(args.blob_kb * 1024)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        t0 = time.perf_counter()
+        data = seed(size, args.concepts_per_problem, fake, container, blob, rng)
+        print(f"seeded {size} problems / {size * args.concepts_per_problem} concepts "
+              f"in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in scenarios:
+                result = {"problems": size, "concepts": size * args.concepts_per_problem,
+                          **await run_scenario(client, name, data, args, rng, blob)}
+                results.append(result)
+                print(f"{size:>8} {name:<18} {result['throughput_rps']:>9.1f} rps  "
+                      f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  "
+                      f"p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}", file=sys.stderr)
+
+    dialect = os.environ["DATABASE_URL"].split(":", 1)[0]
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": dialect,
+            "args": {k: v for k, v in vars(args).items() if k != "database_url"},
+        },
+        "results": results,
+    }
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    configure_environment(args)
+    report = asyncio.run(bench(args))
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
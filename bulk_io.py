@@ -0,0 +1,289 @@
+# bulk_io.py
+"""Bulk concept transfer: streaming JSONL import, JSONL/CSV/Parquet export.
+
+Import (POST /concepts/import) reads the request body as it arrives, one
+JSON object per line, validates each line against ConceptImport (a
+ConceptCreate that may carry `generated_at`) and writes every
+`batch_size` valid rows at once through crud.insert_concept_rows: COPY on
+Postgres, an executemany INSERT elsewhere.  Each batch commits on its
+own, so memory is bounded by the batch size however large the upload,
+and a failed import keeps the batches before it (the error says how many
+rows went in).  Imported concepts and their problem statements are
+embedded as EMBED_WRITE_MODE says; in "background" mode their
+embedding jobs commit with the batch.
+
+Export (GET /concepts/export) streams rows off a server-side cursor in
+its own session, on the read replica when one is in rotation, and
+encodes them as it goes.  Parquet needs the
+optional `pyarrow` package and is written as one row group per
+YIELD_PER rows.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterator, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import cache
+import crud
+import db as db_module
+from schemas import ConceptImport, ConceptRead, drop_workflow_fields
+
+IMPORT_BATCH_ROWS = 5000
+MAX_IMPORT_BATCH_ROWS = 50_000
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+YIELD_PER = 2000
+
+EXPORT_FIELDS = tuple(ConceptRead.model_fields)
+EXPORT_MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+# ─── Import ───────────────────────────────────────────────────────────────────
+class _ImportState:
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.batches = 0
+        self.errors: list[dict] = []
+        self.error_count = 0
+        self.problem_ids: dict[str, int] = {}   # statement -> problems.id, per import
+
+    def fail_line(self, line: int, error: str) -> None:
+        self.skipped += 1
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def result(self) -> dict:
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "error_count": self.error_count,
+        }
+
+
+async def _lines(request: Request) -> AsyncIterator[tuple[int, bytes]]:
+    """Numbered lines of the body, read chunk by chunk."""
+    pending = b""
+    number = 0
+    async for chunk in request.stream():
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            number += 1
+            yield number, line
+        if len(pending) > MAX_LINE_BYTES:
+            raise HTTPException(413, f"Line {number + 1} is longer than {MAX_LINE_BYTES} bytes")
+    if pending.strip():
+        yield number + 1, pending
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'line'}: {err['msg']}" for err in e.errors())
+
+
+def _parse_line(raw: bytes, workflow: Optional[str]) -> dict:
+    """One JSONL line as a concepts row; raises ValueError with a readable message."""
+    try:
+        concept = ConceptImport.model_validate_json(raw)
+    except ValidationError as e:
+        raise ValueError(_validation_message(e))
+    row = concept.model_dump()
+    if workflow:
+        drop_workflow_fields(row, workflow)
+    problems = crud.validate_concept_rows([{k: v for k, v in row.items() if v is not None}])
+    if problems:
+        raise ValueError("; ".join(f"{p['field']}: {p['error']}" for p in problems))
+    return row
+
+
+def _write_batch(db: Session, rows: list[dict], state: _ImportState) -> None:
+    statements = {row["problem_statement"] for row in rows}
+    for stmt in statements - state.problem_ids.keys():
+        state.problem_ids[stmt] = crud.get_or_create_problem(db, stmt).id
+    for row in rows:
+        row["problem_id"] = state.problem_ids[row["problem_statement"]]
+    try:
+        ids = crud.insert_concept_rows(db, rows)
+        job_ids = crud._record_embedding_jobs(db, [state.problem_ids[s] for s in statements], ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # ids handed out in a rolled-back transaction are gone
+        for stmt in statements:
+            state.problem_ids.pop(stmt, None)
+        raise
+    state.imported += len(ids)
+    state.batches += 1
+    for stmt in statements:
+        cache.invalidate_problem(stmt)
+    crud._embed_written(db, ids, list(statements), job_ids)
+
+
+async def import_concepts(request: Request, workflow: Optional[str], batch_size: int, on_error: str) -> dict:
+    """
+    Stream a JSONL body into the concepts table.  Invalid lines are
+    skipped and reported, or with `on_error="abort"` stop the import
+    with a 422 before the batch they are in is written.
+    """
+    state = _ImportState()
+    batch: list[dict] = []
+    db = db_module.SessionLocal()
+    try:
+        async for number, raw in _lines(request):
+            if not raw.strip():
+                continue
+            try:
+                batch.append(_parse_line(raw, workflow))
+            except ValueError as e:
+                state.fail_line(number, str(e))
+                if on_error == "abort":
+                    raise HTTPException(422, {"error": f"Invalid line {number}; import stopped", **state.result()})
+                continue
+            if len(batch) >= batch_size:
+                await _flush(db, batch, state)
+                batch = []
+        await _flush(db, batch, state)
+    finally:
+        await run_in_threadpool(db.close)
+    return state.result()
+
+
+async def _flush(db: Session, batch: list[dict], state: _ImportState) -> None:
+    if not batch:
+        return
+    try:
+        await run_in_threadpool(_write_batch, db, batch, state)
+    except Exception as e:
+        raise HTTPException(500, {"error": f"Writing a batch failed: {e}", **state.result()})
+
+
+# ─── Export ───────────────────────────────────────────────────────────────────
+def _export_rows(stmt, mode: str = "json") -> Iterator[list[dict]]:
+    """ConceptRead dicts in lists of up to YIELD_PER, off a server-side cursor."""
+    with db_module.read_sessionmaker()() as session:
+        result = session.execute(stmt.execution_options(yield_per=YIELD_PER)).scalars()
+        for part in result.partitions():
+            yield [ConceptRead.model_validate(c, from_attributes=True).model_dump(mode=mode) for c in part]
+
+
+def _jsonl(stmt) -> Iterator[bytes]:
+    for part in _export_rows(stmt):
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in part).encode("utf-8")
+
+
+def _csv_value(value):
+    # JSON columns as JSON text; None as an empty cell
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def _csv(stmt) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_FIELDS)
+    for part in _export_rows(stmt):
+        writer.writerows([_csv_value(row[f]) for f in EXPORT_FIELDS] for row in part)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what was written so far."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def _parquet_schema(pa):
+    fields = []
+    for name, info in ConceptRead.model_fields.items():
+        if name == "id":
+            kind = pa.int64()
+        elif name == "generated_at":
+            kind = pa.timestamp("us", tz="UTC")
+        elif name in crud.JSON_COLUMNS:
+            kind = pa.string()              # JSON text
+        elif info.annotation in (float, Optional[float]):
+            kind = pa.float64()
+        else:
+            kind = pa.string()
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+def _parquet(stmt) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for part in _export_rows(stmt, mode="python"):
+            columns = {
+                name: [
+                    json.dumps(row[name]) if name in crud.JSON_COLUMNS and row[name] is not None else row[name]
+                    for row in part
+                ]
+                for name in schema.names
+            }
+            writer.write_table(pa.table(columns, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+_ENCODERS = {"jsonl": _jsonl, "csv": _csv, "parquet": _parquet}
+
+
+def export_response(fmt: str, stmt) -> StreamingResponse:
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(501, "format=parquet needs the pyarrow package on the server")
+    return StreamingResponse(
+        _ENCODERS[fmt](stmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="concepts.{fmt}"'},
+    )
@@ -0,0 +1,295 @@
+# cache.py
+"""Read-through response cache for the read-heavy GET endpoints.
+
+`/problems`, `/concepts`, `/concepts/similar` and `/concepts/stats`
+responses are cached whole, keyed by path plus the sorted query string,
+so a repeated dashboard load costs no DB or embedding work.  Every cacheable response
+carries a strong ETag; a matching `If-None-Match` gets a 304.
+
+Entries are tagged so writes can invalidate just what they affect:
+`crud.create_concepts` / `crud.update_concept` call
+`invalidate_problem()`, which drops /problems, every /concepts/similar
+and /concepts/stats entry, and only those /concepts searches whose ILIKE
+pattern the written statement matches (a listing without
+problem_statement matches every write).  Storing embeddings, which the
+write-behind queue does after the write, calls `invalidate_similar()`.
+
+With a read replica in rotation, a response computed within
+REPLICA_MAX_LAG_SECONDS of this worker's last write may predate that
+write, so it is served but not cached.
+
+Backends: an in-process LRU with TTL (per worker; other workers see a
+write once their TTL expires) or Redis, shared by every worker.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request
+from starlette.responses import Response
+
+import db as db_module
+from db import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+CACHEABLE_PATHS = ("/problems", "/concepts", "/concepts/similar", "/concepts/stats")
+# headers worth replaying from a cached response
+_KEPT_HEADERS = ("content-type", "x-next-cursor", "link")
+
+TAG_PROBLEMS = "problems"
+TAG_SIMILAR = "similar"
+TAG_STATS = "stats"
+_CONCEPTS_TAG_PREFIX = "concepts-q:"
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[bytes]: ...
+    def set(self, key: str, value: bytes, tags: list[str]) -> None: ...
+    def invalidate(self, tags: list[str]) -> None: ...
+    def tags(self, prefix: str) -> list[str]: ...
+
+
+class MemoryBackend:
+    """Thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, bytes, list[str]]] = OrderedDict()
+        self._by_tag: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str) -> None:
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: str, value: bytes, tags: list[str]) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._drop(next(iter(self._data)))
+
+    def invalidate(self, tags: list[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._by_tag.get(tag, ())):
+                    if key in self._data:
+                        self._drop(key)
+
+    def tags(self, prefix: str) -> list[str]:
+        with self._lock:
+            return [t for t in self._by_tag if t.startswith(prefix)]
+
+
+class RedisBackend:
+    """Shared backend; tag membership is kept in Redis sets."""
+
+    def __init__(self, url: str, ttl: int, namespace: str = "respcache"):
+        import redis  # optional dependency, only needed for RESPONSE_CACHE=redis
+
+        self._r = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.ns = namespace
+
+    def _k(self, kind: str, name: str) -> str:
+        return f"{self.ns}:{kind}:{name}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._r.get(self._k("entry", key))
+
+    def set(self, key: str, value: bytes, tags: list[str]) -> None:
+        pipe = self._r.pipeline()
+        pipe.set(self._k("entry", key), value, ex=self.ttl)
+        for tag in tags:
+            pipe.sadd(self._k("tag", tag), key)
+            pipe.expire(self._k("tag", tag), self.ttl)
+            pipe.sadd(self._k("tags", "all"), tag)
+        pipe.execute()
+
+    def invalidate(self, tags: list[str]) -> None:
+        for tag in tags:
+            keys = self._r.smembers(self._k("tag", tag))
+            pipe = self._r.pipeline()
+            for key in keys:
+                pipe.delete(self._k("entry", key.decode()))
+            pipe.delete(self._k("tag", tag))
+            pipe.srem(self._k("tags", "all"), tag)
+            pipe.execute()
+
+    def tags(self, prefix: str) -> list[str]:
+        names = (t.decode() for t in self._r.smembers(self._k("tags", "all")))
+        return [t for t in names if t.startswith(prefix)]
+
+
+def _make_backend() -> Optional[CacheBackend]:
+    if settings.RESPONSE_CACHE == "off":
+        return None
+    if settings.RESPONSE_CACHE == "redis":
+        if not settings.REDIS_URL:
+            raise RuntimeError("RESPONSE_CACHE=redis requires REDIS_URL")
+        return RedisBackend(settings.REDIS_URL, settings.RESPONSE_CACHE_TTL)
+    return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL)
+
+
+backend: Optional[CacheBackend] = _make_backend()
+
+
+# ─── Keys, tags and ETags ─────────────────────────────────────────────────────
+def cache_key(request: Request) -> str:
+    """Path plus the query string with parameters in canonical order."""
+    params = sorted(parse_qsl(request.url.query, keep_blank_values=True))
+    return f"{request.url.path}?{urlencode(params)}"
+
+
+def _tags_for(request: Request) -> list[str]:
+    path = request.url.path
+    if path == "/problems":
+        return [TAG_PROBLEMS]
+    if path == "/concepts/similar":
+        return [TAG_SIMILAR]
+    if path == "/concepts/stats":
+        return [TAG_STATS]
+    return [_CONCEPTS_TAG_PREFIX + request.query_params.get("problem_statement", "")]
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+def _pack(headers: dict, body: bytes) -> bytes:
+    return json.dumps(headers).encode("utf-8") + b"\n" + body
+
+
+def _unpack(raw: bytes) -> tuple[dict, bytes]:
+    head, _, body = raw.partition(b"\n")
+    return json.loads(head), body
+
+
+def _respond(request: Request, headers: dict, body: bytes) -> Response:
+    if _etag_matches(request, headers["etag"]):
+        return Response(status_code=304, headers={"etag": headers["etag"]})
+    return Response(content=body, headers=headers)
+
+
+def _is_cacheable(request: Request) -> bool:
+    return (
+        request.method == "GET"
+        and request.url.path in CACHEABLE_PATHS
+        # NDJSON is a stream; buffering it would defeat the point
+        and "application/x-ndjson" not in request.headers.get("accept", "")
+    )
+
+
+async def middleware(request: Request, call_next):
+    """HTTP middleware: serve from cache, or fill it from the endpoint."""
+    if not _is_cacheable(request):
+        return await call_next(request)
+
+    key = cache_key(request)
+    if backend is not None:
+        hit = backend.get(key)
+        if hit is not None:
+            headers, body = _unpack(hit)
+            return _respond(request, headers, body)
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    validators = {
+        "etag": make_etag(body),
+        "cache-control": "no-cache",     # clients revalidate with If-None-Match
+    }
+    if backend is not None and not _maybe_stale():
+        kept = {k: v for k, v in response.headers.items() if k in _KEPT_HEADERS}
+        backend.set(key, _pack({**kept, **validators}, body), _tags_for(request))
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return _respond(request, {**headers, **validators}, body)
+
+
+# ─── Invalidation ─────────────────────────────────────────────────────────────
+_last_write = 0.0   # monotonic time of this worker's last invalidation
+
+
+def _maybe_stale() -> bool:
+    """True while a replica read may not yet include this worker's last write."""
+    return db_module.replica_in_use() and time.monotonic() - _last_write < settings.REPLICA_MAX_LAG_SECONDS
+
+
+def _ilike_matches(pattern: str, problem_statement: str) -> bool:
+    if "%" in pattern or "_" in pattern:
+        return True   # wildcards in the search: be conservative
+    return pattern.lower() in problem_statement.lower()
+
+
+def _invalidate(stale: list[str]) -> None:
+    try:
+        backend.invalidate(stale)
+    except Exception as e:
+        # a cache outage must never fail the write; TTL bounds staleness
+        logger.warning(f"Response cache invalidation failed: {e}")
+
+
+def invalidate_problem(problem_statement: str) -> None:
+    """Drop every cached response a write to `problem_statement` can change."""
+    global _last_write
+    _last_write = time.monotonic()
+    if backend is None:
+        return
+    try:
+        stale = [TAG_PROBLEMS, TAG_SIMILAR, TAG_STATS]
+        for tag in backend.tags(_CONCEPTS_TAG_PREFIX):
+            if _ilike_matches(tag[len(_CONCEPTS_TAG_PREFIX):], problem_statement):
+                stale.append(tag)
+    except Exception as e:
+        logger.warning(f"Response cache invalidation failed: {e}")
+        return
+    _invalidate(stale)
+
+
+def invalidate_similar() -> None:
+    """
+    Drop every cached /concepts/similar response once new vectors are
+    stored.  Write-behind embedding lands after the write's own
+    invalidate_problem, and a new vector can change any ranking.
+    /concepts/search is never cached.
+    """
+    global _last_write
+    _last_write = time.monotonic()
+    if backend is not None:
+        _invalidate([TAG_SIMILAR])
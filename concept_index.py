@@ -0,0 +1,491 @@
+# concept_index.py
+"""Approximate nearest-neighbour index over concept embeddings (IVF).
+
+Concept vectors (title + description, see crud.concept_embedding_text)
+are clustered with spherical k-means into inverted lists.  A query
+scores the centroids and scans only the `nprobe` closest lists, so
+CONCEPT_INDEX_NPROBE is the recall/latency knob: nprobe == nlist is an
+exhaustive scan.  Rows are held as int8 with a per-vector scale, as in
+similarity_index, and crud.search_concepts re-scores the candidates with
+their float32 vectors in the same query that applies the filters.
+
+Below CONCEPT_INDEX_TRAIN_MIN vectors the index is a single flat list
+(exact, and fast at that size).  It is trained the first time it
+crosses that size, and re-trained on load once the collection has grown
+RETRAIN_GROWTH times since, which keeps the lists balanced.  Run
+`python backfill_embeddings.py` to re-train by hand.
+
+Inserts go to the nearest list; `add` replaces the vector of a concept
+that is already indexed, moving the list's last row into the old one's
+hole, so neither needs a rebuild.  The index is written to
+CONCEPT_INDEX_PATH (temp file + rename) every CONCEPT_INDEX_SAVE_EVERY
+writes and at shutdown.  On start it is loaded from there and `sync()`
+reads only the concept_embeddings rows added since, by id; after that a
+search syncs only once the largest stored id has moved.  Nothing
+removes single concepts: one deleted in the database (its vector goes
+by cascade) stays in the lists until the next rebuild, but the SQL join
+in crud.search_concepts drops it from results.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import models
+from config import (
+    CONCEPT_INDEX_NLIST,
+    CONCEPT_INDEX_NPROBE,
+    CONCEPT_INDEX_PATH,
+    CONCEPT_INDEX_SAVE_EVERY,
+    CONCEPT_INDEX_TRAIN_MIN,
+)
+from embedding import EMBED_MODEL, bytes_to_vector
+from similarity_index import BLOCK_ROWS, SYNC_BATCH, SYNC_OVERLAP, quantize_int8, unit_vector
+
+logger = logging.getLogger("uvicorn.error")
+
+FORMAT_VERSION = 1
+RETRAIN_GROWTH = 4
+KMEANS_ITERATIONS = 10
+# k-means sees at most this many vectors, however large the index is
+KMEANS_SAMPLE_PER_LIST = 64
+KMEANS_MAX_SAMPLE = 20_000
+
+
+class _InvertedList:
+    """Growable int8 rows of one cluster, with their scales and ids."""
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.codes = np.empty((capacity, dim), dtype=np.int8)
+        self.scales = np.empty(capacity, dtype=np.float32)
+        self.ids = np.empty(capacity, dtype=np.int64)            # concept ids
+        self.embedding_ids = np.empty(capacity, dtype=np.int64)  # concept_embeddings.id of each row
+        self.n = 0
+
+    @classmethod
+    def from_arrays(cls, codes, scales, ids, embedding_ids) -> "_InvertedList":
+        lst = cls(codes.shape[1], max(len(ids), 16))
+        n = len(ids)
+        lst.codes[:n], lst.scales[:n], lst.ids[:n], lst.embedding_ids[:n] = codes, scales, ids, embedding_ids
+        lst.n = n
+        return lst
+
+    def _grow(self) -> None:
+        cap = 2 * len(self.ids)
+        for name in ("codes", "scales", "ids", "embedding_ids"):
+            old = getattr(self, name)
+            grown = np.empty((cap, *old.shape[1:]), dtype=old.dtype)
+            grown[: self.n] = old[: self.n]
+            setattr(self, name, grown)
+
+    def append(self, concept_id: int, embedding_id: int, codes: np.ndarray, scale: float) -> int:
+        if self.n == len(self.ids):
+            self._grow()
+        pos = self.n
+        self.codes[pos], self.scales[pos] = codes, scale
+        self.ids[pos], self.embedding_ids[pos] = concept_id, embedding_id
+        self.n += 1
+        return pos
+
+    def remove(self, pos: int) -> Optional[int]:
+        """Drop row `pos`; returns the concept id moved into its place, if any."""
+        last = self.n - 1
+        moved = None
+        if pos != last:
+            self.codes[pos], self.scales[pos] = self.codes[last], self.scales[last]
+            self.ids[pos], self.embedding_ids[pos] = self.ids[last], self.embedding_ids[last]
+            moved = int(self.ids[pos])
+        self.n = last
+        return moved
+
+    def vectors(self, start: int, end: int) -> np.ndarray:
+        """Dequantized rows start..end."""
+        return self.codes[start:end].astype(np.float32) * self.scales[start:end, None]
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        out = np.empty(self.n, dtype=np.float32)
+        for start in range(0, self.n, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, self.n)
+            out[start:end] = self.codes[start:end].astype(np.float32) @ q
+        out *= self.scales[: self.n]
+        return out
+
+
+# ─── Clustering ───────────────────────────────────────────────────────────────
+def _assign(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest (highest cosine) centroid for each row of `x`."""
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), BLOCK_ROWS):
+        out[start:start + BLOCK_ROWS] = np.argmax(x[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(x: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """`k` unit centroids for the unit rows of `x` (k-means on cosine)."""
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(x)))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        sums = np.zeros_like(centroids)
+        counts = np.zeros(k, dtype=np.int64)
+        for start in range(0, len(x), BLOCK_ROWS):
+            block = x[start:start + BLOCK_ROWS]
+            labels = np.argmax(block @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, first = np.unique(labels[order], return_index=True)
+            sums[present] += np.add.reduceat(block[order], first, axis=0)
+            counts += np.bincount(labels, minlength=k)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            # re-seed clusters that lost every point
+            sums[empty] = x[rng.choice(len(x), empty.size, replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1.0)
+    return centroids.astype(np.float32)
+
+
+class ConceptIndex:
+    """IVF cosine index keyed by concept id."""
+
+    def __init__(
+        self,
+        model: str = EMBED_MODEL,
+        nlist: int = CONCEPT_INDEX_NLIST,
+        nprobe: int = CONCEPT_INDEX_NPROBE,
+        train_min: int = CONCEPT_INDEX_TRAIN_MIN,
+        path: str = CONCEPT_INDEX_PATH,
+        save_every: int = CONCEPT_INDEX_SAVE_EVERY,
+    ):
+        self.model = model
+        self.nlist_setting = nlist
+        self.nprobe = nprobe
+        self.train_min = train_min
+        self.path = path
+        self.save_every = save_every
+        self._dim: int | None = None
+        self._centroids: np.ndarray | None = None   # (nlist, dim) once trained
+        self._lists: list[_InvertedList] = []
+        self._where: dict[int, tuple[int, int]] = {}   # concept id -> (list, row)
+        self._last_id = 0
+        self._trained_size = 0
+        self._unsaved = 0
+        self._saving = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    @property
+    def dim(self) -> int | None:
+        return self._dim
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def nlist(self) -> int:
+        return len(self._lists)
+
+    @property
+    def needs_training(self) -> bool:
+        if not self.trained:
+            return len(self) >= self.train_min
+        return len(self) >= RETRAIN_GROWTH * self._trained_size
+
+    # ─── Writes ──────────────────────────────────────────────────────────────
+    def _insert(self, concept_id: int, embedding_id: int, v: np.ndarray) -> None:
+        if self._dim is None:
+            self._dim = v.shape[0]
+            self._lists = [_InvertedList(self._dim)]
+        elif v.shape[0] != self._dim:
+            raise ValueError(f"Vector dim {v.shape[0]} does not match index dim {self._dim}")
+        self._remove(concept_id)
+        li = int(np.argmax(self._centroids @ v)) if self.trained else 0
+        codes, scale = quantize_int8(v)
+        self._where[concept_id] = (li, self._lists[li].append(concept_id, embedding_id, codes, scale))
+        self._unsaved += 1
+        if not self.trained and len(self) >= self.train_min:
+            self.train()
+
+    def _remove(self, concept_id: int) -> bool:
+        loc = self._where.pop(concept_id, None)
+        if loc is None:
+            return False
+        li, pos = loc
+        moved = self._lists[li].remove(pos)
+        if moved is not None:
+            self._where[moved] = (li, pos)
+        self._unsaved += 1
+        return True
+
+    def add(self, concept_id: int, vector, embedding_id: int = 0) -> None:
+        """Insert or replace the vector of one concept."""
+        v = unit_vector(vector)
+        with self._lock:
+            self._insert(concept_id, embedding_id, v)
+        self._maybe_save()
+
+    def _indexed_embedding(self, concept_id: int) -> int | None:
+        loc = self._where.get(concept_id)
+        return None if loc is None else int(self._lists[loc[0]].embedding_ids[loc[1]])
+
+    def stale(self, db: Session) -> bool:
+        """True when some worker stored a vector past the high-water mark."""
+        # max of the primary key is an index lookup, unlike a sync's window scan
+        return (db.scalar(select(func.max(models.ConceptEmbedding.id))) or 0) > self._last_id
+
+    def sync(self, db: Session) -> int:
+        """Load embeddings persisted since the last sync.  Returns rows applied."""
+        ce = models.ConceptEmbedding
+        columns = (ce.id, ce.concept_id, ce.vector)
+        applied = 0
+        if self._last_id:
+            # rows below the mark that committed late (or after the index
+            # was saved); vectors are fetched only for those not applied yet
+            window = db.execute(
+                select(ce.id, ce.concept_id).where(
+                    ce.model == self.model,
+                    ce.id > self._last_id - SYNC_OVERLAP,
+                    ce.id <= self._last_id,
+                )
+            )
+            late = [row_id for row_id, concept_id in window if (self._indexed_embedding(concept_id) or 0) < row_id]
+            if late:
+                rows = db.execute(select(*columns).where(ce.id.in_(late)).order_by(ce.id))
+                with self._lock:
+                    for row in rows:
+                        self._insert(row.concept_id, row.id, unit_vector(bytes_to_vector(row.vector)))
+                        applied += 1
+        stmt = (
+            select(*columns)
+            .where(ce.model == self.model, ce.id > self._last_id)
+            .order_by(ce.id)
+            .execution_options(yield_per=SYNC_BATCH)
+        )
+        for batch in db.execute(stmt).partitions():
+            with self._lock:
+                for row in batch:
+                    self._last_id = max(self._last_id, row.id)
+                    if self._indexed_embedding(row.concept_id) == row.id:
+                        continue   # added live by this worker already
+                    self._insert(row.concept_id, row.id, unit_vector(bytes_to_vector(row.vector)))
+                    applied += 1
+        self._maybe_save()
+        return applied
+
+    # ─── Training ────────────────────────────────────────────────────────────
+    def _sample(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        sizes = np.array([lst.n for lst in self._lists])
+        bounds = np.cumsum(sizes)
+        picks = np.sort(rng.choice(int(bounds[-1]), size, replace=False))
+        li = np.searchsorted(bounds, picks, side="right")
+        rows = picks - (bounds[li] - sizes[li])
+        x = np.stack([self._lists[i].vectors(r, r + 1)[0] for i, r in zip(li, rows)])
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+    def train(self, nlist: int = 0, seed: int = 0) -> None:
+        """
+        Re-cluster every indexed vector into `nlist` lists (default:
+        CONCEPT_INDEX_NLIST, or sqrt of the vector count).  Blocks
+        searches while it runs.
+        """
+        with self._lock:
+            n = len(self)
+            if n == 0:
+                return
+            k = max(1, min(nlist or self.nlist_setting or int(np.sqrt(n)), n))
+            size = min(n, max(k * KMEANS_SAMPLE_PER_LIST, KMEANS_MAX_SAMPLE // 4), KMEANS_MAX_SAMPLE)
+            centroids = spherical_kmeans(self._sample(size, np.random.default_rng(seed)), k, seed=seed)
+
+            old = self._lists
+            self._centroids = centroids
+            self._lists = [_InvertedList(self._dim) for _ in range(k)]
+            self._where = {}
+            for lst in old:
+                for start in range(0, lst.n, BLOCK_ROWS):
+                    end = min(start + BLOCK_ROWS, lst.n)
+                    for j, li in enumerate(_assign(lst.vectors(start, end), centroids), start):
+                        cid = int(lst.ids[j])
+                        pos = self._lists[li].append(cid, lst.embedding_ids[j], lst.codes[j], lst.scales[j])
+                        self._where[cid] = (int(li), pos)
+            self._trained_size = n
+            self._unsaved += 1
+        logger.info(f"Concept index trained: {n} vectors in {k} lists")
+
+    # ─── Reads ───────────────────────────────────────────────────────────────
+    def search(self, query, k: int, nprobe: Optional[int] = None) -> list[tuple[int, float]]:
+        """
+        Up to `k` (concept_id, approximate cosine) pairs, best first,
+        scanning the `nprobe` lists whose centroids are closest to `query`.
+        """
+        q = unit_vector(query)
+        with self._lock:
+            if not self._where or k <= 0:
+                return []
+            if q.shape[0] != self._dim:
+                raise ValueError(f"Query dim {q.shape[0]} does not match index dim {self._dim}")
+            if self.trained:
+                p = max(1, min(nprobe or self.nprobe, self.nlist))
+                probe = np.argpartition(self._centroids @ q, -p)[-p:]
+            else:
+                probe = range(self.nlist)
+            ids, scores = [], []
+            for li in probe:
+                lst = self._lists[li]
+                if lst.n:
+                    ids.append(lst.ids[: lst.n].copy())
+                    scores.append(lst.scores(q))
+        if not ids:
+            return []
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        if scores.size > k:
+            part = np.argpartition(scores, -k)[-k:]
+        else:
+            part = np.arange(scores.size)
+        order = part[np.argsort(scores[part])[::-1]]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    # ─── Persistence ─────────────────────────────────────────────────────────
+    def _maybe_save(self) -> None:
+        with self._lock:
+            if not self.path or self._saving or self._unsaved < self.save_every:
+                return
+            self._saving = True
+        threading.Thread(target=self._save_in_background, name="concept-index-save", daemon=True).start()
+
+    def _save_in_background(self) -> None:
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning(f"Could not save concept index to {self.path}: {e}")
+        finally:
+            self._saving = False
+
+    def save(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the index to `path` (default CONCEPT_INDEX_PATH) atomically."""
+        path = path or self.path
+        if not path:
+            return None
+        with self._lock:
+            if self._dim is None:
+                return None
+            lists = self._lists
+            arrays = {
+                "centroids": self._centroids if self.trained else np.empty((0, self._dim), dtype=np.float32),
+                "codes": np.concatenate([lst.codes[: lst.n] for lst in lists]),
+                "scales": np.concatenate([lst.scales[: lst.n] for lst in lists]),
+                "ids": np.concatenate([lst.ids[: lst.n] for lst in lists]),
+                "embedding_ids": np.concatenate([lst.embedding_ids[: lst.n] for lst in lists]),
+                "lists": np.concatenate([np.full(lst.n, i, dtype=np.int32) for i, lst in enumerate(lists)]),
+            }
+            meta = {
+                "version": FORMAT_VERSION,
+                "model": self.model,
+                "dim": self._dim,
+                "last_id": self._last_id,
+                "trained_size": self._trained_size,
+            }
+            self._unsaved = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = CONCEPT_INDEX_PATH, **kwargs) -> Optional["ConceptIndex"]:
+        """Read an index written by `save`; None if missing, unreadable or stale."""
+        if not path or not os.path.exists(path):
+            return None
+        index = cls(path=path, **kwargs)
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != FORMAT_VERSION or meta.get("model") != index.model:
+                    logger.info(f"Ignoring concept index {path} built for another model or format")
+                    return None
+                arrays = {name: data[name] for name in ("centroids", "codes", "scales", "ids", "embedding_ids", "lists")}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable concept index {path}: {e}")
+            return None
+
+        index._dim = meta["dim"]
+        index._last_id = meta["last_id"]
+        index._trained_size = meta["trained_size"]
+        centroids = arrays["centroids"]
+        index._centroids = centroids if len(centroids) else None
+        nlist = max(len(centroids), 1)
+        order = np.argsort(arrays["lists"], kind="stable")
+        bounds = np.searchsorted(arrays["lists"][order], np.arange(nlist + 1))
+        for li in range(nlist):
+            rows = order[bounds[li]:bounds[li + 1]]
+            lst = _InvertedList.from_arrays(
+                arrays["codes"][rows], arrays["scales"][rows], arrays["ids"][rows], arrays["embedding_ids"][rows]
+            ) if rows.size else _InvertedList(index._dim)
+            index._lists.append(lst)
+            for pos, cid in enumerate(lst.ids[: lst.n]):
+                index._where[int(cid)] = (li, pos)
+        return index
+
+
+# ─── Process-wide index ───────────────────────────────────────────────────────
+_index: ConceptIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index(db: Session) -> ConceptIndex:
+    """
+    Return the process-wide index, loaded from disk and synced with the
+    DB.  After the first load a search only syncs once another worker
+    has stored vectors; this worker's own go in through `index_vectors`.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = ConceptIndex.load() or ConceptIndex()
+            index.sync(db)
+            if index.needs_training:
+                index.train()
+            _index = index
+    if _index.stale(db):
+        _index.sync(db)
+    return _index
+
+
+def index_vectors(items: list[tuple[int, list[float], int]], model: str) -> None:
+    """
+    Apply freshly stored (concept_id, vector, embedding_id) triples to the
+    live index, if one is loaded.  As in similarity_index, the sync
+    high-water mark is left alone.
+    """
+    if _index is None or model != _index.model:
+        return
+    for concept_id, vector, embedding_id in items:
+        _index.add(concept_id, vector, embedding_id)
+
+
+def warm_up() -> None:
+    """Load (or build) the index before the first search."""
+    from db import SessionLocal
+
+    try:
+        with SessionLocal() as session:
+            get_index(session)
+    except Exception as e:
+        logger.warning(f"Concept index not loaded at startup: {e}")
+
+
+def save_index() -> None:
+    """Persist the live index if it changed since the last save (shutdown hook)."""
+    if _index is not None and _index._unsaved:
+        _index.save()
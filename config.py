@@ -16,17 +16,16 @@ import os
 # ===========================================================================
 
 def _get(key: str) -> str:
-    val = os.getenv(key)
-    if not val:
-        raise RuntimeError(f"Missing required environment variable: {key}")
-    return val
+    # Missing secrets only fail the feature that needs them (see the
+    # warnings below), not every import of this module.
+    return os.getenv(key, "")
 
 AZURE_ENDPOINT       = _get("AZURE_ENDPOINT")
 AZURE_OPENAI_KEY     = _get("AZURE_OPENAI_KEY")
 SERP_API_KEY         = _get("SERP_API_KEY")
 PRODUCTS_ENDPOINT    = _get("PRODUCTS_ENDPOINT")
 PRODUCTS_OPENAI_KEY  = _get("PRODUCTS_OPENAI_KEY")
-# Fail fast if critical secrets are missing when imported by the main app.
+# Warn early if secrets are missing; callers raise when they actually need them.
 if not AZURE_ENDPOINT or not AZURE_OPENAI_KEY:
     import warnings
     warnings.warn(
@@ -92,6 +91,37 @@ DEFAULT_COST_UNIT   = "USD/ft²"
 DEFAULT_TARGET_COST = 15.0   # same unit as above
 MIN_ACCEPTABLE_TRL  = 4
 
+# ===========================================================================
+# Embedding API batching  (see embedding.embed_texts)  ======================
+# ===========================================================================
+
+EMBED_BATCH_MAX_INPUTS  = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "256"))     # service cap is 2048
+EMBED_BATCH_MAX_CHARS   = int(os.getenv("EMBED_BATCH_MAX_CHARS", "200000"))   # ~50k tokens per request
+EMBED_MAX_CONCURRENCY   = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))        # parallel HTTP calls per process
+EMBED_MAX_RETRIES       = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_BASE      = float(os.getenv("EMBED_BACKOFF_BASE", "0.5"))       # seconds
+EMBED_BACKOFF_MAX       = float(os.getenv("EMBED_BACKOFF_MAX", "20"))
+
+# ===========================================================================
+# In-memory vector index  (see similarity_index.SimilarityIndex)  ===========
+# ===========================================================================
+
+VECTOR_INDEX_DTYPE        = os.getenv("VECTOR_INDEX_DTYPE", "int8")          # float32 | float16 | int8
+VECTOR_INDEX_DIM          = int(os.getenv("VECTOR_INDEX_DIM", "0"))           # Matryoshka prefix length; 0 = all dims
+VECTOR_RERANK_CANDIDATES  = int(os.getenv("VECTOR_RERANK_CANDIDATES", "64"))  # coarse hits re-scored exactly
+VECTOR_COARSE_MARGIN      = float(os.getenv("VECTOR_COARSE_MARGIN", "0.05"))  # slack on min_similarity for coarse hits
+
+# ===========================================================================
+# Concept search index  (see concept_index.ConceptIndex)  ===================
+# ===========================================================================
+
+CONCEPT_INDEX_PATH        = os.getenv("CONCEPT_INDEX_PATH", "concept_index.npz")   # "" = rebuild from the DB on every start
+CONCEPT_INDEX_NLIST       = int(os.getenv("CONCEPT_INDEX_NLIST", "0"))         # IVF clusters; 0 = sqrt(vectors)
+CONCEPT_INDEX_NPROBE      = int(os.getenv("CONCEPT_INDEX_NPROBE", "8"))        # clusters scanned per query: recall vs latency
+CONCEPT_INDEX_TRAIN_MIN   = int(os.getenv("CONCEPT_INDEX_TRAIN_MIN", "2048"))  # below this the index is an exact flat scan
+CONCEPT_INDEX_OVERFETCH   = int(os.getenv("CONCEPT_INDEX_OVERFETCH", "4"))     # candidates per wanted hit before SQL filters
+CONCEPT_INDEX_SAVE_EVERY  = int(os.getenv("CONCEPT_INDEX_SAVE_EVERY", "1000")) # writes between background saves
+
 # ===========================================================================
 # SECTION DEPENDENCIES FOR REGENERATION (edit as needed)  ===================================
 # ===========================================================================
@@ -1,7 +1,14 @@
-from db import engine, Base
-import models  # ensure Concept is imported so Base.metadata knows about it
+"""Bring the database schema up to date; same as `alembic upgrade head`.
+
+The schema belongs to the Alembic migrations.  Base.metadata.create_all
+would build the tables without an alembic_version row, and the next
+`alembic upgrade head` would then fail on tables that already exist.
+"""
+from alembic import command
+
+import db
 
 if __name__ == "__main__":
-    print("Creating tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Tables created successfully.")
+    print("Upgrading the schema to the Alembic head...")
+    command.upgrade(db.alembic_config(db.engine.url), "head")
+    print("Schema is up to date.")
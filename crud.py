@@ -1,23 +1,196 @@
 # crud.py
 
+from sqlalchemy import Integer, Text, case, cast, func, insert, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+import io
+import json
+import logging
 import models
 
-from embedding import embed_text, cosine_similarity
-import numpy as np
+from config import CONCEPT_INDEX_OVERFETCH, MIN_ACCEPTABLE_TRL
+from embedding import (
+    EMBED_MODEL,
+    bytes_to_vector,
+    embed_text,
+    embed_texts,
+    content_hash,
+    normalize_text,
+    vector_to_bytes,
+)
+import similarity_index
+import concept_index
+import embedding_queue
+import cache
+from schemas import ConceptFilters, ConceptRead
+from settings import get_settings
 
-def get_concepts_by_problem(db: Session, problem_statement: str):
+logger = logging.getLogger("uvicorn.error")
+settings = get_settings()
+
+# Light columns for list views; keeps the big Text/JSON columns out of the SELECT.
+SUMMARY_FIELDS = ("id", "title", "agent", "industry", "trl", "validated_trl", "proposal_url", "generated_at")
+SUMMARY_COLUMNS = tuple(getattr(models.Concept, f) for f in SUMMARY_FIELDS)
+
+# Every ConceptRead column, for fast_json: JSON columns come back as their
+# stored text, so they are never parsed only to be encoded again.
+READ_FIELDS = tuple(ConceptRead.model_fields)
+READ_COLUMNS = tuple(
+    cast(col, Text).label(f) if isinstance(col.type, models.JSON) else col
+    for f, col in ((f, getattr(models.Concept, f)) for f in READ_FIELDS)
+)
+
+
+def _after_concept(dialect: str, after: tuple):
+    """Keyset predicate: (generated_at, id) strictly after `after`."""
+    ts, last_id = after
+    if dialect == "sqlite":
+        # CURRENT_TIMESTAMP text and SQLAlchemy's bound datetime text differ
+        # in precision, so compare Julian days rather than strings
+        return tuple_(func.julianday(models.Concept.generated_at), models.Concept.id) > tuple_(
+            func.julianday(ts.isoformat(" ")), last_id
+        )
+    return tuple_(models.Concept.generated_at, models.Concept.id) > tuple_(ts, last_id)
+
+
+def concepts_by_problem_stmt(
+    problem_statement: str | None,
+    limit: int | None = None,
+    after: tuple | None = None,
+    columns: tuple | None = None,
+    dialect: str = "postgresql",
+    filters: ConceptFilters | None = None,
+):
+    """
+    SELECT behind `get_concepts_by_problem`, exposed so streaming callers
+    can execute it with `yield_per` on a session of their own.
+    """
+    stmt = select(*columns) if columns else select(models.Concept)
+    if problem_statement is not None:
+        # match against the (trigram-indexed) problems table, then pull the
+        # concepts through the problem_id foreign key
+        matching = (
+            select(models.Problem.id)
+            # return any records whose problem_statement contains the input (case-insensitive)
+            .where(models.Problem.problem_statement.ilike(f"%{problem_statement}%"))
+        )
+        stmt = stmt.where(models.Concept.problem_id.in_(matching))
+    if filters is not None:
+        stmt = stmt.where(*concept_filter_clauses(filters, dialect))
+    if after:
+        stmt = stmt.where(_after_concept(dialect, after))
+    stmt = stmt.order_by(models.Concept.generated_at, models.Concept.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def get_concepts_by_problem(
+    db: Session,
+    problem_statement: str | None,
+    limit: int | None = None,
+    after: tuple | None = None,
+    columns: tuple | None = None,
+    filters: ConceptFilters | None = None,
+):
     """
-    Retrieve all Concept records matching a given problem statement.
+    Retrieve all Concept records matching a given problem statement
+    (every concept when it is None) and `filters`.
+    Results are ordered by (generated_at, id); `after` is the keyset of
+    the last row already seen and `limit` caps the page.  With `columns`
+    only those columns are selected and plain rows are returned.
+    """
+    stmt = concepts_by_problem_stmt(
+        problem_statement, limit, after, columns, db.get_bind().dialect.name, filters
+    )
+    result = db.execute(stmt)
+    return result.all() if columns else result.scalars().all()
+
+def get_concept(db: Session, concept_id: int):
+    """Return a single Concept by primary key, or None."""
+    return db.get(models.Concept, concept_id)
+
+
+def list_problems(db: Session, limit: int | None = None, after: tuple | None = None):
+    """
+    Distinct problems as (problem_statement, id) rows, alphabetically.
+    `after` is the (problem_statement, id) keyset of the previous page.
+    """
+    q = db.query(models.Problem.problem_statement, models.Problem.id)
+    if after:
+        q = q.filter(tuple_(models.Problem.problem_statement, models.Problem.id) > tuple_(*after))
+    q = q.order_by(models.Problem.problem_statement, models.Problem.id)
+    if limit:
+        q = q.limit(limit)
+    return q.all()
+
+
+def list_problem_statements(db: Session) -> list[str]:
+    """Distinct problem statements, alphabetically."""
+    return [stmt for stmt, _ in list_problems(db)]
+
+
+def get_or_create_problem(db: Session, problem_statement: str):
+    """
+    Return the Problem row for `problem_statement`, adding it (flushed,
+    not committed) if it is new.  Concurrent writers racing on the same
+    statement are resolved by the unique content_hash.
+    """
+    h = content_hash(problem_statement)
+    problem = db.query(models.Problem).filter(models.Problem.content_hash == h).first()
+    if problem:
+        return problem
+    try:
+        with db.begin_nested():
+            problem = models.Problem(content_hash=h, problem_statement=problem_statement)
+            db.add(problem)
+    except IntegrityError:
+        problem = db.query(models.Problem).filter(models.Problem.content_hash == h).one()
+    return problem
+
+
+def concepts_by_problem_hash_stmt(hashes: list[str], columns: tuple | None = None):
+    """
+    Concepts of the problems with these content hashes, joined through
+    problem_id, so statements that differ only by normalization match.
+    Each row leads with its problem's content_hash.
     """
     return (
-        db.query(models.Concept)
-        # return any records whose problem_statement contains the input (case-insensitive)
-        .filter(models.Concept.problem_statement.ilike(f"%{problem_statement}%"))
-        .order_by(models.Concept.generated_at)
-        .all()
+        select(models.Problem.content_hash, *(columns or (models.Concept,)))
+        .join_from(models.Concept, models.Problem, models.Concept.problem_id == models.Problem.id)
+        .where(models.Problem.content_hash.in_(hashes))
     )
 
+
+def get_concepts_for_problems(
+    db: Session,
+    problem_statements: list[str],
+    columns: tuple | None = None,
+) -> dict[str, list]:
+    """
+    Load the concepts of every problem in `problem_statements`, matched
+    by normalized content hash, in a single query.  Returns
+    {statement: [Concept, ...]} with each list ordered by generated_at;
+    statements with no concepts map to an empty list.  With `columns`
+    the lists hold plain rows of the problem's content_hash followed by
+    just those columns.
+    """
+    grouped: dict[str, list] = {stmt: [] for stmt in problem_statements}
+    if not grouped:
+        return grouped
+    by_hash: dict[str, list[str]] = {}
+    for stmt in grouped:
+        by_hash.setdefault(content_hash(stmt), []).append(stmt)
+    rows = db.execute(
+        concepts_by_problem_hash_stmt(list(by_hash), columns)
+        .order_by(models.Concept.generated_at, models.Concept.id)
+    ).all()
+    for row in rows:
+        for stmt in by_hash[row[0]]:
+            grouped[stmt].append(row if columns else row[1])
+    return grouped
+
 def create_concept(db: Session, concept_data: dict):
     """
     Insert a single concept into the database.
@@ -30,52 +203,680 @@ def create_concept(db: Session, concept_data: dict):
     return concept
 
 
-def create_concepts(db: Session, problem_statement: str, new_concepts: list[dict]):
+class ConceptValidationError(ValueError):
+    """Raised by the bulk path when one or more rows cannot be stored."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f"{len(errors)} invalid concept row(s)")
+        self.errors = errors
+
+
+def validate_concept_rows(rows: list[dict]) -> list[dict]:
+    """
+    Check rows against the `concepts` table definition before writing.
+    Returns a list of {"index", "field", "error"} dicts; empty means valid.
+    """
+    columns = models.Concept.__table__.columns
+    errors = []
+    for i, row in enumerate(rows):
+        for field in row:
+            if field not in columns:
+                errors.append({"index": i, "field": field, "error": "unknown field"})
+        for col in columns:
+            if col.primary_key or col.server_default is not None:
+                continue
+            val = row.get(col.name)
+            if val is None:
+                if not col.nullable:
+                    errors.append({"index": i, "field": col.name, "error": "field required"})
+                continue
+            max_len = getattr(col.type, "length", None)
+            if max_len and isinstance(val, str) and len(val) > max_len:
+                errors.append({
+                    "index": i,
+                    "field": col.name,
+                    "error": f"longer than {max_len} characters",
+                })
+    return errors
+
+
+def create_concepts(
+    db: Session,
+    problem_statement: str,
+    new_concepts: list[dict],
+    embed_problem: bool = True,
+):
     """
     Bulk-insert multiple new concepts for a given problem statement.
     Each dict in `new_concepts` may omit `problem_statement`; it will be applied.
+    The statement and the concepts are then embedded as EMBED_WRITE_MODE
+    says (see `_embed_written`); with `embed_problem=False` inline mode
+    leaves that to the caller, as the async routes await it themselves.
     Returns the list of created Concept objects.
     """
-    created = []
-    for data in new_concepts:
+    problem = get_or_create_problem(db, problem_statement)
+    created = [
         # ensure problem_statement is set
-        data_with_problem = {**data, "problem_statement": problem_statement}
-        obj = create_concept(db, data_with_problem)
-        created.append(obj)
+        models.Concept(**{**data, "problem_statement": problem_statement, "problem_id": problem.id})
+        for data in new_concepts
+    ]
+    db.add_all(created)
+    db.flush()
+    job_ids = _record_embedding_jobs(db, [problem.id], [c.id for c in created])
+    db.commit()
+
+    cache.invalidate_problem(problem_statement)
+    _embed_written(db, [c.id for c in created], [problem_statement], job_ids, inline=embed_problem)
+    return created
+
+
+def bulk_create_concepts(
+    db: Session,
+    problem_statement: str,
+    new_concepts: list[dict],
+    embed_problem: bool = True,
+):
+    """
+    All-or-nothing variant of `create_concepts`: validates every row, then
+    writes the batch in one transaction as a multi-row
+    INSERT ... RETURNING, so ids and generated_at come back without a
+    refresh per row.  Raises ConceptValidationError listing every bad row
+    before anything is written.
+    """
+    rows = [{**data, "problem_statement": problem_statement} for data in new_concepts]
+    errors = validate_concept_rows(rows)
+    if errors:
+        raise ConceptValidationError(errors)
+    if not rows:
+        return []
+    try:
+        problem = get_or_create_problem(db, problem_statement)
+        for row in rows:
+            row["problem_id"] = problem.id
+        created = db.scalars(
+            insert(models.Concept).returning(models.Concept, sort_by_parameter_order=True),
+            rows,
+        ).all()
+        job_ids = _record_embedding_jobs(db, [problem.id], [c.id for c in created])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    cache.invalidate_problem(problem_statement)
+    _embed_written(db, [c.id for c in created], [problem_statement], job_ids, inline=embed_problem)
     return created
 
 
-def get_similar_concepts(db: Session, problem_statement: str, top_k: int = 5):
-    """Return concepts whose problem statements are semantically similar."""
-    # embed query
-    q_emb = embed_text(problem_statement)
+# ─── Bulk import / export ─────────────────────────────────────────────────────
+# Columns an import may set; `id` is always assigned by the target database.
+IMPORT_COLUMNS = tuple(c.name for c in models.Concept.__table__.columns if c.name != "id")
+JSON_COLUMNS = {c.name for c in models.Concept.__table__.columns if isinstance(c.type, models.JSON)}
+
+
+def _copy_field(value) -> str:
+    """One field in COPY's text format."""
+    if value is None:
+        return "\\N"
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _copy_concept_rows(db: Session, rows: list[dict]) -> list[int]:
+    # COPY into a per-connection temp table, then one INSERT ... SELECT
+    # so generated_at can fall back to now() and the new ids come back
+    cols = ", ".join(f'"{c}"' for c in IMPORT_COLUMNS)
+    buf = io.StringIO()
+    for row in rows:
+        fields = (
+            json.dumps(row[c]) if c in JSON_COLUMNS and row.get(c) is not None else row.get(c)
+            for c in IMPORT_COLUMNS
+        )
+        buf.write("\t".join(_copy_field(v) for v in fields) + "\n")
+    buf.seek(0)
+    conn = db.connection()
+    with conn.connection.dbapi_connection.cursor() as cur:
+        cur.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS concepts_import ON COMMIT DELETE ROWS "
+            f"AS SELECT {cols} FROM concepts WITH NO DATA"
+        )
+        cur.copy_expert(f"COPY concepts_import ({cols}) FROM STDIN", buf)
+    select_cols = ", ".join(
+        "COALESCE(generated_at, now())" if c == "generated_at" else f'"{c}"' for c in IMPORT_COLUMNS
+    )
+    return list(conn.exec_driver_sql(
+        f"INSERT INTO concepts ({cols}) SELECT {select_cols} FROM concepts_import RETURNING id"
+    ).scalars())
+
+
+def insert_concept_rows(db: Session, rows: list[dict]) -> list[int]:
+    """
+    Write pre-validated concept rows (with problem_id set) in bulk,
+    without committing.  Postgres goes through COPY; other databases
+    get an executemany INSERT.  Returns the new ids.
+    """
+    if not rows:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _copy_concept_rows(db, rows)
+    ids = []
+    # rows without generated_at must omit the key so the server default applies
+    for stamped in (True, False):
+        group = [r for r in rows if (r.get("generated_at") is not None) == stamped]
+        if not stamped:
+            group = [{k: v for k, v in r.items() if k != "generated_at"} for r in group]
+        if group:
+            ids += db.scalars(insert(models.Concept).returning(models.Concept.id), group).all()
+    return ids
+
+
+def _generated_at_bound(dialect: str, ts, op: str):
+    col = models.Concept.generated_at
+    if dialect == "sqlite":
+        # see _after_concept: compare Julian days, not timestamp strings
+        col, ts = func.julianday(col), func.julianday(ts.isoformat(" "))
+    return col >= ts if op == ">=" else col < ts
+
+
+# ─── Filters and aggregates ───────────────────────────────────────────────────
+# TRL a concept is triaged on: the validated figure where there is one.
+# ix_concepts_effective_trl indexes exactly this expression.
+EFFECTIVE_TRL = func.coalesce(models.Concept.validated_trl, models.Concept.trl)
+
+# Concepts do not record their workflow; cross-industry runs are the ones
+# that fill these fields (see schemas.drop_workflow_fields).
+IS_CROSS_INDUSTRY = (
+    models.Concept.industry.is_not(None)
+    | models.Concept.original_solution.is_not(None)
+    | models.Concept.adaptation_challenges.is_not(None)
+)
+
+
+def _components_contain(dialect: str, value):
+    """`components @> value` on Postgres; db.json_contains elsewhere."""
+    if dialect == "postgresql":
+        # matches the expression of ix_concepts_components_gin
+        return cast(models.Concept.components, JSONB).contains(cast(literal(json.dumps(value)), JSONB))
+    return func.json_contains(models.Concept.components, json.dumps(value)) == 1
+
+
+def concept_filter_clauses(filters: ConceptFilters, dialect: str = "postgresql") -> list:
+    """WHERE clauses for `filters`; an empty list when none is set."""
+    c = models.Concept
+    clauses = []
+    if filters.agent:
+        clauses.append(c.agent.in_(filters.agent))
+    if filters.industry:
+        clauses.append(func.lower(c.industry).in_([i.lower() for i in filters.industry]))
+    if filters.trl_min is not None:
+        clauses.append(EFFECTIVE_TRL >= filters.trl_min)
+    if filters.trl_max is not None:
+        clauses.append(EFFECTIVE_TRL <= filters.trl_max)
+    if filters.since is not None:
+        clauses.append(_generated_at_bound(dialect, filters.since, ">="))
+    if filters.until is not None:
+        clauses.append(_generated_at_bound(dialect, filters.until, "<"))
+    if filters.workflow:
+        clauses.append(IS_CROSS_INDUSTRY if filters.workflow == "cross-industry" else ~IS_CROSS_INDUSTRY)
+    if filters.components is not None:
+        clauses.append(_components_contain(dialect, json.loads(filters.components)))
+    return clauses
+
+
+def export_concepts_stmt(filters: ConceptFilters, dialect: str = "postgresql"):
+    """Every concept matching `filters`, ordered by id."""
+    c = models.Concept
+    return select(c).where(*concept_filter_clauses(filters, dialect)).order_by(c.id)
+
+
+TRL_LEVELS = 10     # histogram buckets 0..9
+
+
+def concept_stats(
+    db: Session,
+    filters: ConceptFilters,
+    problem_statement: str | None = None,
+    min_acceptable_trl: float = MIN_ACCEPTABLE_TRL,
+) -> dict:
+    """
+    Counts and TRL histograms per (agent, workflow), aggregated in the
+    database: one GROUP BY over (agent, workflow, TRL bucket, acceptable)
+    returns at most a few dozen rows however many concepts match.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # no floor() or least() without the math extension; CAST truncates,
+        # which is floor for TRL >= 0
+        level = func.min(cast(EFFECTIVE_TRL, Integer), TRL_LEVELS - 1)
+    else:
+        level = func.least(cast(func.floor(EFFECTIVE_TRL), Integer), TRL_LEVELS - 1)
+    # label the derived columns in a subquery so GROUP BY can name them
+    rows = concepts_by_problem_stmt(problem_statement, dialect=dialect, filters=filters).order_by(None)
+    rows = rows.with_only_columns(
+        models.Concept.agent.label("agent"),
+        case((IS_CROSS_INDUSTRY, "cross-industry"), else_="traditional").label("workflow"),
+        level.label("level"),
+        (EFFECTIVE_TRL >= min_acceptable_trl).label("ok"),
+        EFFECTIVE_TRL.label("trl"),
+    ).subquery()
+    keys = (rows.c.agent, rows.c.workflow, rows.c.level, rows.c.ok)
+    stmt = select(*keys, func.count(), func.sum(rows.c.trl)).group_by(*keys)
+    groups: dict[tuple, dict] = {}
+    for agent, wf, level, ok, n, trl_sum in db.execute(stmt):
+        g = groups.setdefault((agent, wf), {
+            "agent": agent, "workflow": wf, "count": 0, "trl_unknown": 0, "acceptable": 0,
+            "trl_sum": 0.0, "trl_histogram": [0] * TRL_LEVELS,
+        })
+        g["count"] += n
+        if level is None:
+            g["trl_unknown"] += n
+            continue
+        g["trl_histogram"][level] += n
+        g["trl_sum"] += trl_sum
+        if ok:
+            g["acceptable"] += n
+    out = []
+    for key in sorted(groups, key=lambda k: (k[0] is None, k[0] or "", k[1])):
+        g = groups[key]
+        known = g["count"] - g["trl_unknown"]
+        g["trl_mean"] = g.pop("trl_sum") / known if known else None
+        out.append(g)
+    return {
+        "min_acceptable_trl": min_acceptable_trl,
+        "total": sum(g["count"] for g in out),
+        "groups": out,
+    }
+
+
+def _record_embedding_jobs(db: Session, problem_ids: list[int], concept_ids: list[int]) -> list[int]:
+    """
+    First half of embedding a write, inside its transaction: in
+    "background" mode add the embedding_jobs rows (the outbox) so they
+    commit with the write.  Returns the job ids for `_embed_written`.
+    """
+    if settings.EMBED_WRITE_MODE != "background":
+        return []
+    return embedding_queue.record(db, problem_ids, concept_ids)
+
+
+def _embed_written(
+    db: Session,
+    concept_ids: list[int],
+    problem_statements: list[str] = (),
+    job_ids: list[int] = (),
+    inline: bool = True,
+) -> None:
+    """
+    Second half, once the write has committed.  "background" hands
+    `job_ids` to the write-behind queue, so the request never waits on
+    Azure OpenAI; "inline" embeds the statements and concepts right here
+    (unless `inline=False`, for callers that do that step themselves).
+    """
+    if settings.EMBED_WRITE_MODE == "background":
+        embedding_queue.submit(job_ids)
+        return
+    if not inline:
+        return
+    for statement in problem_statements:
+        _embed_new_problem(db, statement)
+    if concept_ids:
+        concepts = db.scalars(select(models.Concept).where(models.Concept.id.in_(concept_ids))).all()
+        _embed_new_concepts(db, list(concepts))
+
 
-    # fetch unique problem statements
-    stmt_rows = (
-        db.query(models.Concept.problem_statement)
-        .distinct(models.Concept.problem_statement)
+def _embed_new_problem(db: Session, problem_statement: str) -> None:
+    # Embed the statement once at write time so similarity queries never
+    # have to.  An embedding outage must not lose the concepts; anything
+    # missed here is picked up by `backfill_embeddings.py`.
+    try:
+        ensure_problem_embedding(db, problem_statement)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not embed problem statement, left for backfill: {e}")
+
+
+def _embed_new_concepts(db: Session, concepts: list) -> None:
+    # same policy as _embed_new_problem: never fail the write
+    try:
+        embed_concepts(db, concepts)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not embed {len(concepts)} concept(s), left for backfill: {e}")
+
+
+def get_problem_embedding(db: Session, problem_statement: str, model: str = EMBED_MODEL):
+    """Return the stored ProblemEmbedding for a statement, or None."""
+    return (
+        db.query(models.ProblemEmbedding)
+        .filter(
+            models.ProblemEmbedding.content_hash == content_hash(problem_statement),
+            models.ProblemEmbedding.model == model,
+        )
+        .first()
+    )
+
+
+def ensure_problem_embedding(db: Session, problem_statement: str):
+    """
+    Embed and persist `problem_statement` unless an embedding for its
+    normalized text already exists.  Returns the ProblemEmbedding row.
+    """
+    existing = get_problem_embedding(db, problem_statement)
+    if existing:
+        return existing
+    return store_problem_embedding(db, problem_statement, embed_text(normalize_text(problem_statement)))
+
+
+def store_problem_embedding(db: Session, problem_statement: str, vec: list[float]):
+    """Persist an already computed vector for `problem_statement`."""
+    row = models.ProblemEmbedding(
+        content_hash=content_hash(problem_statement),
+        problem_statement=problem_statement,
+        model=EMBED_MODEL,
+        dim=len(vec),
+        vector=vector_to_bytes(vec),
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    similarity_index.index_embedding(row)
+    cache.invalidate_similar()
+    return row
+
+
+def embed_problem_statements(db: Session, statements: list[str]) -> int:
+    """
+    Embed, in one batched call, those of `statements` with no stored
+    vector yet.  A statement another worker stored meanwhile is skipped.
+    Returns the number stored.
+    """
+    pe = models.ProblemEmbedding
+    by_hash = {content_hash(s): s for s in statements}
+    have = set(db.scalars(
+        select(pe.content_hash).where(pe.content_hash.in_(list(by_hash)), pe.model == EMBED_MODEL)
+    ).all())
+    missing = [s for h, s in by_hash.items() if h not in have]
+    if not missing:
+        return 0
+    stored = 0
+    for stmt, vec in zip(missing, embed_texts([normalize_text(s) for s in missing])):
+        try:
+            store_problem_embedding(db, stmt, vec)
+            stored += 1
+        except IntegrityError:
+            db.rollback()
+    return stored
+
+
+def backfill_problem_embeddings(db: Session, chunk_size: int = 1000) -> int:
+    """
+    Embed every distinct problem statement that has no stored vector for
+    the current model.  Statements are embedded through the batch API and
+    committed `chunk_size` at a time.  Returns the number embedded.
+    """
+    have = {
+        h for (h,) in db.query(models.ProblemEmbedding.content_hash)
+        .filter(models.ProblemEmbedding.model == EMBED_MODEL)
         .all()
+    }
+    missing: dict[str, str] = {}
+    for (stmt,) in db.query(models.Concept.problem_statement).distinct().all():
+        h = content_hash(stmt)
+        if h not in have and h not in missing:
+            missing[h] = stmt
+
+    items = list(missing.items())
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        vectors = embed_texts([normalize_text(stmt) for _, stmt in chunk])
+        rows = [
+            models.ProblemEmbedding(
+                content_hash=h,
+                problem_statement=stmt,
+                model=EMBED_MODEL,
+                dim=len(vec),
+                vector=vector_to_bytes(vec),
+            )
+            for (h, stmt), vec in zip(chunk, vectors)
+        ]
+        db.add_all(rows)
+        db.commit()
+        cache.invalidate_similar()
+        logger.info(f"Backfilled {start + len(chunk)}/{len(items)} problem embeddings")
+    return len(items)
+
+
+# ─── Concept embeddings & search ──────────────────────────────────────────────
+def concept_embedding_text(title: str, description: str | None) -> str:
+    """The text a concept is embedded from: its title and description."""
+    return normalize_text(f"{title}\n{description or ''}")
+
+
+def concept_embedding_items(concepts: list) -> list[tuple[int, str]]:
+    """(concept_id, text to embed) for each concept."""
+    return [(c.id, concept_embedding_text(c.title, c.description)) for c in concepts]
+
+
+def store_concept_embeddings(db: Session, items: list[tuple[int, str]], vectors: list[list[float]]) -> None:
+    """
+    Persist already computed vectors for (concept_id, text) `items`,
+    replacing any stored for the current model, and apply them to the
+    live concept index.
+    """
+    if not items:
+        return
+    ce = models.ConceptEmbedding
+    db.query(ce).filter(
+        ce.concept_id.in_([cid for cid, _ in items]), ce.model == EMBED_MODEL
+    ).delete(synchronize_session=False)
+    rows = [
+        ce(
+            concept_id=cid,
+            content_hash=content_hash(text),
+            model=EMBED_MODEL,
+            dim=len(vec),
+            vector=vector_to_bytes(vec),
+        )
+        for (cid, text), vec in zip(items, vectors)
+    ]
+    db.add_all(rows)
+    db.flush()
+    indexed = [(row.concept_id, vec, row.id) for row, vec in zip(rows, vectors)]
+    db.commit()
+    concept_index.index_vectors(indexed, EMBED_MODEL)
+    cache.invalidate_similar()
+
+
+def embed_concepts(db: Session, concepts: list, skip_current: bool = False) -> None:
+    """
+    Embed `concepts` (one batched call) and store the vectors.  With
+    `skip_current`, concepts whose stored vector already matches their
+    text are left alone.
+    """
+    items = concept_embedding_items(concepts)
+    if skip_current and items:
+        ce = models.ConceptEmbedding
+        stored = dict(db.execute(
+            select(ce.concept_id, ce.content_hash)
+            .where(ce.concept_id.in_([cid for cid, _ in items]), ce.model == EMBED_MODEL)
+        ).all())
+        items = [(cid, text) for cid, text in items if stored.get(cid) != content_hash(text)]
+    if items:
+        store_concept_embeddings(db, items, embed_texts([text for _, text in items]))
+
+
+def backfill_concept_embeddings(db: Session, chunk_size: int = 1000) -> int:
+    """
+    Embed every concept with no stored vector for the current model,
+    `chunk_size` per batch call and commit.  Returns the number embedded.
+    """
+    ce = models.ConceptEmbedding
+    missing = db.scalars(
+        select(models.Concept.id)
+        .outerjoin(ce, (ce.concept_id == models.Concept.id) & (ce.model == EMBED_MODEL))
+        .where(ce.id.is_(None))
+        .order_by(models.Concept.id)
+    ).all()
+    for start in range(0, len(missing), chunk_size):
+        ids = missing[start:start + chunk_size]
+        concepts = db.scalars(select(models.Concept).where(models.Concept.id.in_(ids))).all()
+        embed_concepts(db, concepts)
+        logger.info(f"Backfilled {start + len(ids)}/{len(missing)} concept embeddings")
+    return len(missing)
+
+
+def search_concepts(
+    db: Session,
+    q_emb: list[float],
+    limit: int = 20,
+    agents: list[str] | None = None,
+    industries: list[str] | None = None,
+    trl_min: float | None = None,
+    trl_max: float | None = None,
+    min_score: float = -1.0,
+    nprobe: int | None = None,
+) -> list[tuple["models.Concept", float]]:
+    """
+    Concepts whose title + description are closest to `q_emb`, as
+    (concept, cosine) pairs, best first.
+
+    The ANN index proposes `limit * CONCEPT_INDEX_OVERFETCH` candidates;
+    one SELECT applies the filters to them and fetches their float32
+    vectors, which give the exact scores the results are ranked by.
+    When the filters leave fewer than `limit` rows the candidate pool
+    (and nprobe) is widened and the search repeated, up to a full scan.
+    TRL filters use `validated_trl` where set, else `trl`.
+    """
+    index = concept_index.get_index(db)
+    ce = models.ConceptEmbedding
+    filters = [ce.model == index.model, *concept_filter_clauses(
+        ConceptFilters(agent=agents, industry=industries, trl_min=trl_min, trl_max=trl_max),
+        db.get_bind().dialect.name,
+    )]
+
+    q = similarity_index.unit_vector(q_emb)
+    fetch = limit * CONCEPT_INDEX_OVERFETCH
+    probe = nprobe or index.nprobe
+    while True:
+        candidates = index.search(q, fetch, probe)
+        if not candidates:
+            return []
+        rows = db.execute(
+            select(models.Concept, ce.vector)
+            .join(ce, ce.concept_id == models.Concept.id)
+            .where(models.Concept.id.in_([cid for cid, _ in candidates]), *filters)
+        ).all()
+        complete = probe >= index.nlist and (len(candidates) < fetch or fetch >= len(index))
+        if len(rows) >= limit or complete:
+            break
+        fetch *= 4
+        probe = min(probe * 4, index.nlist)
+
+    scored = [
+        (concept, float(similarity_index.unit_vector(bytes_to_vector(raw)) @ q))
+        for concept, raw in rows
+    ]
+    scored = [hit for hit in scored if hit[1] >= min_score]
+    scored.sort(key=lambda hit: (-hit[1], hit[0].id))
+    return scored[:limit]
+
+
+def get_similar_concepts(
+    db: Session,
+    problem_statement: str,
+    top_k: int = 5,
+    min_similarity: float = similarity_index.DEFAULT_MIN_SIMILARITY,
+    **page,
+):
+    """
+    Return concepts whose problem statements are semantically similar,
+    best match first.  Statements scoring at or below `min_similarity`
+    are dropped inside the index and never loaded.  `page` is passed
+    through to `get_similar_concepts_for_vector`.
+    """
+    # embed query -- the only remote call; stored statements are pre-embedded
+    q_emb = embed_text(normalize_text(problem_statement))
+    return get_similar_concepts_for_vector(db, q_emb, top_k, min_similarity, **page)
+
+
+def rank_similar_statements(
+    db: Session,
+    q_emb: list[float],
+    top_k: int = 5,
+    min_similarity: float = similarity_index.DEFAULT_MIN_SIMILARITY,
+    limit: int | None = None,
+    after: tuple | None = None,
+) -> list[tuple[str, float]]:
+    """
+    (statement, similarity) pairs ordered by (similarity desc, statement);
+    `after` is the (similarity, statement) of the last group already
+    returned and `limit` caps the number of groups.
+    """
+    index = similarity_index.get_index(db)
+    matches = index.search(
+        q_emb, top_k, min_similarity,
+        exact_vectors=lambda keys: similarity_index.load_exact_vectors(db, keys, index.model),
     )
+    matches = sorted(matches, key=lambda m: (-m[1], m[0]))
+    if after:
+        last_sim, last_stmt = after
+        matches = [m for m in matches if m[1] < last_sim or (m[1] == last_sim and m[0] > last_stmt)]
+    if limit:
+        matches = matches[:limit]
+    return matches
 
-    sims = []
-    for (stmt,) in stmt_rows:
-        emb = embed_text(stmt)
-        sim = cosine_similarity(q_emb, emb)
-        sims.append((stmt, sim))
 
-    sims.sort(key=lambda x: x[1], reverse=True)
-    results = []
-    for stmt, sim in sims[:top_k]:
-        concepts = get_concepts_by_problem(db, stmt)
-        results.append({"problem_statement": stmt, "similarity": sim, "concepts": concepts})
-    return results
+def similar_concepts_stmt(ranked_statements: list[str], columns: tuple | None = None):
+    """
+    One SELECT for every concept of `ranked_statements`, ordered by the
+    statements' rank and then generated_at, so a streaming reader sees
+    each group contiguously and best match first.  Rows lead with the
+    problem's content_hash (see `concepts_by_problem_hash_stmt`).
+    """
+    hashes = [content_hash(stmt) for stmt in ranked_statements]
+    rank = case({h: i for i, h in enumerate(hashes)}, value=models.Problem.content_hash)
+    return (
+        concepts_by_problem_hash_stmt(hashes, columns)
+        .order_by(rank, models.Concept.generated_at, models.Concept.id)
+    )
+
+
+def get_similar_concepts_for_vector(
+    db: Session,
+    q_emb: list[float],
+    top_k: int = 5,
+    min_similarity: float = similarity_index.DEFAULT_MIN_SIMILARITY,
+    limit: int | None = None,
+    after: tuple | None = None,
+    columns: tuple | None = None,
+):
+    """
+    `get_similar_concepts` for a query that is already embedded; see
+    `rank_similar_statements` for the ordering and paging arguments.
+    """
+    matches = rank_similar_statements(db, q_emb, top_k, min_similarity, limit, after)
+    by_stmt = get_concepts_for_problems(db, [stmt for stmt, _ in matches], columns)
+    return [
+        {"problem_statement": stmt, "similarity": sim, "concepts": by_stmt[stmt]}
+        for stmt, sim in matches
+    ]
 
 def update_concept(db: Session, concept_id: int, update_data: dict):
-    concept = db.query(models.Concept).get(concept_id)
+    concept = get_concept(db, concept_id)
     if not concept:
         return None
+    old_text = concept_embedding_text(concept.title, concept.description)
     for field, val in update_data.items():
         setattr(concept, field, val)
+    text_changed = concept_embedding_text(concept.title, concept.description) != old_text
+    job_ids = _record_embedding_jobs(db, [], [concept.id]) if text_changed else []
     db.commit()
     db.refresh(concept)
+    cache.invalidate_problem(concept.problem_statement)
+    if text_changed:
+        _embed_written(db, [concept.id], job_ids=job_ids)
     return concept
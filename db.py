@@ -1,32 +1,345 @@
 # db.py
+import logging
 import os
-from sqlalchemy import create_engine
+import json
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
-from settings import Settings
+from settings import get_settings
+import metrics
+
+logger = logging.getLogger("uvicorn.error")
 
 # ─── Load settings ─────────────────────────────────────────────────────────────
 # Pydantic will read .env locally or actual env vars in Azure App Service
-settings = Settings()
+settings = get_settings()
 
 # ─── Build the full DATABASE_URL ───────────────────────────────────────────────
-db_url = str(settings.DATABASE_URL)   # type: ignore
-if "sslmode=" not in db_url:
-    # ensure SSL on Azure Postgres
-    sep = "&" if "?" in db_url else "?"
-    db_url = f"{db_url}{sep}sslmode=require"
-
-# ─── Create Engine & Session ───────────────────────────────────────────────────
-# pool_pre_ping helps recover dropped connections
-engine = create_engine(db_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-)
+def _full_url(url) -> str:
+    url = str(url)
+    if url.startswith("postgres") and "sslmode=" not in url:
+        # ensure SSL on Azure Postgres
+        sep = "&" if "?" in url else "?"
+        url = f"{url}{sep}sslmode=require"
+    return url
+
+
+db_url = _full_url(settings.DATABASE_URL)   # type: ignore
+# optional read replica; None sends every read to the primary
+read_url = _full_url(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else None
 
 # ─── Base Model for your ORM classes ────────────────────────────────────────────
 Base = declarative_base()
 
+# ─── Engine & Session (built on first use) ─────────────────────────────────────
+# `engine`, `SessionLocal`, `async_engine` and `AsyncSessionLocal` are
+# module attributes resolved lazily by `__getattr__` below, so importing
+# this module never loads a DB driver or touches the network.  main's
+# lifespan hook builds them before the first request unless
+# STARTUP_MODE=lazy.  The `read_*` / `*ReadSessionLocal` twins point at
+# DATABASE_READ_URL and are None when no replica is configured.
+_lock = threading.RLock()   # the read builders resolve their sync twin
+_built: dict = {}
+
+
+def _pool_options(poolclass, url: str = db_url) -> dict:
+    """Pool sizing from Settings.  SQLite keeps SQLAlchemy's default pool."""
+    options = {"pool_pre_ping": settings.DB_PRE_PING == "pessimistic"}
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=poolclass,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+# ─── SQLite stand-ins for Postgres operators ───────────────────────────────────
+def _contains(stored, wanted) -> bool:
+    if isinstance(wanted, dict):
+        return isinstance(stored, dict) and all(k in stored and _contains(stored[k], v) for k, v in wanted.items())
+    if isinstance(wanted, list):
+        return isinstance(stored, list) and all(any(_contains(s, w) for s in stored) for w in wanted)
+    # scalars: numbers compare by value (1 == 1.0) but never equal booleans
+    if isinstance(stored, (dict, list)) or isinstance(stored, bool) != isinstance(wanted, bool):
+        return False
+    return stored == wanted
+
+
+def json_contains(stored: Optional[str], wanted: str) -> int:
+    """jsonb `@>` over JSON text, registered as SQLite's json_contains()."""
+    if stored is None:
+        return 0
+    stored, wanted = json.loads(stored), json.loads(wanted)
+    # as in Postgres, a top-level array also contains a bare scalar
+    if isinstance(stored, list) and not isinstance(wanted, (dict, list)):
+        return int(any(_contains(s, wanted) for s in stored))
+    return int(_contains(stored, wanted))
+
+
+def _add_sqlite_functions(engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, record):
+        dbapi_conn.create_function("json_contains", 2, json_contains, deterministic=True)
+
+
+def _async_url(url: str) -> str:
+    """Swap the sync driver for its asyncio counterpart."""
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    scheme, rest = url.split("://", 1)
+    # asyncpg spells libpq's sslmode as ssl
+    return f"postgresql+asyncpg://{rest}".replace("sslmode=", "ssl=")
+
+
+def _build_sync() -> None:
+    engine = create_engine(db_url, **_pool_options(metrics.InstrumentedQueuePool))
+    metrics.instrument_engine(engine)
+    _add_sqlite_functions(engine)
+    _built["SessionLocal"] = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+    )
+    _built["engine"] = engine
+
+
+def _build_async() -> None:
+    # Built only when ASYNC_IO is enabled so the sync deployment doesn't need asyncpg.
+    if not settings.ASYNC_IO:
+        _built["async_engine"] = _built["AsyncSessionLocal"] = None
+        return
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(_async_url(db_url), **_pool_options(metrics.InstrumentedAsyncPool))
+    metrics.instrument_engine(async_engine.sync_engine)
+    _add_sqlite_functions(async_engine.sync_engine)
+    _built["AsyncSessionLocal"] = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    _built["async_engine"] = async_engine
+
+
+def _build_read() -> None:
+    if read_url is None:
+        _built["read_engine"] = _built["ReadSessionLocal"] = None
+        return
+    engine = create_engine(read_url, **_pool_options(metrics.InstrumentedQueuePool, read_url))
+    metrics.instrument_engine(engine)
+    _add_sqlite_functions(engine)
+    _built["ReadSessionLocal"] = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+    )
+    _built["read_engine"] = engine
+    replica.start(engine)
+
+
+def _build_async_read() -> None:
+    if read_url is None or not settings.ASYNC_IO:
+        _built["async_read_engine"] = _built["AsyncReadSessionLocal"] = None
+        return
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(_async_url(read_url), **_pool_options(metrics.InstrumentedAsyncPool, read_url))
+    metrics.instrument_engine(async_engine.sync_engine)
+    _add_sqlite_functions(async_engine.sync_engine)
+    _built["AsyncReadSessionLocal"] = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    _built["async_read_engine"] = async_engine
+    # health is probed through the sync engine
+    _resolve("read_engine")
+
+
+_BUILDERS = {
+    "engine": _build_sync,
+    "SessionLocal": _build_sync,
+    "async_engine": _build_async,
+    "AsyncSessionLocal": _build_async,
+    "read_engine": _build_read,
+    "ReadSessionLocal": _build_read,
+    "async_read_engine": _build_async_read,
+    "AsyncReadSessionLocal": _build_async_read,
+}
+
+
+def _resolve(name: str):
+    if name not in _built:
+        with _lock:
+            if name not in _built:
+                _BUILDERS[name]()
+    return _built[name]
+
+
+def __getattr__(name: str):
+    if name not in _BUILDERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _resolve(name)
+
+
+# ─── Read replica ──────────────────────────────────────────────────────────────
+# Replay lag as seen by the replica itself.  A replica that has replayed
+# everything it received reports 0 even when the primary has been idle
+# for a while (pg_last_xact_replay_timestamp alone would grow forever).
+_PG_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaMonitor:
+    """
+    Decides whether read-only routes may use the replica.  A daemon
+    thread probes it every REPLICA_CHECK_SECONDS; reads go to it while
+    the probe connects and replay lag is within REPLICA_MAX_LAG_SECONDS,
+    and to the primary otherwise.  A connection error hit by a request
+    takes it out of rotation until the next good probe.
+    """
+
+    def __init__(self, max_lag: float, interval: float):
+        self.max_lag = max_lag
+        self.interval = interval
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._engine = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._state_lock = threading.Lock()
+
+    def start(self, engine) -> None:
+        self._engine = engine
+        self.healthy = True     # optimistic until the first probe says otherwise
+        metrics.replica_serving.set(1.0)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def probe(self) -> bool:
+        try:
+            with self._engine.connect() as conn:
+                if self._engine.dialect.name == "postgresql":
+                    lag = float(conn.execute(_PG_LAG_SQL).scalar() or 0.0)
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0.0
+        except Exception as e:
+            self._set(False, None, f"unreachable: {e}")
+            return False
+        if lag > self.max_lag:
+            self._set(False, lag, f"{lag:.1f}s behind the primary")
+        else:
+            self._set(True, lag, None)
+        return self.healthy
+
+    def mark_down(self, error: Exception) -> None:
+        self._set(False, self.lag, str(error))
+
+    def _set(self, healthy: bool, lag: Optional[float], error: Optional[str]) -> None:
+        with self._state_lock:
+            if healthy and not self.healthy:
+                logger.info("Read replica back in rotation")
+            elif not healthy and self.healthy:
+                logger.warning(f"Read replica out of rotation ({error}); reads go to the primary")
+            self.healthy, self.lag, self.last_error = healthy, lag, error
+        metrics.replica_serving.set(1.0 if healthy else 0.0)
+        if lag is not None:
+            metrics.replica_lag.set(lag)
+
+
+replica = ReplicaMonitor(settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_SECONDS)
+
+
+def replica_in_use() -> bool:
+    """True while read-only routes are being served from the replica."""
+    return read_url is not None and replica.healthy and _built.get("read_engine") is not None
+
+
+def read_sessionmaker():
+    """ReadSessionLocal while the replica is usable, else SessionLocal."""
+    factory = _resolve("ReadSessionLocal")
+    return factory if factory is not None and replica.healthy else _resolve("SessionLocal")
+
+
+def async_read_sessionmaker():
+    """Async twin of `read_sessionmaker`."""
+    factory = _resolve("AsyncReadSessionLocal")
+    return factory if factory is not None and replica.healthy else _resolve("AsyncSessionLocal")
+
+
+# ─── Startup / shutdown (called from main's lifespan) ──────────────────────────
+def alembic_config(url=None):
+    """Alembic Config for this checkout, pointed at `url` when given."""
+    from alembic.config import Config
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    cfg = Config(os.path.join(here, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(here, "alembic"))
+    if url is not None:
+        cfg.set_main_option("sqlalchemy.url", url.render_as_string(hide_password=False).replace("%", "%%"))
+    return cfg
+
+
+def check_schema(engine) -> bool:
+    """
+    Warn when the database is not at the Alembic head revision; returns
+    whether it is.  Schema changes are applied with `alembic upgrade
+    head`, never by the app.
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    if current != head:
+        logger.warning(f"Database schema is at {current or 'no revision'}, code expects {head}; run `alembic upgrade head`")
+    return current == head
+
+
+def warm_up() -> None:
+    """Open the first pooled connection and verify the schema revision."""
+    check_schema(_resolve("engine"))
+    _resolve("async_engine")
+    if _resolve("read_engine") is not None:
+        replica.probe()
+        _resolve("async_read_engine")
+
+
+async def dispose() -> None:
+    replica.stop()
+    for name in ("engine", "read_engine"):
+        if _built.get(name) is not None:
+            _built[name].dispose()
+    for name in ("async_engine", "async_read_engine"):
+        if _built.get(name) is not None:
+            await _built[name].dispose()
+
+
 # ─── FastAPI Dependency ────────────────────────────────────────────────────────
 def get_db():
     """
@@ -35,8 +348,48 @@ def get_db():
         def read_items(db: Session = Depends(get_db)):
             ...
     """
-    db = SessionLocal()
+    db = _resolve("SessionLocal")()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """
+    Async twin of `get_db`, yielding an AsyncSession.  Sync crud helpers
+    run on it through `await db.run_sync(crud.fn, ...)`.
+    """
+    async with _resolve("AsyncSessionLocal")() as db:
+        yield db
+
+
+def get_read_db():
+    """
+    `get_db` for read-only routes: a replica session when DATABASE_READ_URL
+    is set and the replica is healthy, a primary session otherwise.
+    Routes that read back what the same client just wrote should keep
+    using `get_db`.
+    """
+    factory = read_sessionmaker()
+    db = factory()
     try:
         yield db
+    except OperationalError as e:
+        if factory is _built.get("ReadSessionLocal"):
+            replica.mark_down(e)
+        raise
     finally:
         db.close()
+
+
+async def get_async_read_db():
+    """Async twin of `get_read_db`."""
+    factory = async_read_sessionmaker()
+    async with factory() as db:
+        try:
+            yield db
+        except OperationalError as e:
+            if factory is _built.get("AsyncReadSessionLocal"):
+                replica.mark_down(e)
+            raise
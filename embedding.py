@@ -1,23 +1,274 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
 import numpy as np
-from openai import AzureOpenAI
-from config import PRODUCTS_ENDPOINT, PRODUCTS_OPENAI_KEY
+from timing import span
+from config import (
+    PRODUCTS_ENDPOINT,
+    PRODUCTS_OPENAI_KEY,
+    EMBED_BATCH_MAX_INPUTS,
+    EMBED_BATCH_MAX_CHARS,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_MAX_RETRIES,
+    EMBED_BACKOFF_BASE,
+    EMBED_BACKOFF_MAX,
+)
+
+if TYPE_CHECKING:
+    from openai import AzureOpenAI, AsyncAzureOpenAI
 
 API_VER = "2023-05-15"
 EMBED_MODEL = "text-embedding-3-large"
 
-_embed_client = AzureOpenAI(
-    azure_endpoint=PRODUCTS_ENDPOINT,
-    api_key=PRODUCTS_OPENAI_KEY,
-    api_version=API_VER,
-)
+# Built on first use: importing openai alone costs most of a second of boot time.
+_embed_client: AzureOpenAI | None = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> AzureOpenAI:
+    global _embed_client
+    if _embed_client is None:
+        with _client_lock:
+            if _embed_client is None:
+                if not PRODUCTS_ENDPOINT or not PRODUCTS_OPENAI_KEY:
+                    raise RuntimeError("PRODUCTS_ENDPOINT and PRODUCTS_OPENAI_KEY must be set to embed text")
+                from openai import AzureOpenAI
+                _embed_client = AzureOpenAI(
+                    azure_endpoint=PRODUCTS_ENDPOINT,
+                    api_key=PRODUCTS_OPENAI_KEY,
+                    api_version=API_VER,
+                )
+    return _embed_client
+
+
+def warm_up() -> None:
+    """Build the client ahead of the first request, if it is configured."""
+    if PRODUCTS_ENDPOINT and PRODUCTS_OPENAI_KEY:
+        _get_client()
+
+
+_WS_RE = re.compile(r"\s+")
+logger = logging.getLogger("uvicorn.error")
+
+# Caps simultaneous HTTP calls across every caller in this process.
+_http_slots = threading.BoundedSemaphore(EMBED_MAX_CONCURRENCY)
+
+# Single-flight table: (model, text) -> Future shared by concurrent callers.
+_inflight: dict[tuple[str, str], Future] = {}
+_inflight_lock = threading.Lock()
 
 
 def embed_text(text: str) -> list[float]:
     """Return embedding vector for *text* using Azure OpenAI."""
-    resp = _embed_client.embeddings.create(model=EMBED_MODEL, input=text)
-    return resp.data[0].embedding
+    return embed_texts([text])[0]
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # No HTTP status: connection reset / timeout before a response arrived.
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _batches(texts: list[str], max_inputs: int, max_chars: int) -> list[list[str]]:
+    """Greedily pack texts into request-sized groups, preserving order."""
+    out: list[list[str]] = []
+    cur: list[str] = []
+    chars = 0
+    for t in texts:
+        if cur and (len(cur) >= max_inputs or chars + len(t) > max_chars):
+            out.append(cur)
+            cur, chars = [], 0
+        cur.append(t)
+        chars += len(t)
+    if cur:
+        out.append(cur)
+    return out
+
+
+def _check_count(batch: list[str], vectors: list[list[float]]) -> None:
+    # a short response would leave some futures unresolved, and every
+    # caller waiting on those texts would block forever
+    if len(vectors) != len(batch):
+        raise RuntimeError(f"Embedding response had {len(vectors)} vectors for {len(batch)} inputs")
+
+
+def _embed_batch(client, model: str, batch: list[str]) -> list[list[float]]:
+    """One embeddings call with jittered exponential backoff on 429/5xx."""
+    attempt = 0
+    while True:
+        try:
+            with _http_slots:
+                resp = client.embeddings.create(model=model, input=batch)
+            data = sorted(resp.data, key=lambda d: getattr(d, "index", 0))
+            return [d.embedding for d in data]
+        except Exception as e:
+            if attempt >= EMBED_MAX_RETRIES or not _is_retryable(e):
+                raise
+            # "full jitter": spreads retries from many workers hitting one 429
+            delay = random.uniform(0, min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt))
+            logger.warning(f"Embedding batch of {len(batch)} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def embed_texts(
+    texts: list[str],
+    *,
+    model: str = EMBED_MODEL,
+    client=None,
+    max_inputs: int = EMBED_BATCH_MAX_INPUTS,
+    max_chars: int = EMBED_BATCH_MAX_CHARS,
+    max_concurrency: int = EMBED_MAX_CONCURRENCY,
+) -> list[list[float]]:
+    """
+    Embed many texts with as few round trips as possible.
+
+    Identical inputs are embedded once, the remainder is packed into
+    request-size-limited batches that run concurrently, and a text that
+    another thread is already embedding is awaited rather than re-sent.
+    Returns vectors in the same order as `texts`.  `client` defaults to
+    the module's Azure client; pass any object exposing
+    `.embeddings.create(model=, input=)` to run against a fake.
+    """
+    client = client or _get_client()
+    unique = list(dict.fromkeys(texts))
+
+    owned: dict[str, Future] = {}
+    waiting: dict[str, Future] = {}
+    with _inflight_lock:
+        for t in unique:
+            fut = _inflight.get((model, t))
+            if fut is None:
+                fut = owned[t] = Future()
+                _inflight[(model, t)] = fut
+            else:
+                waiting[t] = fut
+
+    def run(batch: list[str]) -> None:
+        try:
+            vectors = _embed_batch(client, model, batch)
+            _check_count(batch, vectors)
+            for t, v in zip(batch, vectors):
+                owned[t].set_result(v)
+        except BaseException as e:
+            for t in batch:
+                if not owned[t].done():
+                    owned[t].set_exception(e)
+        finally:
+            with _inflight_lock:
+                for t in batch:
+                    _inflight.pop((model, t), None)
+
+    with span("embed"):
+        batches = _batches(list(owned), max_inputs, max_chars)
+        if len(batches) == 1:
+            run(batches[0])
+        elif batches:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as pool:
+                list(pool.map(run, batches))
+
+        results = {t: f.result() for t, f in {**owned, **waiting}.items()}
+    return [results[t] for t in texts]
+
+
+# ─── Async variants (ASYNC_IO) ────────────────────────────────────────────────
+# Same batching / retry / single-flight rules as above, on the event loop.
+_aembed_client: AsyncAzureOpenAI | None = None
+_async_slots: asyncio.Semaphore | None = None
+_async_inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+
+def _get_async_client() -> AsyncAzureOpenAI:
+    global _aembed_client
+    if _aembed_client is None:
+        if not PRODUCTS_ENDPOINT or not PRODUCTS_OPENAI_KEY:
+            raise RuntimeError("PRODUCTS_ENDPOINT and PRODUCTS_OPENAI_KEY must be set to embed text")
+        from openai import AsyncAzureOpenAI
+        _aembed_client = AsyncAzureOpenAI(
+            azure_endpoint=PRODUCTS_ENDPOINT,
+            api_key=PRODUCTS_OPENAI_KEY,
+            api_version=API_VER,
+        )
+    return _aembed_client
+
+
+async def _aembed_batch(client, model: str, batch: list[str]) -> list[list[float]]:
+    global _async_slots
+    if _async_slots is None:
+        _async_slots = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+    attempt = 0
+    while True:
+        try:
+            async with _async_slots:
+                resp = await client.embeddings.create(model=model, input=batch)
+            data = sorted(resp.data, key=lambda d: getattr(d, "index", 0))
+            return [d.embedding for d in data]
+        except Exception as e:
+            if attempt >= EMBED_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt))
+            logger.warning(f"Embedding batch of {len(batch)} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def aembed_texts(
+    texts: list[str],
+    *,
+    model: str = EMBED_MODEL,
+    client=None,
+    max_inputs: int = EMBED_BATCH_MAX_INPUTS,
+    max_chars: int = EMBED_BATCH_MAX_CHARS,
+) -> list[list[float]]:
+    """Async counterpart of :func:`embed_texts`."""
+    client = client or _get_async_client()
+    loop = asyncio.get_running_loop()
+    owned: dict[str, asyncio.Future] = {}
+    waiting: dict[str, asyncio.Future] = {}
+    for t in dict.fromkeys(texts):
+        fut = _async_inflight.get((model, t))
+        if fut is None:
+            fut = owned[t] = loop.create_future()
+            _async_inflight[(model, t)] = fut
+        else:
+            waiting[t] = fut
+
+    async def run(batch: list[str]) -> None:
+        try:
+            vectors = await _aembed_batch(client, model, batch)
+            _check_count(batch, vectors)
+            for t, v in zip(batch, vectors):
+                owned[t].set_result(v)
+        except BaseException as e:
+            for t in batch:
+                if not owned[t].done():
+                    owned[t].set_exception(e)
+        finally:
+            for t in batch:
+                _async_inflight.pop((model, t), None)
+
+    with span("embed"):
+        await asyncio.gather(*(run(b) for b in _batches(list(owned), max_inputs, max_chars)))
+        results = {t: await f for t, f in {**owned, **waiting}.items()}
+    return [results[t] for t in texts]
+
+
+async def aembed_text(text: str) -> list[float]:
+    """Async counterpart of :func:`embed_text`."""
+    return (await aembed_texts([text]))[0]
 
 
 def cosine_similarity(a: list[float], b: list[float]) -> float:
@@ -28,3 +279,24 @@ def cosine_similarity(a: list[float], b: list[float]) -> float:
     if denom == 0:
         return 0.0
     return float(np.dot(va, vb) / denom)
+
+
+# ─── Persisted vectors ────────────────────────────────────────────────────────
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace so cosmetic edits share one embedding."""
+    return _WS_RE.sub(" ", text).strip()
+
+
+def content_hash(text: str) -> str:
+    """Stable sha256 key for the normalized form of *text*."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def vector_to_bytes(vec: list[float]) -> bytes:
+    """Pack an embedding as little-endian float32 for a LargeBinary column."""
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+
+def bytes_to_vector(raw: bytes) -> np.ndarray:
+    """Inverse of :func:`vector_to_bytes`."""
+    return np.frombuffer(raw, dtype="<f4")
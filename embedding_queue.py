@@ -0,0 +1,395 @@
+# embedding_queue.py
+"""Write-behind embedding, so POST /concepts never waits on Azure OpenAI.
+
+A write records one `embedding_jobs` row per new concept and per problem
+statement (the outbox) in the same transaction as the write and, once
+that commits, hands the job ids to an in-process queue.  A pool of
+EMBED_QUEUE_WORKERS threads drains it in batches of up to
+EMBED_QUEUE_BATCH: each batch is claimed with a lease, embedded with one
+embed_texts call per kind, stored (which also updates the similarity and
+concept indexes) and its jobs deleted.
+
+The table, not the queue, is the source of truth.  A poller re-reads due,
+unclaimed jobs every EMBED_QUEUE_POLL_SECONDS, so work left behind by a
+restart, by another worker process or by a full queue is resumed, and a
+worker that died mid-batch just lets its lease expire.  Failed batches
+are retried with exponential backoff; after EMBED_JOB_MAX_ATTEMPTS a job
+is parked (visible in `status()`, re-embedded by backfill_embeddings.py).
+A job re-enqueued while being worked on (the concept was edited again)
+gets a new `enqueued_at` and is not deleted by the older run.
+
+Backpressure: the in-memory queue holds at most EMBED_QUEUE_MAX_QUEUED
+ids (the rest wait in the table for the poller) and `overloaded()`
+turns true once EMBED_QUEUE_MAX_PENDING jobs are outstanding; the create
+routes then answer 503 with Retry-After instead of growing the backlog.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+import crud
+import db as db_module
+import models
+from settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("uvicorn.error")
+
+KINDS = ("problem", "concept")
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 600
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(ts: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands DateTime(timezone=True) back naive; it was stored as UTC
+    return ts.replace(tzinfo=timezone.utc) if ts is not None and ts.tzinfo is None else ts
+
+
+def _upsert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(models.EmbeddingJob)
+    # re-enqueueing restarts the job: fresh attempts, due now
+    return stmt.on_conflict_do_update(
+        index_elements=["kind", "ref_id"],
+        set_={
+            "attempts": 0,
+            "last_error": None,
+            "enqueued_at": stmt.excluded.enqueued_at,
+            "next_attempt_at": stmt.excluded.next_attempt_at,
+        },
+    ).returning(models.EmbeddingJob.id)
+
+
+def record(db: Session, problem_ids: list[int], concept_ids: list[int]) -> list[int]:
+    """
+    Add embedding jobs to `db`'s open transaction, so they commit (or roll
+    back) together with the write that needs them.  Returns the job ids;
+    pass them to `submit` once that transaction has committed.
+    """
+    now = _now()
+    rows = [
+        {"kind": kind, "ref_id": ref, "attempts": 0, "enqueued_at": now, "next_attempt_at": now}
+        for kind, refs in (("problem", problem_ids), ("concept", concept_ids))
+        for ref in dict.fromkeys(refs)
+    ]
+    if not rows:
+        return []
+    return list(db.scalars(_upsert(db.get_bind().dialect.name), rows).all())
+
+
+def submit(job_ids: list[int]) -> None:
+    """Offer committed jobs to this worker's queue (the poller finds them regardless)."""
+    if job_ids:
+        get_queue().submit(job_ids)
+
+
+def _run_jobs(db: Session, jobs: list) -> None:
+    """Embed and store everything `jobs` refer to (rows deleted meanwhile are skipped)."""
+    problem_ids = [j.ref_id for j in jobs if j.kind == "problem"]
+    concept_ids = [j.ref_id for j in jobs if j.kind == "concept"]
+    if problem_ids:
+        statements = db.scalars(
+            select(models.Problem.problem_statement).where(models.Problem.id.in_(problem_ids))
+        ).all()
+        crud.embed_problem_statements(db, list(statements))
+    if concept_ids:
+        concepts = db.scalars(select(models.Concept).where(models.Concept.id.in_(concept_ids))).all()
+        crud.embed_concepts(db, list(concepts), skip_current=True)
+
+
+class EmbeddingQueue:
+    """Bounded in-memory queue of job ids plus the worker and poller threads."""
+
+    def __init__(
+        self,
+        workers: int = settings.EMBED_QUEUE_WORKERS,
+        batch_size: int = settings.EMBED_QUEUE_BATCH,
+        linger: float = settings.EMBED_QUEUE_LINGER_MS / 1000,
+        max_queued: int = settings.EMBED_QUEUE_MAX_QUEUED,
+        max_pending: int = settings.EMBED_QUEUE_MAX_PENDING,
+        poll_interval: float = settings.EMBED_QUEUE_POLL_SECONDS,
+        lease: float = settings.EMBED_QUEUE_LEASE_SECONDS,
+        max_attempts: int = settings.EMBED_JOB_MAX_ATTEMPTS,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._queue: queue.Queue[int] = queue.Queue(maxsize=max_queued)
+        self._queued: set[int] = set()         # ids in the queue, so the poller doesn't repeat them
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        # counters for status()
+        self.processed = 0
+        self.failed_batches = 0
+        self.overflowed = 0
+        self.last_error: Optional[str] = None
+        self.last_batch_ms: Optional[float] = None
+        self._pending_seen = 0                 # outstanding jobs at the last poll ...
+        self._submitted_since_poll = 0         # ... plus those added since
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    # ─── Lifecycle ───────────────────────────────────────────────────────────
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"embed-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ] + [threading.Thread(target=self._poll_loop, name="embed-poller", daemon=True)]
+            for t in self._threads:
+                t.start()
+        logger.info(f"Embedding queue started with {self.workers} worker(s)")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the threads; unfinished jobs stay in the table for next time."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(deadline - time.monotonic(), 0))
+
+    # ─── Producer side ───────────────────────────────────────────────────────
+    def submit(self, job_ids: list[int], new: bool = True) -> None:
+        """
+        Queue job ids; those that don't fit wait in the table for the
+        poller.  `new` is False for ids the poller re-reads from the table.
+        """
+        self.start()
+        with self._lock:
+            if new:
+                self._submitted_since_poll += len(job_ids)
+            for job_id in job_ids:
+                if job_id in self._queued:
+                    continue
+                try:
+                    self._queue.put_nowait(job_id)
+                except queue.Full:
+                    self.overflowed += 1
+                    continue
+                self._queued.add(job_id)
+
+    def overloaded(self) -> bool:
+        """True once the outstanding backlog reaches EMBED_QUEUE_MAX_PENDING."""
+        return self._pending_seen + self._submitted_since_poll >= self.max_pending
+
+    def poll_once(self) -> int:
+        """Refresh the backlog count and queue due, unclaimed jobs.  Returns ids queued."""
+        job = models.EmbeddingJob
+        now = _now()
+        with db_module.SessionLocal() as db:
+            pending = db.scalar(select(func.count()).select_from(job).where(job.attempts < self.max_attempts))
+            with self._lock:
+                self._pending_seen, self._submitted_since_poll = pending or 0, 0
+                room = self._queue.maxsize - self._queue.qsize()
+                skip = list(self._queued)
+            if room <= 0 or not pending:
+                return 0
+            stmt = (
+                select(job.id)
+                .where(
+                    job.attempts < self.max_attempts,
+                    job.next_attempt_at <= now,
+                    (job.claimed_until.is_(None)) | (job.claimed_until < now),
+                )
+                .order_by(job.next_attempt_at, job.id)
+                .limit(room)
+            )
+            if skip:
+                stmt = stmt.where(job.id.not_in(skip))
+            due = db.scalars(stmt).all()
+        before = self.overflowed
+        self.submit(list(due), new=False)
+        return len(due) - (self.overflowed - before)
+
+    def _poll_loop(self) -> None:
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning(f"Embedding queue poll failed: {e}")
+            if self._stop.wait(self.poll_interval):
+                return
+
+    # ─── Consumer side ───────────────────────────────────────────────────────
+    def _next_batch(self) -> list[int]:
+        try:
+            batch = [self._queue.get(timeout=min(self.poll_interval, 1.0))]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            wait = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.process(batch)
+            except Exception as e:
+                # claim/bookkeeping failed (DB down); the lease brings the jobs back
+                logger.warning(f"Embedding batch of {len(batch)} job(s) not processed: {e}")
+            finally:
+                with self._lock:
+                    self._queued.difference_update(batch)
+
+    def process(self, job_ids: list[int]) -> int:
+        """Claim, run and retire `job_ids`.  Returns the number of jobs completed."""
+        job = models.EmbeddingJob
+        token = str(uuid.uuid4())
+        started = time.perf_counter()
+        with db_module.SessionLocal() as db:
+            now = _now()
+            db.execute(
+                update(job)
+                .where(
+                    job.id.in_(job_ids),
+                    job.attempts < self.max_attempts,
+                    (job.claimed_until.is_(None)) | (job.claimed_until < now),
+                )
+                .values(claimed_by=token, claimed_until=now + timedelta(seconds=self.lease))
+            )
+            db.commit()
+            claimed = db.execute(
+                select(job.id, job.kind, job.ref_id, job.attempts, job.enqueued_at).where(job.claimed_by == token)
+            ).all()
+            if not claimed:
+                return 0
+            try:
+                _run_jobs(db, claimed)
+            except Exception as e:
+                db.rollback()
+                self._fail(db, claimed, token, e)
+                return 0
+            # an edit that re-enqueued a job while it ran bumped enqueued_at;
+            # leave that one for its next run
+            for row in claimed:
+                db.execute(delete(job).where(job.id == row.id, job.enqueued_at == row.enqueued_at))
+            db.execute(update(job).where(job.claimed_by == token).values(claimed_by=None, claimed_until=None))
+            db.commit()
+        self.processed += len(claimed)
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(claimed)
+
+    def _fail(self, db: Session, claimed: list, token: str, error: Exception) -> None:
+        job = models.EmbeddingJob
+        self.failed_batches += 1
+        self.last_error = str(error)
+        logger.warning(f"Embedding batch of {len(claimed)} job(s) failed, will retry: {error}")
+        now = _now()
+        for row in claimed:
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** row.attempts)
+            db.execute(
+                update(job)
+                .where(job.id == row.id, job.claimed_by == token)
+                .values(
+                    attempts=job.attempts + 1,
+                    last_error=str(error)[:2000],
+                    next_attempt_at=now + timedelta(seconds=delay),
+                    claimed_by=None,
+                    claimed_until=None,
+                )
+            )
+        db.commit()
+
+    def drain(self, include_parked: bool = False) -> int:
+        """
+        Run every outstanding job in the calling thread (backfill script).
+        `include_parked` first gives parked jobs a fresh set of attempts.
+        Returns the number of jobs completed.
+        """
+        job = models.EmbeddingJob
+        with db_module.SessionLocal() as db:
+            if include_parked:
+                db.execute(update(job).where(job.attempts >= self.max_attempts).values(attempts=0))
+                db.commit()
+            ids = db.scalars(select(job.id).where(job.attempts < self.max_attempts).order_by(job.id)).all()
+        done = 0
+        for start in range(0, len(ids), self.batch_size):
+            done += self.process(list(ids[start:start + self.batch_size]))
+        return done
+
+    # ─── Status ──────────────────────────────────────────────────────────────
+    def status(self, db: Session) -> dict:
+        """Queue depth and lag, for GET /embeddings/status."""
+        job = models.EmbeddingJob
+        live = job.attempts < self.max_attempts
+        pending = dict(db.execute(select(job.kind, func.count()).where(live).group_by(job.kind)).all())
+        parked = db.scalar(select(func.count()).select_from(job).where(~live)) or 0
+        oldest = _aware(db.scalar(select(func.min(job.enqueued_at)).where(live)))
+        return {
+            "mode": settings.EMBED_WRITE_MODE,
+            "running": self.running,
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "pending": {kind: pending.get(kind, 0) for kind in KINDS},
+            "parked": parked,
+            "max_pending": self.max_pending,
+            "overloaded": self.overloaded(),
+            "lag_seconds": (_now() - oldest).total_seconds() if oldest else 0.0,
+            "processed": self.processed,
+            "failed_batches": self.failed_batches,
+            "overflowed": self.overflowed,
+            "last_batch_ms": self.last_batch_ms,
+            "last_error": self.last_error,
+        }
+
+
+_queue: EmbeddingQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> EmbeddingQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = EmbeddingQueue()
+    return _queue
+
+
+def start() -> None:
+    """Start the workers and queue work left over from a previous run (lifespan hook)."""
+    if settings.EMBED_WRITE_MODE == "background":
+        get_queue().start()
+
+
+def stop() -> None:
+    if _queue is not None:
+        _queue.stop()
+
+
+def overloaded() -> bool:
+    return settings.EMBED_WRITE_MODE == "background" and _queue is not None and _queue.overloaded()
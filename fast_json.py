@@ -0,0 +1,87 @@
+# fast_json.py
+"""Opt-in fast encoder for full-view concept listings (FAST_JSON=true).
+
+By default a listing loads Concept objects, the driver parses every JSON
+column, FastAPI validates the objects against `List[ConceptRead]` and
+then encodes them again.  Here the rows are plain tuples of
+crud.READ_COLUMNS, with the JSON columns still as their stored text.
+Runs of plain fields are encoded one dict at a time with orjson, or
+pydantic_core's encoder when orjson is not installed, and the stored
+JSON is spliced in unparsed.
+
+Bodies have ConceptRead's keys in ConceptRead's order and the same
+values.  Only whitespace inside the JSON columns can differ from the
+default path.
+"""
+from __future__ import annotations
+
+import functools
+from typing import Iterable, Sequence
+
+import pydantic_core
+from fastapi import Response
+
+import crud
+
+try:
+    import orjson
+except ImportError:         # optional: pydantic_core is a little slower
+    orjson = None
+
+if orjson is not None:
+    _dumps = functools.partial(orjson.dumps, option=orjson.OPT_UTC_Z)
+else:
+    _dumps = functools.partial(pydantic_core.to_json, inf_nan_mode="null")
+
+
+def _segments(fields: Sequence[str], raw: set[str]) -> list[tuple]:
+    """(slice, names) for each run of plain fields, (index, b'"name":') for each raw JSON one."""
+    segments: list[tuple] = []
+    start = None
+    for i, name in enumerate(fields):
+        if name in raw:
+            if start is not None:
+                segments.append((slice(start, i), tuple(fields[start:i])))
+                start = None
+            segments.append((i, _dumps(name) + b":"))
+        elif start is None:
+            start = i
+    if start is not None:
+        segments.append((slice(start, len(fields)), tuple(fields[start:])))
+    return segments
+
+
+_CONCEPT = _segments(crud.READ_FIELDS, crud.JSON_COLUMNS)
+
+
+def encode_concept(row: Sequence) -> bytes:
+    """One ConceptRead object from a crud.READ_COLUMNS row."""
+    parts = []
+    for where, what in _CONCEPT:
+        if type(where) is slice:
+            parts.append(_dumps(dict(zip(what, row[where])))[1:-1])
+        else:
+            value = row[where]
+            parts.append(what + (b"null" if value is None else value.encode("utf-8")))
+    return b"{" + b",".join(parts) + b"}"
+
+
+def encode_concepts(rows: Iterable[Sequence]) -> bytes:
+    return b"[" + b",".join([encode_concept(row) for row in rows]) + b"]"
+
+
+def concepts_response(rows: Iterable[Sequence]) -> Response:
+    """A List[ConceptRead] body from crud.READ_COLUMNS rows."""
+    return Response(content=encode_concepts(rows), media_type="application/json")
+
+
+def grouped_response(groups: dict[str, list]) -> Response:
+    """
+    A List[ProblemConcepts] body from crud.get_concepts_for_problems
+    called with crud.READ_COLUMNS (each row leads with its problem's hash).
+    """
+    body = b"[" + b",".join([
+        b'{"problem_statement":' + _dumps(stmt) + b',"concepts":' + encode_concepts(row[1:] for row in rows) + b"}"
+        for stmt, rows in groups.items()
+    ]) + b"]"
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,133 @@
+# http_ranges.py
+"""Helpers for conditional and ranged GETs of proposal blobs (RFC 9110)."""
+from __future__ import annotations
+
+import mimetypes
+import unicodedata
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _etag_list(header: str) -> list[str]:
+    return [t.strip().removeprefix("W/") for t in header.split(",")]
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """True when the client's cached copy is current and a 304 will do."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # If-None-Match takes precedence; If-Modified-Since is then ignored
+        return inm.strip() == "*" or etag in _etag_list(inm)
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def requested_range(request: Request, size: int, etag: str) -> Optional[tuple[int, int]]:
+    """
+    Resolve the `Range` header to an inclusive (start, end) byte span, or
+    None for a full response.  Multi-range requests and stale `If-Range`
+    validators fall back to the full body, as RFC 9110 allows.  Raises
+    RangeNotSatisfiable when no requested byte exists.
+    """
+    header = request.headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":                       # suffix: last N bytes
+            n = int(last)
+            if n <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - n, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None                           # malformed: ignore the header
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """
+    `disposition; filename="..."` with an ASCII fallback name plus an RFC
+    5987 `filename*` carrying the real one (RFC 6266), so non-Latin-1
+    names survive Starlette's latin-1 header encoding.
+    """
+    fallback = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    fallback = "".join(c if c.isprintable() and c not in '"\\' else "_" for c in fallback).strip()
+    stem, dot, ext = fallback.rpartition(".") if "." in fallback else (fallback, "", "")
+    if not stem.strip("._ "):
+        # nothing of the name survived; keep the extension at least
+        fallback = "proposal" + dot + ext
+    value = f'{disposition}; filename="{fallback}"'
+    if fallback != filename:
+        value += f"; filename*=UTF-8''{quote(filename, safe='')}"
+    return value
+
+
+def proposal_headers(
+    blob_name: str,
+    size: int,
+    etag: str,
+    last_modified: Optional[datetime],
+    content_type: Optional[str],
+) -> dict[str, str]:
+    """Validators and content headers shared by 200, 206 and 304 responses."""
+    filename = blob_name.rsplit("/", 1)[-1].split("-", 5)[-1]
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "content-type": (
+            content_type
+            if content_type and content_type != "application/octet-stream"
+            else mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        ),
+        "content-disposition": content_disposition("inline", filename),
+        "content-length": str(size),
+    }
+    if last_modified is not None:
+        headers["last-modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(416, "Requested range not satisfiable", headers={"content-range": f"bytes */{size}"})
+
+
+def plan_download(request: Request, blob_name: str, props) -> tuple[int, dict[str, str], Optional[int], Optional[int]]:
+    """
+    Decide how to answer a proposal GET from the blob's properties.
+    Returns (status, headers, offset, length); status is 304, 206 or 200
+    and offset/length are what to pass to `download_blob`.
+    """
+    size, etag = props.size, props.etag
+    headers = proposal_headers(blob_name, size, etag, props.last_modified, props.content_settings.content_type)
+    if is_not_modified(request, etag, props.last_modified):
+        return 304, {k: v for k, v in headers.items() if k in ("etag", "last-modified")}, None, None
+    try:
+        span = requested_range(request, size, etag)
+    except RangeNotSatisfiable:
+        raise not_satisfiable(size)
+    if span is None:
+        return 200, headers, None, None
+    start, end = span
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    headers["content-length"] = str(end - start + 1)
+    return 206, headers, start, end - start + 1
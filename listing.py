@@ -0,0 +1,115 @@
+# listing.py
+"""Page builders for the read endpoints, shared by main and async_api.
+
+Each function takes a sync Session first so the async routes can run it
+unchanged through `AsyncSession.run_sync`.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+import crud
+import fast_json
+from pagination import decode_cursor, encode_cursor, set_next_cursor, split_page
+from schemas import ConceptFilters, ProblemOut, summary_response
+from settings import get_settings
+import streaming
+
+settings = get_settings()
+
+
+def _fetch(limit: Optional[int]) -> Optional[int]:
+    # one extra row tells us whether there is a next page
+    return limit + 1 if limit else None
+
+
+def _concept_columns(view: str):
+    """Columns to select for `view`; None loads Concept objects for response_model."""
+    if view == "summary":
+        return crud.SUMMARY_COLUMNS
+    return crud.READ_COLUMNS if settings.FAST_JSON else None
+
+
+def concepts_page(
+    db: Session,
+    request: Request,
+    response: Response,
+    problem_statement: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str],
+    view: str,
+    filters: Optional[ConceptFilters] = None,
+):
+    """GET /concepts, keyset-paged on (generated_at, id)."""
+    if streaming.wants_ndjson(request):
+        return streaming.concepts_stream(problem_statement, limit, cursor, view, filters=filters)
+    after = decode_cursor(cursor, datetime, int) if cursor else None
+    columns = _concept_columns(view)
+    rows = crud.get_concepts_by_problem(db, problem_statement, _fetch(limit), after, columns, filters)
+    page, more = split_page(rows, limit)
+    if view == "summary":
+        response = summary_response(page)
+    elif columns:
+        response = fast_json.concepts_response(page)
+    set_next_cursor(request, response, encode_cursor(page[-1].generated_at, page[-1].id) if more else None)
+    return response if columns else page
+
+
+def problems_page(
+    db: Session,
+    request: Request,
+    response: Response,
+    limit: Optional[int],
+    cursor: Optional[str],
+):
+    """GET /problems, keyset-paged on (problem_statement, id) to keep its alphabetical order."""
+    after = decode_cursor(cursor, str, int) if cursor else None
+    page, more = split_page(crud.list_problems(db, _fetch(limit), after), limit)
+    set_next_cursor(request, response, encode_cursor(*page[-1]) if more else None)
+    return [ProblemOut(problem_statement=stmt) for stmt, _ in page]
+
+
+def batch_lookup(db: Session, problem_statements: list[str], view: str):
+    """
+    POST /concepts/batch-lookup: the concepts of every statement, exact
+    match, from one query.  Groups follow the request order (duplicates
+    dropped); a statement with no concepts gets an empty list.
+    """
+    columns = _concept_columns(view)
+    grouped = crud.get_concepts_for_problems(db, list(dict.fromkeys(problem_statements)), columns)
+    if view != "summary" and columns:
+        return fast_json.grouped_response(grouped)
+    groups = [{"problem_statement": stmt, "concepts": concepts} for stmt, concepts in grouped.items()]
+    return summary_response(groups, grouped=True) if view == "summary" else groups
+
+
+def similar_page(
+    db: Session,
+    request: Request,
+    response: Response,
+    q_emb: list[float],
+    top_k: int,
+    min_similarity: float,
+    limit: Optional[int],
+    cursor: Optional[str],
+    view: str,
+):
+    """GET /concepts/similar, keyset-paged on (similarity desc, problem_statement)."""
+    after = decode_cursor(cursor, float, str) if cursor else None
+    if streaming.wants_ndjson(request):
+        ranked = crud.rank_similar_statements(db, q_emb, top_k, min_similarity, limit, after)
+        return streaming.similar_stream(ranked, view)
+    results = crud.get_similar_concepts_for_vector(
+        db, q_emb, top_k, min_similarity,
+        limit=_fetch(limit),
+        after=after,
+        columns=crud.SUMMARY_COLUMNS if view == "summary" else None,
+    )
+    page, more = split_page(results, limit)
+    if view == "summary":
+        response = summary_response(page, similar=True)
+    last = page[-1] if more else None
+    set_next_cursor(request, response, encode_cursor(last["similarity"], last["problem_statement"]) if last else None)
+    return response if view == "summary" else page
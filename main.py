@@ -1,27 +1,92 @@
 # main.py
-from typing import List, Optional, Any
-from fastapi import Request
+from typing import List, Optional, Literal
+from fastapi import Request, Response
 from fastapi import FastAPI, Depends, Body, File, UploadFile, HTTPException, Query
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from pydantic import BaseModel
+from fastapi.routing import APIRoute
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
-from datetime import datetime
+import os
+import time
 import uuid
+import mimetypes
 import traceback
 import logging
 
 import crud
-import models
-from db import get_db, engine
-from storage import get_container_client
+import db as db_module
+from db import get_db, get_read_db, settings
+from storage import get_container_client, blob_name_from_url, upload_sas_url, download_sas_url
+import storage
+from starlette.concurrency import run_in_threadpool
+from http_ranges import plan_download
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotFoundError
+from similarity_index import DEFAULT_MIN_SIMILARITY
+import embedding
+import concept_index
+import embedding_queue
+import bulk_io
+import sections
+from embedding import embed_text, normalize_text
+from schemas import (
+    ConceptBatchLookup,
+    ConceptCreate,
+    ConceptFilters,
+    ConceptRead,
+    ConceptSearchHit,
+    ConceptStats,
+    ConceptView,
+    EmbeddingQueueStatus,
+    ImportResult,
+    ProblemConcepts,
+    SimilarConcepts,
+    ProblemOut,
+    ProposalUploadRequest,
+    ProposalUploadTicket,
+    ProposalUploadComplete,
+    ProposalDownloadTicket,
+    SectionPlan,
+    UploadSessionRequest,
+    UploadSession,
+    UploadStatus,
+    concept_filters,
+    concept_rows_for_workflow,
+)
+from pagination import MAX_PAGE_SIZE
+import listing
+import cache
+import metrics
+import timing
+from timing import span
 
-# Initialize database schema
-models.Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic (`alembic upgrade head`); the app only checks
+# the revision at startup.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.STARTUP_MODE == "lifespan":
+        started = time.perf_counter()
+        await run_in_threadpool(db_module.warm_up)
+        await run_in_threadpool(embedding.warm_up)
+        await run_in_threadpool(storage.get_blob_service_client)
+        await run_in_threadpool(concept_index.warm_up)
+        logger.info(f"Startup warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+    # in either mode: only spawns threads, and the poller resumes outbox
+    # jobs a previous process left behind even if no write ever arrives
+    embedding_queue.start()
+    yield
+    await run_in_threadpool(embedding_queue.stop)
+    await run_in_threadpool(concept_index.save_index)
+    await db_module.dispose()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = timing.TimedRoute
 logger = logging.getLogger("uvicorn.error")
+app.middleware("http")(cache.middleware)
+app.middleware("http")(metrics.middleware)
+app.middleware("http")(timing.middleware)
 
 # Exception handlers
 @app.exception_handler(RequestValidationError)
@@ -37,14 +102,14 @@ async def http_exception_handler(request, exc: HTTPException):
     logger.error("⚠️ HTTPException:")
     logger.error(f"→ Status Code: {exc.status_code}")
     logger.error(f"→ Detail: {exc.detail}")
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
 
 @app.exception_handler(StarletteHTTPException)
 async def starlette_http_exception_handler(request, exc: StarletteHTTPException):
     logger.error("⚠️ StarletteHTTPException:")
     logger.error(f"→ Status Code: {exc.status_code}")
     logger.error(f"→ Detail: {exc.detail}")
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
 
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request, exc: Exception):
@@ -54,117 +119,161 @@ async def unhandled_exception_handler(request, exc: Exception):
     logger.error(f"→ Traceback:\n{traceback.format_exc()}")
     return JSONResponse(status_code=500, content={"detail": "Internal Server Error", "error": str(exc)})
 
-# Pydantic schemas
-class ConceptBase(BaseModel):
-    agent: Optional[str]= None
-    title: str
-    description: Optional[str]= None
-    novelty_reasoning: Optional[str]= None
-    feasibility_reasoning: Optional[str]= None
-    cost_estimate: Optional[str]= None
-    industry: Optional[str] = None
-    original_solution: Optional[str] = None
-    adaptation_challenges: Optional[str] = None
-    trl: Optional[float]= None
-    trl_reasoning: Optional[str]= None
-    trl_citations: Optional[Any]= None
-    validated_trl: Optional[float]= None
-    validated_trl_reasoning: Optional[str]= None
-    validated_trl_citations: Optional[Any]= None
-    components: Optional[Any]= None
-    references: Optional[Any]= None
-    constructive_critique: Optional[str]= None
-    proposal_url: Optional[str]= None
-
-    class Config:
-        orm_mode = True
-        extra = "ignore"
-
-class ConceptCreate(ConceptBase):
-    problem_statement: str
-
-class ConceptRead(ConceptBase):
-    id: int
-    problem_statement: str
-    generated_at: datetime
-
-    class Config:
-        orm_mode = True
-
-class SimilarConcepts(BaseModel):
-    problem_statement: str
-    similarity: float
-    concepts: List[ConceptRead]
-
-    class Config:
-        orm_mode = True
-
-class ProblemOut(BaseModel):
-    problem_statement: str
-
-    class Config:
-        orm_mode = True
-
 # Endpoints
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(db_module.engine), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/concepts", response_model=List[ConceptRead])
-def read_concepts(problem_statement: str, db: Session = Depends(get_db)):
-    return crud.get_concepts_by_problem(db, problem_statement)
+def read_concepts(
+    request: Request,
+    response: Response,
+    filters: ConceptFilters = Depends(concept_filters),
+    problem_statement: Optional[str] = Query(None, description="Substring of the problem statement; omit for every problem"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all rows"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    view: ConceptView = Query("full", description="'summary' skips the large text/JSON columns"),
+    db: Session = Depends(get_read_db),
+):
+    return listing.concepts_page(db, request, response, problem_statement, limit, cursor, view, filters)
 
 @app.post("/concepts", response_model=List[ConceptRead])
 def create_concepts_endpoint(
     *,
     workflow: str = Query("traditional", description="Ideation workflow: 'cross-industry' for cross-industry, else traditional"),
+    bulk: bool = Query(False, description="Insert the whole batch in one all-or-nothing transaction"),
     concepts: List[ConceptCreate] = Body(...),
     db: Session = Depends(get_db),
 ):
     if not concepts:
         return []
+    if embedding_queue.overloaded():
+        raise HTTPException(503, "Embedding backlog is full; retry later", headers={"Retry-After": "30"})
     problem = concepts[0].problem_statement
-    new_data = [c.model_dump(exclude={"problem_statement"}) for c in concepts]
-
-    # Strip unused fields based on workflow
-    if workflow.lower() == "cross-industry":
-        for d in new_data:
-            d.pop("novelty_reasoning", None)
-            d.pop("feasibility_reasoning", None)
-            d.pop("cost_estimate", None)
-    else:
-        for d in new_data:
-            d.pop("industry", None)
-            d.pop("original_solution", None)
-            d.pop("adaptation_challenges", None)
+    new_data = concept_rows_for_workflow(concepts, workflow)
 
+    if bulk:
+        try:
+            return crud.bulk_create_concepts(db, problem, new_data)
+        except crud.ConceptValidationError as e:
+            raise HTTPException(422, e.errors)
     return crud.create_concepts(db, problem, new_data)
 
+@app.post("/concepts/batch-lookup", response_model=List[ProblemConcepts])
+def batch_lookup_concepts(
+    req: ConceptBatchLookup,
+    view: ConceptView = Query("full", description="'summary' skips the large text/JSON columns"),
+    db: Session = Depends(get_read_db),
+):
+    """The concepts of many problem statements (exact match) in one round trip."""
+    return listing.batch_lookup(db, req.problem_statements, view)
+
+@app.post("/concepts/import", response_model=ImportResult)
+async def import_concepts_endpoint(
+    request: Request,
+    workflow: Optional[Literal["traditional", "cross-industry"]] = Query(None, description="Strip fields this workflow doesn't produce; omit to keep every field"),
+    batch_size: int = Query(bulk_io.IMPORT_BATCH_ROWS, ge=1, le=bulk_io.MAX_IMPORT_BATCH_ROWS),
+    on_error: Literal["skip", "abort"] = Query("skip", description="'skip' reports invalid lines, 'abort' stops at the first"),
+):
+    """Stream a JSONL body (one ConceptCreate per line) into the database."""
+    if embedding_queue.overloaded():
+        raise HTTPException(503, "Embedding backlog is full; retry later", headers={"Retry-After": "30"})
+    return await bulk_io.import_concepts(request, workflow, batch_size, on_error)
+
+@app.get("/concepts/export")
+def export_concepts_endpoint(
+    filters: ConceptFilters = Depends(concept_filters),
+    format: Literal["jsonl", "csv", "parquet"] = "jsonl",
+):
+    stmt = crud.export_concepts_stmt(filters, db_module.engine.dialect.name)
+    return bulk_io.export_response(format, stmt)
+
+@app.get("/concepts/stats", response_model=ConceptStats)
+def concept_stats_endpoint(
+    filters: ConceptFilters = Depends(concept_filters),
+    problem_statement: Optional[str] = Query(None, description="Substring of the problem statement; omit for every problem"),
+    db: Session = Depends(get_read_db),
+):
+    """Counts and TRL histograms per agent and workflow, computed in the database."""
+    return crud.concept_stats(db, filters, problem_statement)
+
+@app.get("/embeddings/status", response_model=EmbeddingQueueStatus)
+def embedding_queue_status(db: Session = Depends(get_db)):
+    return embedding_queue.get_queue().status(db)
+
+@app.get("/sections/regeneration-plan", response_model=SectionPlan)
+async def section_regeneration_plan(
+    edited: List[str] = Query(..., description="Sections the user changed; repeat the parameter for several"),
+):
+    """Which proposal sections to regenerate after `edited` changed, in parallelizable stages."""
+    try:
+        return sections.graph.plan(edited)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
 @app.get("/problems", response_model=List[ProblemOut])
-def list_problems(db: Session = Depends(get_db)):
-    rows = (
-        db.query(models.Concept.problem_statement)
-          .distinct()
-          .order_by(models.Concept.problem_statement)
-          .all()
-    )
-    return [ProblemOut(problem_statement=stmt) for (stmt,) in rows]
+def list_problems(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all rows"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: Session = Depends(get_read_db),
+):
+    return listing.problems_page(db, request, response, limit, cursor)
 
 @app.get("/concepts/similar", response_model=List[SimilarConcepts])
-def get_similar_concepts_endpoint(problem_statement: str, top_k: int = 50, db: Session = Depends(get_db)):
+def get_similar_concepts_endpoint(
+    request: Request,
+    response: Response,
+    problem_statement: str,
+    top_k: int = 50,
+    min_similarity: float = Query(DEFAULT_MIN_SIMILARITY, ge=-1.0, le=1.0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Problem groups per page; omit for all"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    view: ConceptView = Query("full", description="'summary' skips the large text/JSON columns"),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        q_emb = embed_text(normalize_text(problem_statement))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return listing.similar_page(
+        db, request, response, q_emb, top_k, min_similarity, limit, cursor, view
+    )
+
+@app.get("/concepts/search", response_model=List[ConceptSearchHit])
+def search_concepts_endpoint(
+    q: str = Query(..., min_length=1, description="Free text matched against concept titles and descriptions"),
+    agent: Optional[List[str]] = Query(None, description="Only concepts from these agents"),
+    industry: Optional[List[str]] = Query(None, description="Only these industries (case-insensitive)"),
+    trl_min: Optional[float] = Query(None, ge=0, le=9),
+    trl_max: Optional[float] = Query(None, ge=0, le=9),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    min_score: float = Query(-1.0, ge=-1.0, le=1.0),
+    nprobe: Optional[int] = Query(None, ge=1, description="Index clusters scanned; higher is slower but finds more"),
+    db: Session = Depends(get_read_db),
+):
+    if trl_min is not None and trl_max is not None and trl_min > trl_max:
+        raise HTTPException(400, "trl_min must not exceed trl_max")
     try:
-        results = crud.get_similar_concepts(db, problem_statement, top_k)
-        return [r for r in results if r.get("similarity", 0) > 0.7]
+        q_emb = embed_text(normalize_text(q))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    hits = crud.search_concepts(db, q_emb, limit, agent, industry, trl_min, trl_max, min_score, nprobe)
+    return [{"score": score, "concept": concept} for concept, score in hits]
 
 @app.post("/concepts/{concept_id}/proposal", response_model=ConceptRead)
 def upload_proposal(concept_id: int, file: UploadFile = File(...), db: Session = Depends(get_db), container = Depends(get_container_client)):
     blob_name = f"{concept_id}/{uuid.uuid4()}-{file.filename}"
     try:
-        container.upload_blob(
-            name=blob_name,
-            data=file.file,
-            overwrite=True,
-            max_concurrency=4,      # try 4–8 parallel connections
-            timeout=300             # back‑end timeout, seconds
-        )
+        with span("blob"):
+            container.upload_blob(
+                name=blob_name,
+                data=file.file,
+                overwrite=True,
+                max_concurrency=settings.UPLOAD_MAX_CONCURRENCY,
+                timeout=300             # back‑end timeout, seconds
+            )
     except Exception as e:
         raise HTTPException(500, f"Blob upload failed: {e}")
     blob_client = container.get_blob_client(blob_name)
@@ -175,14 +284,166 @@ def upload_proposal(concept_id: int, file: UploadFile = File(...), db: Session =
     return updated
 
 @app.get("/concepts/{concept_id}/download")
-def download_proposal(concept_id: int, db: Session = Depends(get_db), container = Depends(get_container_client)):
+def download_proposal(concept_id: int, request: Request, db: Session = Depends(get_db), container = Depends(get_container_client)):
     concept = crud.get_concept(db, concept_id)
     if not concept or not concept.proposal_url:
         raise HTTPException(404, "Not found or no proposal attached")
-    blob_name = concept.proposal_url.split('/')[-1]
     try:
-        stream = container.download_blob(blob_name)
-        return StreamingResponse(stream.chunks(), media_type="application/octet-stream")
+        blob_name = blob_name_from_url(container, concept.proposal_url)
+        with span("blob"):
+            props = container.get_blob_client(blob_name).get_blob_properties()
+    except (ValueError, ResourceNotFoundError):
+        raise HTTPException(404, "Proposal file not found in storage")
     except Exception as e:
         raise HTTPException(500, f"Blob download failed: {e}")
+    status, headers, offset, length = plan_download(request, blob_name, props)
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    try:
+        # pin the etag so a concurrent overwrite can't splice two versions
+        with span("blob"):
+            stream = container.download_blob(
+                blob_name, offset=offset, length=length,
+                etag=props.etag, match_condition=MatchConditions.IfNotModified,
+            )
+        return StreamingResponse(stream.chunks(), status_code=status, headers=headers)
+    except Exception as e:
+        raise HTTPException(500, f"Blob download failed: {e}")
+
+# ─── Direct-to-storage proposal transfers ──────────────────────────────────────
+# The API only signs short-lived SAS URLs; file bytes go straight between
+# the client and Blob Storage.
+@app.post("/concepts/{concept_id}/proposal/upload-url", response_model=ProposalUploadTicket)
+def create_proposal_upload_url(concept_id: int, req: ProposalUploadRequest, db: Session = Depends(get_db), container = Depends(get_container_client)):
+    if not crud.get_concept(db, concept_id):
+        raise HTTPException(404, f"Concept {concept_id} not found")
+    filename = os.path.basename(req.filename.replace("\\", "/")) or "proposal"
+    blob_name = f"{concept_id}/{uuid.uuid4()}-{filename}"
+    url, expires_at = upload_sas_url(container, blob_name)
+    return ProposalUploadTicket(
+        blob_name=blob_name,
+        upload_url=url,
+        expires_at=expires_at,
+        required_headers={"x-ms-blob-type": "BlockBlob"},
+    )
+
+@app.post("/concepts/{concept_id}/proposal/complete", response_model=ConceptRead)
+def complete_proposal_upload(concept_id: int, req: ProposalUploadComplete, db: Session = Depends(get_db), container = Depends(get_container_client)):
+    if not req.blob_name.startswith(f"{concept_id}/"):
+        raise HTTPException(400, "Blob does not belong to this concept")
+    blob_client = container.get_blob_client(req.blob_name)
+    with span("blob"):
+        exists = blob_client.exists()
+    if not exists:
+        raise HTTPException(409, "Upload not found in storage; PUT the file to upload_url first")
+    updated = crud.update_concept(db, concept_id, {"proposal_url": blob_client.url})
+    if not updated:
+        raise HTTPException(404, f"Concept {concept_id} not found")
+    return updated
+
+@app.get("/concepts/{concept_id}/proposal/download-url", response_model=ProposalDownloadTicket)
+def create_proposal_download_url(concept_id: int, db: Session = Depends(get_db), container = Depends(get_container_client)):
+    concept = crud.get_concept(db, concept_id)
+    if not concept or not concept.proposal_url:
+        raise HTTPException(404, "Not found or no proposal attached")
+    try:
+        blob_name = blob_name_from_url(container, concept.proposal_url)
+    except ValueError:
+        raise HTTPException(404, "Proposal file not found in storage")
+    # strip the "<uuid>-" prefix added at upload time for the saved filename
+    filename = blob_name.rsplit("/", 1)[-1].split("-", 5)[-1]
+    url, expires_at = download_sas_url(container, blob_name, filename)
+    return ProposalDownloadTicket(download_url=url, expires_at=expires_at)
+
+# ─── Chunked, resumable proposal uploads ───────────────────────────────────────
+# Open a session, PUT numbered chunks (in parallel, in any order, retrying
+# any that fail), then commit.  Each chunk is staged as an Azure block, so
+# GET on the session reports what has landed and a client can resume.
+def _upload_blob_name(concept_id: int, upload_id: str) -> tuple[str, Optional[int]]:
+    blob_name, total_chunks = storage.decode_upload_id(upload_id)
+    if not blob_name.startswith(f"{concept_id}/"):
+        raise HTTPException(400, "Upload does not belong to this concept")
+    return blob_name, total_chunks
+
+def _upload_status(upload_id: str, staged: dict[int, int], total_chunks: Optional[int]) -> UploadStatus:
+    return UploadStatus(
+        upload_id=upload_id,
+        received=sorted(staged),
+        missing=None if total_chunks is None else [i for i in range(total_chunks) if i not in staged],
+        bytes_received=sum(staged.values()),
+    )
+
+@app.post("/concepts/{concept_id}/proposal/uploads", response_model=UploadSession)
+def open_proposal_upload(concept_id: int, req: UploadSessionRequest, db: Session = Depends(get_db)):
+    if not crud.get_concept(db, concept_id):
+        raise HTTPException(404, f"Concept {concept_id} not found")
+    filename = os.path.basename(req.filename.replace("\\", "/")) or "proposal"
+    blob_name = f"{concept_id}/{uuid.uuid4()}-{filename}"
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+    total_chunks = None if req.total_size is None else max(1, -(-req.total_size // chunk_size))
+    return UploadSession(
+        upload_id=storage.encode_upload_id(blob_name, total_chunks),
+        blob_name=blob_name,
+        chunk_size=chunk_size,
+        total_chunks=total_chunks,
+        max_concurrency=settings.UPLOAD_MAX_CONCURRENCY,
+    )
+
+@app.put("/concepts/{concept_id}/proposal/uploads/{upload_id}/chunks/{index}", status_code=204)
+async def put_proposal_chunk(concept_id: int, upload_id: str, index: int, request: Request, container = Depends(get_container_client)):
+    blob_name, total_chunks = _upload_blob_name(concept_id, upload_id)
+    if index < 0 or (total_chunks is not None and index >= total_chunks):
+        raise HTTPException(400, f"Chunk index {index} out of range")
+    data = await request.body()
+    if not data or len(data) > settings.UPLOAD_CHUNK_SIZE:
+        raise HTTPException(413 if data else 400, f"Chunk must be 1..{settings.UPLOAD_CHUNK_SIZE} bytes")
+    try:
+        await run_in_threadpool(storage.stage_chunk, container, blob_name, index, data)
+    except Exception as e:
+        raise HTTPException(502, f"Staging chunk {index} failed: {e}")
+    return Response(status_code=204)
+
+@app.get("/concepts/{concept_id}/proposal/uploads/{upload_id}", response_model=UploadStatus)
+def get_proposal_upload_status(concept_id: int, upload_id: str, container = Depends(get_container_client)):
+    blob_name, total_chunks = _upload_blob_name(concept_id, upload_id)
+    return _upload_status(upload_id, storage.staged_chunks(container, blob_name), total_chunks)
+
+@app.post("/concepts/{concept_id}/proposal/uploads/{upload_id}/commit", response_model=ConceptRead)
+def commit_proposal_upload(concept_id: int, upload_id: str, db: Session = Depends(get_db), container = Depends(get_container_client)):
+    blob_name, total_chunks = _upload_blob_name(concept_id, upload_id)
+    staged = storage.staged_chunks(container, blob_name)
+    expected = total_chunks if total_chunks is not None else (max(staged) + 1 if staged else 0)
+    status = _upload_status(upload_id, staged, expected)
+    if not staged or status.missing:
+        raise HTTPException(409, f"Upload incomplete; missing chunks: {status.missing or [0]}")
+    from azure.storage.blob import BlobBlock, ContentSettings
+
+    blob_client = container.get_blob_client(blob_name)
+    content_type = mimetypes.guess_type(blob_name)[0] or "application/octet-stream"
+    try:
+        with span("blob"):
+            blob_client.commit_block_list(
+                [BlobBlock(block_id=storage.block_id(i)) for i in range(expected)],
+                content_settings=ContentSettings(content_type=content_type),
+            )
+    except Exception as e:
+        raise HTTPException(500, f"Committing upload failed: {e}")
+    updated = crud.update_concept(db, concept_id, {"proposal_url": blob_client.url})
+    if not updated:
+        raise HTTPException(404, f"Concept {concept_id} not found")
+    return updated
+
+# ─── Async I/O mode ────────────────────────────────────────────────────────────
+# With ASYNC_IO enabled, every route that has an `async def` twin in
+# async_api is swapped for it; anything without one keeps its sync handler.
+if settings.ASYNC_IO:
+    import async_api
 
+    _async_keys = {
+        (r.path, m) for r in async_api.router.routes if isinstance(r, APIRoute) for m in r.methods
+    }
+    app.router.routes = [
+        r for r in app.router.routes
+        if not (isinstance(r, APIRoute) and any((r.path, m) in _async_keys for m in r.methods))
+    ]
+    app.include_router(async_api.router)
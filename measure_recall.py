@@ -0,0 +1,82 @@
+# measure_recall.py
+"""Recall of the compact two-stage similarity index against exact cosine.
+
+Builds an exact index (float32, all dims) and a compact one with the
+given dtype / Matryoshka prefix over the same vectors, then runs noisy
+copies of stored vectors as queries through both:
+
+    python measure_recall.py                          # stored problem embeddings
+    python measure_recall.py --dtype int8 --dim 768   # try a setting
+    python measure_recall.py --synthetic 100000       # no DB needed
+
+Prints recall@top_k, bytes per vector and mean query time as JSON.
+"""
+import argparse
+import json
+
+import numpy as np
+
+from config import VECTOR_COARSE_MARGIN, VECTOR_INDEX_DIM, VECTOR_INDEX_DTYPE, VECTOR_RERANK_CANDIDATES
+from similarity_index import DEFAULT_MIN_SIMILARITY, SimilarityIndex, load_exact_vectors, measure_recall
+
+
+def synthetic_vectors(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Clustered unit vectors, so queries have several near neighbours."""
+    centres = rng.standard_normal((max(n // 20, 1), dim)).astype(np.float32)
+    vecs = centres[rng.integers(0, len(centres), n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--dtype", default=VECTOR_INDEX_DTYPE, choices=["float32", "float16", "int8"])
+    p.add_argument("--dim", type=int, default=VECTOR_INDEX_DIM, help="Matryoshka prefix; 0 = all dims")
+    p.add_argument("--rerank", type=int, default=VECTOR_RERANK_CANDIDATES)
+    p.add_argument("--margin", type=float, default=VECTOR_COARSE_MARGIN)
+    p.add_argument("--top-k", type=int, default=10)
+    p.add_argument("--min-similarity", type=float, default=DEFAULT_MIN_SIMILARITY)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--noise", type=float, default=0.02, help="per-dim stddev added to query vectors")
+    p.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead of the DB")
+    p.add_argument("--synthetic-dim", type=int, default=3072)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    exact = SimilarityIndex(dtype="float32", dim=0)
+    compact = SimilarityIndex(dtype=args.dtype, dim=args.dim, rerank_candidates=args.rerank, coarse_margin=args.margin)
+
+    if args.synthetic:
+        vecs = synthetic_vectors(args.synthetic, args.synthetic_dim, rng)
+        store = {f"v{i}": v for i, v in enumerate(vecs)}
+        for key, v in store.items():
+            exact.add(key, key, v)
+            compact.add(key, key, v)
+        loader = lambda keys: {k: store[k] for k in keys}
+    else:
+        from db import SessionLocal
+
+        db = SessionLocal()
+        exact.sync(db)
+        compact.sync(db)
+        loader = lambda keys: load_exact_vectors(db, keys, exact.model)
+    if not len(exact):
+        raise SystemExit("No vectors to measure; run backfill_embeddings.py or pass --synthetic N")
+
+    sample = [str(k) for k in rng.choice(exact.keys, args.queries)]
+    base = loader(sample)
+    queries = [base[k] + args.noise * rng.standard_normal(exact.dim).astype(np.float32) for k in sample]
+    report = {
+        "vectors": len(exact),
+        "dtype": args.dtype,
+        "dim": args.dim or exact.dim,
+        "rerank": args.rerank,
+        "top_k": args.top_k,
+        "min_similarity": args.min_similarity,
+        **measure_recall(compact, exact, queries, args.top_k, args.min_similarity, loader),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# metrics.py
+"""Connection-pool and query metrics, exposed in Prometheus text format.
+
+Instrumentation hangs off SQLAlchemy events, so no query code changes:
+
+* `db_pool_checkout_wait_seconds` - time spent waiting for a pooled
+  connection (measured in the pool itself; SQLAlchemy has no
+  "before checkout" event).
+* `db_pool_connections_in_use` - checked-out connections, plus the pool's
+  configured size and current overflow at scrape time.
+* `db_replica_lag_seconds` / `db_replica_serving` - when a read replica
+  is configured (see db.ReplicaMonitor).
+* `db_queries_total` / `db_query_duration_seconds` - per endpoint
+  (method plus route template).  Queries are collected for the request in
+  a context variable and attributed once routing has resolved; queries
+  outside any request are labelled `endpoint="-"`.
+
+Metrics are per worker process, as usual for a multi-process Prometheus
+target.  Nothing here needs the prometheus_client package.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import timing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+_QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# ─── Minimal metric types ─────────────────────────────────────────────────────
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, doc: str):
+        self.name, self.doc = name, doc
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_fmt_labels(k)} {v}" for k, v in self._values.items()]
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, doc: str):
+        self.name, self.doc = name, doc
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge", f"{self.name} {self._value}"]
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, buckets: tuple[float, ...]):
+        self.name, self.doc, self.buckets = name, doc, buckets
+        # labels -> ([count per bucket..., +Inf], sum)
+        self._values: dict[tuple, tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(c), s) for k, (c, s) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_fmt_labels((*key, ('le', le)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative}")
+        return lines
+
+
+checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection.", _WAIT_BUCKETS
+)
+checkout_timeouts = Counter("db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout.")
+in_use = Gauge("db_pool_connections_in_use", "DB connections currently checked out of the pool.")
+replica_lag = Gauge("db_replica_lag_seconds", "Replay lag of the read replica at the last probe.")
+replica_serving = Gauge("db_replica_serving", "1 while read-only routes use the replica, 0 while they fall back to the primary.")
+queries = Counter("db_queries_total", "SQL statements executed, by endpoint.")
+query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time, by endpoint.", _QUERY_BUCKETS
+)
+
+
+# ─── Engine instrumentation ───────────────────────────────────────────────────
+class _TimedCheckout:
+    """Pool mixin timing how long `connect()` waits for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            checkout_timeouts.inc()
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+# queries run during the current request: list of durations in seconds
+_request_queries: ContextVar[Optional[list[float]]] = ContextVar("request_queries", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Attach pool and query listeners to a sync Engine (or an async one's `.sync_engine`)."""
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        in_use.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        in_use.dec()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        timing.record("db", elapsed)
+        collected = _request_queries.get()
+        if collected is not None:
+            collected.append(elapsed)
+        else:
+            queries.inc(endpoint="-")
+            query_duration.observe(elapsed, endpoint="-")
+
+
+def _pool_gauges(engine) -> list[str]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        "# HELP db_pool_size Configured pool_size.",
+        "# TYPE db_pool_size gauge",
+        f"db_pool_size {pool.size()}",
+        "# HELP db_pool_overflow Connections currently open beyond pool_size.",
+        "# TYPE db_pool_overflow gauge",
+        f"db_pool_overflow {max(pool.overflow(), 0)}",
+        "# HELP db_pool_checked_in Idle connections held by the pool.",
+        "# TYPE db_pool_checked_in gauge",
+        f"db_pool_checked_in {pool.checkedin()}",
+    ]
+
+
+def render(engine) -> str:
+    lines: list[str] = []
+    for metric in (checkout_wait, checkout_timeouts, in_use, replica_lag, replica_serving, queries, query_duration):
+        lines += metric.render()
+    lines += _pool_gauges(engine)
+    return "\n".join(lines) + "\n"
+
+
+# ─── Per-endpoint attribution ─────────────────────────────────────────────────
+async def middleware(request: Request, call_next):
+    """HTTP middleware: collect the request's queries, label them by route."""
+    collected: list[float] = []
+    token = _request_queries.set(collected)
+    try:
+        return await call_next(request)
+    finally:
+        _request_queries.reset(token)
+        # streamed bodies may still be querying; those rows land here late
+        # or not at all, which is acceptable for a rate metric
+        route = request.scope.get("route")
+        endpoint = f"{request.method} {route.path}" if route is not None else "unmatched"
+        for elapsed in collected:
+            query_duration.observe(elapsed, endpoint=endpoint)
+        if collected:
+            queries.inc(len(collected), endpoint=endpoint)
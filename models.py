@@ -1,13 +1,57 @@
 # models.py
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, Float, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, Float, ForeignKey, Index, LargeBinary, UniqueConstraint, DDL, event, func, text
 from db import Base
 
+class Problem(Base):
+    """One row per distinct (whitespace-normalized) problem statement."""
+    __tablename__ = "problems"
+    __table_args__ = (
+        # trigram GIN makes ILIKE '%...%' an index scan; Postgres only,
+        # SQLite falls back to a scan of this (small) table
+        Index(
+            "ix_problems_problem_statement_trgm",
+            "problem_statement",
+            postgresql_using="gin",
+            postgresql_ops={"problem_statement": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id                          = Column(Integer, primary_key=True, index=True)
+    content_hash                = Column(String(64), nullable=False, unique=True)   # sha256 of the normalized statement
+    problem_statement           = Column(Text,   nullable=False)
+    created_at                  = Column(DateTime(timezone=True), server_default=func.now())
+
+
+event.listen(
+    Problem.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class Concept(Base):
     __tablename__ = "concepts"
+    __table_args__ = (
+        # equality lookups only; hash avoids btree's row-size limit on long Text
+        Index("ix_concepts_problem_statement_hash", "problem_statement", postgresql_using="hash"),
+        # listings are ordered by (generated_at, id), within a problem or agent
+        Index("ix_concepts_problem_id_generated_at", "problem_id", "generated_at", "id"),
+        Index("ix_concepts_agent_generated_at", "agent", "generated_at", "id"),
+        Index("ix_concepts_generated_at_id", "generated_at", "id"),
+        # the expressions crud.concept_filter_clauses filters on
+        Index("ix_concepts_effective_trl", text("coalesce(validated_trl, trl)")),
+        Index("ix_concepts_industry_lower", text("lower(industry)")),
+        Index(
+            "ix_concepts_components_gin",
+            text("(components::jsonb) jsonb_path_ops"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id                          = Column(Integer, primary_key=True, index=True)
     problem_statement           = Column(Text,   nullable=False)
+    problem_id                  = Column(Integer, ForeignKey("problems.id"), nullable=True)   # indexed with generated_at
     agent                       = Column(String(100), nullable=True)
     title                       = Column(String(255), nullable=False)
     description                 = Column(Text,   nullable=True)
@@ -28,3 +72,54 @@ class Concept(Base):
     constructive_critique       = Column(Text,   nullable=True)
     proposal_url                = Column(String(512), nullable=True)
     generated_at                = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ProblemEmbedding(Base):
+    __tablename__ = "problem_embeddings"
+    __table_args__ = (
+        UniqueConstraint("content_hash", "model", name="uq_problem_embeddings_hash_model"),
+    )
+
+    id                          = Column(Integer, primary_key=True, index=True)
+    content_hash                = Column(String(64), nullable=False, index=True)   # sha256 of the normalized statement
+    problem_statement           = Column(Text,   nullable=False)
+    model                       = Column(String(100), nullable=False)
+    dim                         = Column(Integer, nullable=False)
+    vector                      = Column(LargeBinary, nullable=False)   # little-endian float32
+    created_at                  = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ConceptEmbedding(Base):
+    """Embedding of a concept's title + description, for /concepts/search."""
+    __tablename__ = "concept_embeddings"
+    __table_args__ = (
+        UniqueConstraint("concept_id", "model", name="uq_concept_embeddings_concept_model"),
+    )
+
+    id                          = Column(Integer, primary_key=True, index=True)
+    concept_id                  = Column(Integer, ForeignKey("concepts.id", ondelete="CASCADE"), nullable=False, index=True)
+    content_hash                = Column(String(64), nullable=False)   # sha256 of the embedded text; unchanged text is not re-embedded
+    model                       = Column(String(100), nullable=False)
+    dim                         = Column(Integer, nullable=False)
+    vector                      = Column(LargeBinary, nullable=False)   # little-endian float32
+    created_at                  = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class EmbeddingJob(Base):
+    """Outbox of embeddings still to compute; see embedding_queue."""
+    __tablename__ = "embedding_jobs"
+    __table_args__ = (
+        UniqueConstraint("kind", "ref_id", name="uq_embedding_jobs_kind_ref"),
+        Index("ix_embedding_jobs_due", "next_attempt_at", "id"),
+    )
+
+    id                          = Column(Integer, primary_key=True)
+    kind                        = Column(String(16), nullable=False)    # "problem" | "concept"
+    ref_id                      = Column(Integer, nullable=False)       # problems.id / concepts.id
+    attempts                    = Column(Integer, nullable=False, default=0)
+    last_error                  = Column(Text,   nullable=True)
+    enqueued_at                 = Column(DateTime(timezone=True), nullable=False)   # bumped when re-enqueued
+    next_attempt_at             = Column(DateTime(timezone=True), nullable=False)
+    claimed_by                  = Column(String(36), nullable=True)
+    claimed_until               = Column(DateTime(timezone=True), nullable=True)
+    created_at                  = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,65 @@
+# pagination.py
+"""Opaque keyset cursors for the listing endpoints.
+
+A cursor is the sort key of the last row on a page, JSON-encoded and
+base64url'd so clients treat it as a token.  The next page is everything
+strictly after that key, so no OFFSET scans and no total count.  The
+token for the following page travels in the `X-Next-Cursor` header (and
+an RFC 8288 `Link: rel="next"`), leaving the JSON body a plain list.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request, Response
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, *types: type) -> tuple:
+    """
+    Decode `token` and coerce each value with the matching entry in
+    `types` (datetime values are parsed from ISO format).  Raises
+    HTTPException(400) on anything malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong arity")
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def set_next_cursor(request: Request, response: Response, token: Optional[str]) -> None:
+    """Advertise the next page on `response`, if there is one."""
+    if token is None:
+        return
+    response.headers["X-Next-Cursor"] = token
+    next_url = request.url.include_query_params(cursor=token)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+def split_page(rows: list, limit: Optional[int]) -> tuple[list, bool]:
+    """
+    Trim a `limit + 1` fetch back to `limit`; the extra row only tells us
+    whether another page exists.
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, False
+    return rows[:limit], True
@@ -0,0 +1,286 @@
+# schemas.py
+"""Pydantic request/response schemas shared by the sync and async routes."""
+from typing import List, Optional, Any, Literal
+from fastapi import HTTPException, Query, Response
+import json
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator, model_validator
+from datetime import datetime
+
+class ConceptBase(BaseModel):
+    agent: Optional[str]= None
+    title: str
+    description: Optional[str]= None
+    novelty_reasoning: Optional[str]= None
+    feasibility_reasoning: Optional[str]= None
+    cost_estimate: Optional[str]= None
+    industry: Optional[str] = None
+    original_solution: Optional[str] = None
+    adaptation_challenges: Optional[str] = None
+    trl: Optional[float]= None
+    trl_reasoning: Optional[str]= None
+    trl_citations: Optional[Any]= None
+    validated_trl: Optional[float]= None
+    validated_trl_reasoning: Optional[str]= None
+    validated_trl_citations: Optional[Any]= None
+    components: Optional[Any]= None
+    references: Optional[Any]= None
+    constructive_critique: Optional[str]= None
+    proposal_url: Optional[str]= None
+
+    class Config:
+        orm_mode = True
+        extra = "ignore"
+
+class ConceptCreate(ConceptBase):
+    problem_statement: str
+
+class ConceptImport(ConceptCreate):
+    """One line of a JSONL import; `generated_at` is kept when present."""
+    generated_at: Optional[datetime] = None
+
+class ConceptRead(ConceptBase):
+    id: int
+    problem_statement: str
+    generated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class SimilarConcepts(BaseModel):
+    problem_statement: str
+    similarity: float
+    concepts: List[ConceptRead]
+
+    class Config:
+        orm_mode = True
+
+class ConceptSearchHit(BaseModel):
+    score: float
+    concept: ConceptRead
+
+    class Config:
+        orm_mode = True
+
+class ConceptSummary(BaseModel):
+    """List-view projection of a concept; mirrors crud.SUMMARY_FIELDS."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    agent: Optional[str] = None
+    industry: Optional[str] = None
+    trl: Optional[float] = None
+    validated_trl: Optional[float] = None
+    proposal_url: Optional[str] = None
+    generated_at: datetime
+
+class SimilarConceptsSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    problem_statement: str
+    similarity: float
+    concepts: List[ConceptSummary]
+
+# problem statements one POST /concepts/batch-lookup may ask for
+MAX_BATCH_LOOKUP = 500
+
+class ConceptBatchLookup(BaseModel):
+    problem_statements: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_LOOKUP)
+
+class ProblemConcepts(BaseModel):
+    problem_statement: str
+    concepts: List[ConceptRead]
+
+class ProblemConceptsSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    problem_statement: str
+    concepts: List[ConceptSummary]
+
+class ProposalUploadRequest(BaseModel):
+    filename: str
+
+class ProposalUploadTicket(BaseModel):
+    blob_name: str
+    upload_url: str
+    expires_at: datetime
+    required_headers: dict[str, str]
+
+class ProposalUploadComplete(BaseModel):
+    blob_name: str
+
+class ProposalDownloadTicket(BaseModel):
+    download_url: str
+    expires_at: datetime
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    total_size: Optional[int] = None        # lets the server report missing chunks
+
+class UploadSession(BaseModel):
+    upload_id: str
+    blob_name: str
+    chunk_size: int
+    total_chunks: Optional[int] = None
+    max_concurrency: int
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    received: List[int]
+    missing: Optional[List[int]] = None     # only known when total_size was given
+    bytes_received: int
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    skipped: int
+    batches: int
+    errors: List[ImportLineError]   # the first bulk_io.MAX_REPORTED_ERRORS
+    error_count: int
+
+class EmbeddingQueueStatus(BaseModel):
+    mode: Literal["background", "inline"]
+    running: bool
+    workers: int
+    queued: int                     # job ids in this worker's in-memory queue
+    queue_capacity: int
+    pending: dict[str, int]         # outstanding jobs in the table, by kind
+    parked: int                     # jobs out of retries, left for backfill_embeddings.py
+    max_pending: int
+    overloaded: bool
+    lag_seconds: float              # age of the oldest outstanding job
+    processed: int
+    failed_batches: int
+    overflowed: int
+    last_batch_ms: Optional[float] = None
+    last_error: Optional[str] = None
+
+class ProblemOut(BaseModel):
+    problem_statement: str
+
+    class Config:
+        orm_mode = True
+
+
+# `view=` query values for the concept listing endpoints.
+ConceptView = Literal["full", "summary"]
+
+Workflow = Literal["traditional", "cross-industry"]
+
+class ConceptFilters(BaseModel):
+    """
+    Filters shared by GET /concepts, /concepts/export and /concepts/stats;
+    each one is applied in SQL (crud.concept_filter_clauses).  TRL bounds
+    apply to `validated_trl` where set, else `trl`; `components` is JSON
+    the stored components must contain (Postgres `@>`).
+    """
+    agent: Optional[List[str]] = None
+    industry: Optional[List[str]] = None
+    trl_min: Optional[float] = Field(None, ge=0, le=9)
+    trl_max: Optional[float] = Field(None, ge=0, le=9)
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    workflow: Optional[Workflow] = None
+    components: Optional[str] = None
+
+    @field_validator("components")
+    @classmethod
+    def _components_json(cls, value):
+        if value is not None:
+            try:
+                json.loads(value)
+            except ValueError as e:
+                raise ValueError(f"components must be JSON: {e}")
+        return value
+
+    @model_validator(mode="after")
+    def _ranges(self):
+        if self.trl_min is not None and self.trl_max is not None and self.trl_min > self.trl_max:
+            raise ValueError("trl_min must not exceed trl_max")
+        if self.since is not None and self.until is not None and self.since >= self.until:
+            raise ValueError("since must be before until")
+        return self
+
+
+async def concept_filters(
+    agent: Optional[List[str]] = Query(None, description="Only concepts from these agents"),
+    industry: Optional[List[str]] = Query(None, description="Only these industries (case-insensitive)"),
+    trl_min: Optional[float] = Query(None, ge=0, le=9, description="validated_trl where set, else trl"),
+    trl_max: Optional[float] = Query(None, ge=0, le=9),
+    since: Optional[datetime] = Query(None, description="generated_at >= since"),
+    until: Optional[datetime] = Query(None, description="generated_at < until"),
+    workflow: Optional[Workflow] = Query(None, description="Inferred from the fields each workflow fills"),
+    components: Optional[str] = Query(None, description='JSON the components must contain, e.g. [{"name": "heat pump"}]'),
+) -> ConceptFilters:
+    """
+    FastAPI dependency: ConceptFilters from the query string, 400 when
+    inconsistent.  `async` only so FastAPI runs it inline rather than
+    taking a threadpool hop for a few comparisons.
+    """
+    try:
+        return ConceptFilters(
+            agent=agent, industry=industry, trl_min=trl_min, trl_max=trl_max,
+            since=since, until=until, workflow=workflow, components=components,
+        )
+    except ValidationError as e:
+        raise HTTPException(400, "; ".join(err["msg"].removeprefix("Value error, ") for err in e.errors()))
+
+class ConceptGroupStats(BaseModel):
+    agent: Optional[str] = None
+    workflow: Workflow
+    count: int
+    trl_unknown: int                # neither trl nor validated_trl set
+    acceptable: int                 # TRL >= min_acceptable_trl
+    trl_mean: Optional[float] = None
+    trl_histogram: List[int]        # index i counts TRL in [i, i+1); 9 includes 9
+
+class ConceptStats(BaseModel):
+    min_acceptable_trl: float
+    total: int
+    groups: List[ConceptGroupStats]
+
+class SectionPlan(BaseModel):
+    edited: List[str]
+    sections: List[str]             # everything to regenerate, in a valid order
+    stages: List[List[str]]         # each stage only needs the ones before it; run a stage in parallel
+    cycles: List[List[str]]         # co-dependent sections in the plan, regenerated as one unit
+
+_SUMMARY_LIST = TypeAdapter(List[ConceptSummary])
+_SIMILAR_SUMMARY_LIST = TypeAdapter(List[SimilarConceptsSummary])
+_GROUPED_SUMMARY_LIST = TypeAdapter(List[ProblemConceptsSummary])
+
+
+def summary_response(rows: list, similar: bool = False, grouped: bool = False) -> Response:
+    """
+    Serialize `view=summary` results directly; the routes' declared
+    response_model describes the full view, so this bypasses it.
+    `similar` / `grouped` select the /concepts/similar and
+    /concepts/batch-lookup shapes.
+    """
+    adapter = _SIMILAR_SUMMARY_LIST if similar else _GROUPED_SUMMARY_LIST if grouped else _SUMMARY_LIST
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content=body, media_type="application/json")
+
+
+# Fields that only one family of workflows produces.
+_TRADITIONAL_ONLY = ("novelty_reasoning", "feasibility_reasoning", "cost_estimate")
+_CROSS_INDUSTRY_ONLY = ("industry", "original_solution", "adaptation_challenges")
+
+
+def drop_workflow_fields(row: dict, workflow: str) -> dict:
+    """Remove, in place, the fields `workflow` does not produce."""
+    drop = _TRADITIONAL_ONLY if workflow.lower() == "cross-industry" else _CROSS_INDUSTRY_ONLY
+    for field in drop:
+        row.pop(field, None)
+    return row
+
+
+def concept_rows_for_workflow(concepts: List[ConceptCreate], workflow: str) -> List[dict]:
+    """Dump incoming concepts, stripping fields unused by `workflow`."""
+    return [
+        drop_workflow_fields(c.model_dump(exclude={"problem_statement"}), workflow)
+        for c in concepts
+    ]
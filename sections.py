@@ -0,0 +1,183 @@
+# sections.py
+"""Regeneration planning over config.SECTION_DEPENDENCIES.
+
+The dependency map says which proposal sections go stale when another
+one changes.  It has cycles (performance_targets → technical_details →
+performance_targets, both of them → concept_overview → both), so the
+sections are first collapsed into strongly connected components: a
+cycle is regenerated as one unit.  On that acyclic condensation the
+transitive closure is computed once, as a bitmask of reachable
+components per component.
+
+A plan for a set of edited sections is every section reachable from
+them, minus the edited sections themselves (the user's edit is the
+source of truth).  Among those, any remaining cycle is again one unit,
+and the units are layered by longest path, so each stage only depends
+on earlier stages and its entries can be regenerated in parallel; the
+number of stages is the length of the critical path.
+Plans are memoized per edited set.
+"""
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Sequence
+
+import config
+
+PLAN_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class RegenerationPlan:
+    edited: tuple[str, ...]
+    sections: tuple[str, ...]               # every section to regenerate, in a valid order
+    stages: tuple[tuple[str, ...], ...]     # each stage only needs the ones before it
+    cycles: tuple[tuple[str, ...], ...]     # co-dependent sections in the plan; regenerate together
+
+
+class SectionGraph:
+    def __init__(self, dependencies: Mapping[str, Sequence[str]]):
+        # declaration order, so plans list sections the way config reads
+        order: dict[str, None] = {}
+        for source, targets in dependencies.items():
+            order[source] = None
+            order.update(dict.fromkeys(targets))
+        self.sections: tuple[str, ...] = tuple(order)
+        self._position = {name: i for i, name in enumerate(self.sections)}
+        self._edges = edges = [
+            sorted({self._position[t] for t in dependencies.get(name, ()) if t != name})
+            for name in self.sections
+        ]
+
+        components = _strongly_connected(edges)   # sinks first
+        self._component = [0] * len(self.sections)
+        for c, members in enumerate(components):
+            for node in members:
+                self._component[node] = c
+        self._members = [tuple(sorted(members)) for members in components]
+        self._successors = [
+            sorted({self._component[t] for node in members for t in edges[node]} - {c})
+            for c, members in enumerate(components)
+        ]
+        # successors sit earlier in `components`, so one pass in order fills the closure
+        self._reach = [0] * len(components)
+        for c, succ in enumerate(self._successors):
+            mask = 1 << c
+            for d in succ:
+                mask |= self._reach[d]
+            self._reach[c] = mask
+        self._plan = functools.lru_cache(maxsize=PLAN_CACHE_SIZE)(self._build_plan)
+
+    def cycles(self) -> list[tuple[str, ...]]:
+        return [self._names(m) for m in self._members if len(m) > 1]
+
+    def downstream(self, section: str) -> frozenset[str]:
+        """Every section that goes stale when `section` changes, not counting itself."""
+        c = self._component[self._index(section)]
+        return frozenset(
+            self.sections[node]
+            for d in _bits(self._reach[c])
+            for node in self._members[d]
+        ) - {section}
+
+    def plan(self, edited: Iterable[str]) -> RegenerationPlan:
+        """Raises ValueError naming any section that is not in the graph."""
+        nodes = frozenset(self._index(name) for name in edited)
+        return self._plan(nodes)
+
+    def _index(self, section: str) -> int:
+        try:
+            return self._position[section]
+        except KeyError:
+            raise ValueError(f"Unknown section {section!r}; expected one of: {', '.join(self.sections)}")
+
+    def _names(self, nodes: Iterable[int]) -> tuple[str, ...]:
+        return tuple(self.sections[n] for n in sorted(nodes))
+
+    def _build_plan(self, edited: frozenset[int]) -> RegenerationPlan:
+        affected = 0
+        for node in edited:
+            affected |= self._reach[self._component[node]]
+        todo = sorted(
+            node for c in _bits(affected) for node in self._members[c] if node not in edited
+        )
+        # layer the sections left once the edited ones are fixed: a cycle
+        # through an edited section no longer binds the others in it
+        local = {node: i for i, node in enumerate(todo)}
+        edges = [[local[t] for t in self._edges[node] if t in local] for node in todo]
+        components = _strongly_connected(edges)
+        component = {n: c for c, members in enumerate(components) for n in members}
+        stage_of = [0] * len(components)
+        for c in reversed(range(len(components))):   # topological order
+            for n in components[c]:
+                for t in edges[n]:
+                    d = component[t]
+                    if d != c:
+                        stage_of[d] = max(stage_of[d], stage_of[c] + 1)
+        stages: list[list[int]] = [[] for _ in range(max(stage_of, default=-1) + 1)]
+        for c, members in enumerate(components):
+            stages[stage_of[c]].extend(todo[n] for n in members)
+        names = [self._names(nodes) for nodes in stages]
+        return RegenerationPlan(
+            edited=self._names(edited),
+            sections=tuple(name for stage in names for name in stage),
+            stages=tuple(names),
+            cycles=tuple(sorted(
+                (self._names(todo[n] for n in members) for members in components if len(members) > 1),
+                key=lambda cycle: self._position[cycle[0]],
+            )),
+        )
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _strongly_connected(edges: list[list[int]]) -> list[list[int]]:
+    """Tarjan's algorithm, iterative; components come out sinks first."""
+    index = [-1] * len(edges)
+    low = [0] * len(edges)
+    on_stack = [False] * len(edges)
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for root in range(len(edges)):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, i = work.pop()
+            if i == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            else:
+                low[node] = min(low[node], low[edges[node][i - 1]])
+            while i < len(edges[node]):
+                nxt = edges[node][i]
+                i += 1
+                if index[nxt] == -1:
+                    work.append((node, i))
+                    work.append((nxt, 0))
+                    break
+                if on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+            else:
+                if low[node] == index[node]:
+                    members = []
+                    while True:
+                        top = stack.pop()
+                        on_stack[top] = False
+                        members.append(top)
+                        if top == node:
+                            break
+                    components.append(members)
+    return components
+
+
+graph = SectionGraph(config.SECTION_DEPENDENCIES)
@@ -1,11 +1,71 @@
 # settings.py
 from pydantic_settings import BaseSettings    # now comes from a separate package
 from pydantic.networks import AnyUrl          # URL types still in pydantic.networks
+from functools import lru_cache
+from typing import Literal, Optional
 class Settings(BaseSettings):
     DATABASE_URL: AnyUrl
     AZURE_STORAGE_CONNECTION_STRING: str
     BLOB_CONTAINER: str = "my-container"    # default container name
+    SAS_TTL_SECONDS: int = 900              # lifetime of direct upload/download URLs
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024   # bytes per chunk / staged block
+    UPLOAD_MAX_CONCURRENCY: int = 4            # parallel block transfers per worker
+    ASYNC_IO: bool = False                  # serve I/O-bound routes from async_api
+    # "lifespan" opens the DB pool and clients before serving; "lazy" defers
+    # everything to first use (fastest worker boot, slower first request)
+    STARTUP_MODE: Literal["lifespan", "lazy"] = "lifespan"
+
+    # DB connection pool (per worker process)
+    DB_POOL_SIZE: int = 5                   # connections kept open
+    DB_MAX_OVERFLOW: int = 10               # extra connections allowed under burst
+    DB_POOL_TIMEOUT: float = 30.0           # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800             # reopen connections older than this (s); -1 = never
+    # "pessimistic" pings on every checkout; "optimistic" skips the ping and
+    # relies on DB_POOL_RECYCLE plus invalidation when a disconnect is seen
+    DB_PRE_PING: Literal["pessimistic", "optimistic"] = "pessimistic"
+
+    # optional read replica for the read-only GET routes (see db.get_read_db);
+    # reads fall back to the primary while it is unreachable or lagging
+    DATABASE_READ_URL: Optional[AnyUrl] = None
+    REPLICA_MAX_LAG_SECONDS: float = 5.0    # replay lag above this sends reads to the primary
+    REPLICA_CHECK_SECONDS: float = 10.0     # how often replica health and lag are probed
+
+    # encode full-view concept listings straight from rows (see fast_json)
+    # instead of validating ORM objects against response_model
+    FAST_JSON: bool = False
+
+    # request timing (Server-Timing is always on) and the sampling profiler
+    TIMING_LOG_MIN_MS: float = 250          # log a JSON timing record for slower requests
+    PROFILER: Literal["off", "header", "always"] = "off"   # "header": only with X-Profile: 1
+    PROFILE_MIN_MS: float = 500             # write folded stacks for slower profiled requests
+    PROFILE_INTERVAL_MS: float = 5          # sampling interval
+    PROFILE_DIR: str = "profiles"
+
+    # write-behind embedding (see embedding_queue); "inline" embeds inside
+    # the POST /concepts request as before
+    EMBED_WRITE_MODE: Literal["background", "inline"] = "background"
+    EMBED_QUEUE_WORKERS: int = 2            # embedding threads per worker process
+    EMBED_QUEUE_BATCH: int = 64             # jobs per embeddings call
+    EMBED_QUEUE_LINGER_MS: float = 50       # wait this long for a batch to fill
+    EMBED_QUEUE_MAX_QUEUED: int = 1000      # in-memory queue bound; overflow waits in the table
+    EMBED_QUEUE_MAX_PENDING: int = 10000    # outstanding jobs before POST /concepts answers 503
+    EMBED_QUEUE_POLL_SECONDS: float = 5     # how often the table is re-read for due jobs
+    EMBED_QUEUE_LEASE_SECONDS: int = 120    # a claimed job is retried after this if never finished
+    EMBED_JOB_MAX_ATTEMPTS: int = 8         # then the job is parked for backfill_embeddings.py
+
+    # read-through response cache for /problems, /concepts, /concepts/similar
+    RESPONSE_CACHE: Literal["off", "memory", "redis"] = "memory"
+    RESPONSE_CACHE_TTL: int = 300           # seconds
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024  # per worker, memory backend only
+    REDIS_URL: Optional[str] = None         # required for RESPONSE_CACHE=redis
 
     class Config:
         env_file = ".env"      # for local dev
         env_file_encoding = "utf-8"
+        extra = "ignore"       # .env is shared with the frontend (VITE_*)
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The process-wide Settings instance; env/.env are parsed once."""
+    return Settings()
@@ -0,0 +1,352 @@
+# similarity_index.py
+"""In-process vector index over persisted problem-statement embeddings.
+
+Vectors are held in one contiguous matrix in a compact form: float16, or
+int8 with a per-vector scale (4x smaller than float32), optionally cut to
+a Matryoshka prefix of VECTOR_INDEX_DIM dimensions (text-embedding-3
+vectors stay meaningful when truncated and re-normalized).  A query is
+answered in two stages:
+
+1. a coarse scan: a blocked matrix-vector product over the compact
+   matrix, keeping up to VECTOR_RERANK_CANDIDATES statements that score
+   above `min_similarity - VECTOR_COARSE_MARGIN`;
+2. an exact re-rank of those candidates with their full-precision
+   float32 vectors loaded from `problem_embeddings`.
+
+So 3072-dim embeddings cost 3 KB each in RAM with int8 (768 B with a
+768-dim prefix) instead of 12 KB as float32.  int8 is the default:
+numpy's half-to-single conversion is slow, so float16 scans run several
+times slower than int8 for only half the saving.  `measure_recall` compares
+a compact index against the exact float32 path; run
+`python measure_recall.py` before changing the defaults.  With
+VECTOR_INDEX_DTYPE=float32 and no truncation the coarse scan is exact
+and the re-rank is skipped.
+
+The index is append-only: new statements are added as
+`crud.create_concepts` stores them, and `sync()` picks up rows written
+by other workers by reading only ProblemEmbedding ids above the last one
+seen.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+from config import (
+    VECTOR_COARSE_MARGIN,
+    VECTOR_INDEX_DIM,
+    VECTOR_INDEX_DTYPE,
+    VECTOR_RERANK_CANDIDATES,
+)
+from embedding import EMBED_MODEL, bytes_to_vector
+
+# Matches below this cosine score are never returned by /concepts/similar.
+DEFAULT_MIN_SIMILARITY = 0.7
+
+# rows per block in the coarse scan: the float32 temporary stays
+# cache-sized (BLOCK_ROWS * dim * 4 bytes) however large the index grows
+BLOCK_ROWS = 1024
+SYNC_BATCH = 2000
+# ids are handed out before commit, so a lower id can become visible after a
+# higher one was synced; each sync re-checks this many ids below the mark
+SYNC_OVERLAP = 1000
+
+ExactLoader = Callable[[list[str]], dict[str, np.ndarray]]
+
+
+def unit_vector(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32).ravel()
+    n = np.linalg.norm(v)
+    return v / n if n else v
+
+
+def quantize_int8(v: np.ndarray) -> tuple[np.ndarray, float]:
+    """Symmetric int8 codes for `v` plus the scale that restores it."""
+    peak = float(np.abs(v).max())
+    scale = peak / 127 if peak else 1.0
+    return np.round(v / scale).astype(np.int8), scale
+
+
+class SimilarityIndex:
+    """Append-only cosine index keyed by problem-statement content hash."""
+
+    def __init__(
+        self,
+        model: str = EMBED_MODEL,
+        initial_capacity: int = 1024,
+        dtype: str = VECTOR_INDEX_DTYPE,
+        dim: int = VECTOR_INDEX_DIM,
+        rerank_candidates: int = VECTOR_RERANK_CANDIDATES,
+        coarse_margin: float = VECTOR_COARSE_MARGIN,
+    ):
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        self.model = model
+        self.dtype = np.dtype(dtype)
+        self.truncate_to = dim or None
+        self.rerank_candidates = rerank_candidates
+        self.coarse_margin = coarse_margin
+        self._capacity = initial_capacity
+        self._matrix: np.ndarray | None = None   # allocated once the dim is known
+        self._scales: np.ndarray | None = None   # per-row dequantization scale (int8 only)
+        self._full_dim: int | None = None
+        self._statements: list[str] = []
+        self._keys: list[str] = []
+        self._hashes: set[str] = set()
+        self._last_id = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    @property
+    def dim(self) -> int | None:
+        """Dimension of the vectors added (before any truncation)."""
+        return self._full_dim
+
+    @property
+    def keys(self) -> list[str]:
+        """Content hashes of the indexed statements, in insertion order."""
+        return list(self._keys)
+
+    @property
+    def exact(self) -> bool:
+        """True when coarse scores are already exact cosine similarities."""
+        return self.dtype == np.float32 and (self.truncate_to is None or self.truncate_to >= (self._full_dim or 0))
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """RAM per indexed vector: the compact row plus its scale, if any."""
+        if self._matrix is None:
+            return 0
+        return self._matrix.shape[1] * self.dtype.itemsize + (4 if self._scales is not None else 0)
+
+    # ─── Encoding ────────────────────────────────────────────────────────────
+    def _coarse(self, unit: np.ndarray) -> np.ndarray:
+        """The Matryoshka prefix of a unit vector, re-normalized."""
+        if self.truncate_to is None or self.truncate_to >= unit.shape[0]:
+            return unit
+        return unit_vector(unit[: self.truncate_to])
+
+    def _encode(self, unit: np.ndarray) -> tuple[np.ndarray, float]:
+        v = self._coarse(unit)
+        if self.dtype == np.int8:
+            return quantize_int8(v)
+        return v.astype(self.dtype), 1.0
+
+    # ─── Writes ──────────────────────────────────────────────────────────────
+    def _allocate(self, full_dim: int) -> None:
+        self._full_dim = full_dim
+        width = self._coarse(np.ones(full_dim, dtype=np.float32)).shape[0]
+        self._matrix = np.empty((self._capacity, width), dtype=self.dtype)
+        if self.dtype == np.int8:
+            self._scales = np.empty(self._capacity, dtype=np.float32)
+
+    def _grow(self, needed: int) -> None:
+        if self._matrix.shape[0] >= needed:
+            return
+        cap = self._matrix.shape[0]
+        while cap < needed:
+            cap *= 2
+        grown = np.empty((cap, self._matrix.shape[1]), dtype=self.dtype)
+        grown[: len(self)] = self._matrix[: len(self)]
+        self._matrix = grown
+        if self._scales is not None:
+            scales = np.empty(cap, dtype=np.float32)
+            scales[: len(self)] = self._scales[: len(self)]
+            self._scales = scales
+
+    def add(self, key: str, statement: str, vector) -> bool:
+        """
+        Append one statement.  Returns False if `key` is already indexed.
+        """
+        v = unit_vector(vector)
+        with self._lock:
+            if key in self._hashes:
+                return False
+            if self._matrix is None:
+                self._allocate(v.shape[0])
+            elif v.shape[0] != self._full_dim:
+                raise ValueError(f"Vector dim {v.shape[0]} does not match index dim {self._full_dim}")
+            n = len(self)
+            self._grow(n + 1)
+            self._matrix[n], scale = self._encode(v)
+            if self._scales is not None:
+                self._scales[n] = scale
+            self._statements.append(statement)
+            self._keys.append(key)
+            self._hashes.add(key)
+            return True
+
+    def add_row(self, row: "models.ProblemEmbedding") -> bool:
+        return self.add(row.content_hash, row.problem_statement, bytes_to_vector(row.vector))
+
+    def sync(self, db: Session) -> int:
+        """Load embeddings persisted since the last sync.  Returns rows added."""
+        pe = models.ProblemEmbedding
+        columns = (pe.id, pe.content_hash, pe.problem_statement, pe.vector)
+        added = 0
+        if self._last_id:
+            # only hashes for the trailing window; vectors just for the misses
+            window = db.execute(
+                select(pe.id, pe.content_hash).where(
+                    pe.model == self.model,
+                    pe.id > self._last_id - SYNC_OVERLAP,
+                    pe.id <= self._last_id,
+                )
+            )
+            late = [row_id for row_id, key in window if key not in self._hashes]
+            if late:
+                rows = db.execute(select(*columns).where(pe.id.in_(late)).order_by(pe.id))
+                with self._lock:
+                    for row in rows:
+                        added += self.add_row(row)
+        stmt = (
+            select(*columns)
+            .where(pe.model == self.model, pe.id > self._last_id)
+            .order_by(pe.id)
+            .execution_options(yield_per=SYNC_BATCH)
+        )
+        # streamed in batches, so a cold start over many rows never holds
+        # them all as float32, and searches can run between batches
+        for batch in db.execute(stmt).partitions():
+            with self._lock:
+                for row in batch:
+                    added += self.add_row(row)
+                    self._last_id = max(self._last_id, row.id)
+        return added
+
+    # ─── Reads ───────────────────────────────────────────────────────────────
+    def _coarse_scores(self, q: np.ndarray, n: int) -> np.ndarray:
+        qc = self._coarse(q)
+        if self.dtype == np.float32:
+            return self._matrix[:n] @ qc
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, n)
+            scores[start:end] = self._matrix[start:end].astype(np.float32) @ qc
+        if self._scales is not None:
+            scores *= self._scales[:n]
+        return scores
+
+    @staticmethod
+    def _best(scores: np.ndarray, threshold: float, k: int) -> np.ndarray:
+        """Indices of up to `k` scores strictly above `threshold`, best first."""
+        candidates = np.flatnonzero(scores > threshold)
+        if candidates.size > k:
+            part = np.argpartition(scores[candidates], -k)[-k:]
+            candidates = candidates[part]
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    def search(
+        self,
+        query,
+        top_k: int = 5,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+        exact_vectors: Optional[ExactLoader] = None,
+    ) -> list[tuple[str, float]]:
+        """
+        Return up to `top_k` (statement, similarity) pairs scoring strictly
+        above `min_similarity`, best first.  For a compact index,
+        `exact_vectors(keys)` supplies the full-precision vectors used to
+        re-rank the coarse candidates; without it the (approximate)
+        coarse scores are returned.
+        """
+        q = unit_vector(query)
+        with self._lock:
+            n = len(self)
+            if n == 0 or top_k <= 0:
+                return []
+            scores = self._coarse_scores(q, n)
+            statements, keys = self._statements, self._keys
+            exact = self.exact
+
+        if exact or exact_vectors is None:
+            order = self._best(scores, min_similarity, top_k)
+            return [(statements[i], float(scores[i])) for i in order]
+
+        coarse = self._best(scores, min_similarity - self.coarse_margin, max(top_k, self.rerank_candidates))
+        if coarse.size == 0:
+            return []
+        found = exact_vectors([keys[i] for i in coarse])
+        rows = [i for i in coarse if keys[i] in found]
+        if not rows:
+            return []
+        full = np.stack([unit_vector(found[keys[i]]) for i in rows])
+        exact_scores = full @ q
+        order = self._best(exact_scores, min_similarity, top_k)
+        return [(statements[rows[j]], float(exact_scores[j])) for j in order]
+
+
+def load_exact_vectors(db: Session, keys: list[str], model: str = EMBED_MODEL) -> dict[str, np.ndarray]:
+    """Full-precision vectors for the re-rank stage, keyed by content hash."""
+    pe = models.ProblemEmbedding
+    rows = db.execute(
+        select(pe.content_hash, pe.vector).where(pe.model == model, pe.content_hash.in_(keys))
+    )
+    return {h: bytes_to_vector(raw) for h, raw in rows}
+
+
+_index: SimilarityIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index(db: Session) -> SimilarityIndex:
+    """Return the process-wide index, brought up to date with the DB."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+    _index.sync(db)
+    return _index
+
+
+def index_embedding(row: "models.ProblemEmbedding") -> None:
+    """
+    Append a freshly stored embedding to the live index, if one is loaded.
+    The high-water mark is left alone so rows other workers committed in
+    between are still picked up by the next `sync()`.
+    """
+    if _index is not None and row.model == _index.model:
+        _index.add_row(row)
+
+
+# ─── Recall measurement ───────────────────────────────────────────────────────
+def measure_recall(
+    compact: SimilarityIndex,
+    exact: SimilarityIndex,
+    queries: list[np.ndarray],
+    top_k: int,
+    min_similarity: float,
+    exact_vectors: ExactLoader,
+) -> dict:
+    """
+    Recall@top_k of `compact` (two-stage) against `exact` (float32, full
+    dims) over `queries`, plus memory per vector and mean query time.
+    Queries the exact path has no match for are skipped.
+    """
+    hits = total = 0
+    timings = {"compact": 0.0, "exact": 0.0}
+    for q in queries:
+        start = time.perf_counter()
+        truth = {s for s, _ in exact.search(q, top_k, min_similarity)}
+        timings["exact"] += time.perf_counter() - start
+        start = time.perf_counter()
+        got = {s for s, _ in compact.search(q, top_k, min_similarity, exact_vectors)}
+        timings["compact"] += time.perf_counter() - start
+        if truth:
+            hits += len(truth & got)
+            total += len(truth)
+    n = max(len(queries), 1)
+    return {
+        "queries": len(queries),
+        "recall": hits / total if total else None,
+        "bytes_per_vector": {"compact": compact.bytes_per_vector, "exact": exact.bytes_per_vector},
+        "mean_query_ms": {k: v * 1000 / n for k, v in timings.items()},
+    }
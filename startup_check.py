@@ -0,0 +1,79 @@
+# startup_check.py
+"""Guard against cold-start regressions.
+
+Imports `main` in fresh interpreters, with only the settings the API
+actually requires (a throwaway SQLite URL and a storage connection
+string, no OpenAI/SERP secrets), and fails when:
+
+* the median import time exceeds the budget;
+* the import touched the database (schema belongs to Alembic, the
+  engine is built lazily);
+* the import pulled in the OpenAI or Azure Blob SDKs, which are only
+  needed on first use.
+
+    python startup_check.py                 # budget from STARTUP_BUDGET_MS or 2000 ms
+    python startup_check.py --budget-ms 800 --runs 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LAZY_MODULES = ("openai", "azure.storage.blob")
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def probe(db_path: str) -> dict:
+    env = {
+        "PATH": os.environ.get("PATH", ""),
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "AZURE_STORAGE_CONNECTION_STRING": "UseDevelopmentStorage=true",
+    }
+    # run from an empty directory so a developer's .env can't leak in
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _PROBE],
+        cwd=os.path.dirname(db_path), env={**env, "PYTHONPATH": HERE},
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Fail if importing the API got slower or eager again.")
+    p.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "2000")))
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="startup-") as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        runs = [probe(db_path) for _ in range(args.runs)]
+        if os.path.exists(db_path):
+            failures.append("importing main opened the database")
+
+    median = statistics.median(r["ms"] for r in runs)
+    print(f"import main: median {median:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    if loaded:
+        failures.append(f"imported eagerly: {', '.join(loaded)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
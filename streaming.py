@@ -0,0 +1,108 @@
+# streaming.py
+"""Opt-in NDJSON streaming for the large concept listings.
+
+Clients sending `Accept: application/x-ndjson` get one JSON object per
+line, written a batch at a time as rows come off a server-side cursor
+(`yield_per`), so memory stays flat however many concepts match.  Each
+stream owns its session: the request-scoped one from `get_read_db` may
+be closed before the body has finished sending.  Like that one, it
+reads from the replica when one is in rotation.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+import crud
+import db as db_module
+import fast_json
+from embedding import content_hash
+from pagination import decode_cursor
+from schemas import ConceptFilters, ConceptRead, ConceptSummary
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+YIELD_PER = 500
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _dump_concept(row, summary: bool) -> str:
+    schema = ConceptSummary if summary else ConceptRead
+    return schema.model_validate(row, from_attributes=True).model_dump_json()
+
+
+def _dump_similar(row, summary: bool, groups: dict[str, tuple[str, float]]) -> str:
+    # rows lead with their problem's content_hash (see crud.similar_concepts_stmt)
+    stmt, similarity = groups[row[0]]
+    schema = ConceptSummary if summary else ConceptRead
+    line = schema.model_validate(row if summary else row[1], from_attributes=True).model_dump(mode="json")
+    return json.dumps({"problem_statement": stmt, "similarity": similarity, **line}, separators=(",", ":"))
+
+
+# Bodies go out one fetched batch of rows at a time: StreamingResponse
+# runs each step of a sync iterator in the threadpool, so yielding per
+# row would cost a thread hop per row.
+def _iter_sync(stmt, scalars: bool, dump):
+    with db_module.read_sessionmaker()() as session:
+        result = session.execute(stmt.execution_options(yield_per=YIELD_PER))
+        for part in (result.scalars() if scalars else result).partitions():
+            yield "".join([dump(row) + "\n" for row in part])
+
+
+async def _iter_async(stmt, scalars: bool, dump):
+    async with db_module.async_read_sessionmaker()() as session:
+        result = await session.stream(stmt.execution_options(yield_per=YIELD_PER))
+        async for part in (result.scalars() if scalars else result).partitions():
+            yield "".join([dump(row) + "\n" for row in part])
+
+
+def _response(stmt, scalars: bool, dump, use_async: bool) -> StreamingResponse:
+    body = _iter_async(stmt, scalars, dump) if use_async else _iter_sync(stmt, scalars, dump)
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE)
+
+
+def concepts_stream(
+    problem_statement: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str],
+    view: str,
+    use_async: bool = False,
+    filters: Optional[ConceptFilters] = None,
+) -> StreamingResponse:
+    """GET /concepts as NDJSON; `cursor`/`limit` narrow the stream but no next cursor is sent."""
+    summary = view == "summary"
+    fast = not summary and db_module.settings.FAST_JSON
+    stmt = crud.concepts_by_problem_stmt(
+        problem_statement,
+        limit,
+        decode_cursor(cursor, datetime, int) if cursor else None,
+        crud.SUMMARY_COLUMNS if summary else crud.READ_COLUMNS if fast else None,
+        db_module.engine.dialect.name,
+        filters,
+    )
+    if fast:
+        return _response(stmt, False, lambda r: fast_json.encode_concept(r).decode("utf-8"), use_async)
+    return _response(stmt, not summary, lambda r: _dump_concept(r, summary), use_async)
+
+
+def similar_stream(
+    ranked: list[tuple[str, float]],
+    view: str,
+    use_async: bool = False,
+) -> StreamingResponse:
+    """
+    GET /concepts/similar as NDJSON: one line per concept, tagged with its
+    problem_statement and similarity, best-matching group first.
+    """
+    summary = view == "summary"
+    if not ranked:
+        return StreamingResponse(iter(()), media_type=NDJSON_MEDIA_TYPE)
+    groups = {content_hash(stmt): (stmt, sim) for stmt, sim in ranked}
+    stmt = crud.similar_concepts_stmt([stmt for stmt, _ in ranked], crud.SUMMARY_COLUMNS if summary else None)
+    return _response(stmt, False, lambda r: _dump_similar(r, summary, groups), use_async)
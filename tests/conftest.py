@@ -0,0 +1,80 @@
+# tests/conftest.py
+"""Point the app at a throwaway SQLite database before anything imports it."""
+import hashlib
+import os
+import sys
+import tempfile
+import types
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="ideation-tests-")
+# set before the app's modules read them; load_dotenv never overrides these
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_tmp}/test.db",
+    "AZURE_STORAGE_CONNECTION_STRING": "UseDevelopmentStorage=true",
+    "PRODUCTS_ENDPOINT": "https://embeddings.invalid",
+    "PRODUCTS_OPENAI_KEY": "test",
+    "EMBED_WRITE_MODE": "inline",
+    "RESPONSE_CACHE": "off",
+    "CONCEPT_INDEX_PATH": "",
+})
+
+
+class FakeEmbeddings:
+    """`client.embeddings` stand-in: deterministic vectors, every call recorded."""
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.calls: list[list[str]] = []
+
+    def vector(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).tolist()
+
+    def create(self, model, input):
+        batch = list(input) if isinstance(input, list) else [input]
+        self.calls.append(batch)
+        # out of order on purpose: callers must sort by `index`
+        data = [types.SimpleNamespace(index=i, embedding=self.vector(t)) for i, t in enumerate(batch)]
+        return types.SimpleNamespace(data=data[::-1])
+
+
+class FakeClient:
+    def __init__(self):
+        self.embeddings = FakeEmbeddings()
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """Route every sync embedding call in the app to a FakeClient."""
+    import embedding
+
+    client = FakeClient()
+    monkeypatch.setattr(embedding, "_embed_client", client)
+    return client
+
+
+@pytest.fixture(scope="session")
+def migrated():
+    """The test database, upgraded to the Alembic head."""
+    from alembic import command
+
+    import db
+
+    command.upgrade(db.alembic_config(db.engine.url), "head")
+    return db
+
+
+@pytest.fixture
+def client(migrated):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # no `with`: the lifespan warm-up and write-behind worker stay off
+    return TestClient(main.app)
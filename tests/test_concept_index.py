@@ -0,0 +1,34 @@
+import numpy as np
+
+import concept_index
+import crud
+import models
+from embedding import EMBED_MODEL, vector_to_bytes
+
+
+def _store(db, concept_id, seed):
+    vector = np.random.default_rng(seed).standard_normal(32).astype(np.float32)
+    row = models.ConceptEmbedding(concept_id=concept_id, content_hash=f"h{seed}", model=EMBED_MODEL, dim=32, vector=vector_to_bytes(vector))
+    db.add(row)
+    db.commit()
+    return vector
+
+
+def test_sync_only_when_another_worker_stored_vectors(migrated, monkeypatch):
+    monkeypatch.setattr(concept_index, "_index", None)
+    with migrated.SessionLocal() as db:
+        index = concept_index.get_index(db)
+        assert not index.stale(db)
+        syncs = []
+        real_sync = index.sync
+        monkeypatch.setattr(index, "sync", lambda session: syncs.append(1) or real_sync(session))
+
+        concept_index.get_index(db)
+        assert syncs == []
+
+        concept = crud.create_concept(db, {"problem_statement": "concept index sync", "title": "t"})
+        vector = _store(db, concept.id, 1)   # as if written by another process
+        assert index.stale(db)
+        concept_index.get_index(db)
+        assert syncs == [1] and not index.stale(db)
+        assert index.search(vector, 1)[0][0] == concept.id
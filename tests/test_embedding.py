@@ -0,0 +1,131 @@
+import asyncio
+import types
+
+import pytest
+
+import embedding
+from conftest import FakeClient
+
+
+def test_embed_texts_dedups_and_keeps_order():
+    client = FakeClient()
+    texts = ["b", "a", "b", "c", "a"]
+    vectors = embedding.embed_texts(texts, client=client)
+    assert vectors == [client.embeddings.vector(t) for t in texts]
+    assert client.embeddings.calls == [["b", "a", "c"]]
+
+
+@pytest.mark.parametrize("max_inputs, max_chars, calls", [
+    (2, 10_000, [["t0", "t1"], ["t2", "t3"], ["t4"]]),
+    (100, 5, [["t0", "t1"], ["t2", "t3"], ["t4"]]),
+    (100, 1, [["t0"], ["t1"], ["t2"], ["t3"], ["t4"]]),   # an oversized text still goes alone
+])
+def test_embed_texts_batches(max_inputs, max_chars, calls):
+    client = FakeClient()
+    texts = [f"t{i}" for i in range(5)]
+    vectors = embedding.embed_texts(texts, client=client, max_inputs=max_inputs, max_chars=max_chars)
+    assert vectors == [client.embeddings.vector(t) for t in texts]
+    assert sorted(client.embeddings.calls) == calls
+
+
+class _Status(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class _Flaky(FakeClient):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = list(failures)
+        create = self.embeddings.create
+
+        def flaky(model, input):
+            if self.failures:
+                raise self.failures.pop(0)
+            return create(model, input)
+
+        self.embeddings = types.SimpleNamespace(create=flaky, vector=self.embeddings.vector, calls=self.embeddings.calls)
+
+
+def test_embed_texts_retries_throttling(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(embedding.time, "sleep", sleeps.append)
+    client = _Flaky([_Status(429), _Status(503)])
+    assert embedding.embed_texts(["x"], client=client) == [client.embeddings.vector("x")]
+    assert len(sleeps) == 2
+
+
+def test_embed_texts_does_not_retry_client_errors(monkeypatch):
+    monkeypatch.setattr(embedding.time, "sleep", lambda s: pytest.fail("retried a 400"))
+    with pytest.raises(_Status):
+        embedding.embed_texts(["x"], client=_Flaky([_Status(400)]))
+    assert not embedding._inflight   # a failed batch does not wedge later callers
+
+
+class _Short(FakeClient):
+    """Drops the last vector of every response."""
+
+    def __init__(self):
+        super().__init__()
+        create = self.embeddings.create
+
+        def short(model, input):
+            resp = create(model, input)
+            resp.data = sorted(resp.data, key=lambda d: d.index)[:-1]
+            return resp
+
+        self.embeddings = types.SimpleNamespace(create=short, vector=self.embeddings.vector, calls=self.embeddings.calls)
+
+
+def test_embed_texts_short_response_raises():
+    with pytest.raises(RuntimeError, match="2 vectors for 3 inputs"):
+        embedding.embed_texts(["s1", "s2", "s3"], client=_Short())
+    assert not embedding._inflight
+    client = FakeClient()
+    assert embedding.embed_texts(["s1"], client=client) == [client.embeddings.vector("s1")]
+
+
+def test_aembed_texts_short_response_raises():
+    short = _Short()
+
+    class AsyncEmbeddings:
+        async def create(self, model, input):
+            return short.embeddings.create(model, input)
+
+    with pytest.raises(RuntimeError, match="1 vectors for 2 inputs"):
+        asyncio.run(embedding.aembed_texts(["a1", "a2"], client=types.SimpleNamespace(embeddings=AsyncEmbeddings())))
+    assert not embedding._async_inflight
+
+
+def test_aembed_texts():
+    client = FakeClient()
+
+    class AsyncEmbeddings:
+        async def create(self, model, input):
+            return client.embeddings.create(model, input)
+
+    texts = ["p", "q", "p"]
+    vectors = asyncio.run(embedding.aembed_texts(texts, client=types.SimpleNamespace(embeddings=AsyncEmbeddings()), max_inputs=1))
+    assert vectors == [client.embeddings.vector(t) for t in texts]
+    assert sorted(client.embeddings.calls) == [["p"], ["q"]]
+
+
+def test_inline_writes_embed_with_one_batch(client, fake_client):
+    statement = "fake  client\tcleaning robots"
+    body = [{"problem_statement": statement, "title": f"robot {i}", "description": "d"} for i in range(3)]
+    r = client.post("/concepts", json=body)
+    assert r.status_code == 200, r.text
+    # the statement once, then every concept in a single request
+    assert fake_client.embeddings.calls[0] == [embedding.normalize_text(statement)]
+    assert len(fake_client.embeddings.calls[1]) == 3
+
+    r = client.get("/concepts/similar", params={"problem_statement": "fake client cleaning robots"})
+    assert r.status_code == 200, r.text
+    best = r.json()[0]
+    assert best["problem_statement"] == statement
+    assert best["similarity"] == pytest.approx(1.0, abs=1e-3)
+    assert sorted(c["title"] for c in best["concepts"]) == ["robot 0", "robot 1", "robot 2"]
+
+    r = client.post("/concepts/batch-lookup", params={"view": "summary"}, json={"problem_statements": ["fake client cleaning robots"]})
+    assert [len(group["concepts"]) for group in r.json()] == [3]
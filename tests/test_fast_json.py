@@ -0,0 +1,94 @@
+import functools
+import json
+from datetime import datetime
+
+import pydantic_core
+import pytest
+
+import crud
+import fast_json
+from schemas import ConceptRead
+from settings import get_settings
+
+CONCEPT = {
+    "id": 7,
+    "problem_statement": "héllo wörld",
+    "agent": "A",
+    "title": 'ü "quoted" \n line',
+    "trl": 3.0,
+    "validated_trl": 7.25,
+    "components": [{"a": 1, "b": [1, 2.5, None, "x"]}],
+    "references": {"k": "v"},
+    "trl_citations": "plain",
+    "generated_at": datetime(2026, 1, 2, 3, 4, 5, 678000),
+}
+
+
+def _row(values: dict) -> tuple:
+    """A crud.READ_COLUMNS row: JSON columns as the text the database stores."""
+    return tuple(
+        (None if values.get(f) is None else json.dumps(values[f])) if f in crud.JSON_COLUMNS else values.get(f)
+        for f in crud.READ_FIELDS
+    )
+
+
+def _expected(values: dict) -> str:
+    return ConceptRead.model_validate(values).model_dump_json()
+
+
+@pytest.fixture(params=["default", "pydantic_core"])
+def encoder(request, monkeypatch):
+    if request.param == "pydantic_core":
+        monkeypatch.setattr(fast_json, "_dumps", functools.partial(pydantic_core.to_json, inf_nan_mode="null"))
+    return request.param
+
+
+@pytest.mark.parametrize("values", [CONCEPT, {"id": 1, "problem_statement": "p", "title": "t", "generated_at": datetime(2026, 1, 1)}])
+def test_encode_concept_matches_concept_read(encoder, values):
+    body = fast_json.encode_concept(_row(values))
+    expected = _expected(values)
+    assert json.loads(body) == json.loads(expected)
+    assert list(json.loads(body)) == list(ConceptRead.model_fields)
+
+
+def test_encode_concepts_and_grouped(encoder):
+    rows = [_row(CONCEPT), _row({**CONCEPT, "id": 8, "components": None})]
+    assert json.loads(fast_json.encode_concepts(rows)) == [json.loads(_expected(CONCEPT)), json.loads(_expected({**CONCEPT, "id": 8, "components": None}))]
+    assert fast_json.encode_concepts([]) == b"[]"
+
+    response = fast_json.grouped_response({"héllo": [("hash", *rows[0])], "none": []})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == [
+        {"problem_statement": "héllo", "concepts": [json.loads(_expected(CONCEPT))]},
+        {"problem_statement": "none", "concepts": []},
+    ]
+
+
+BODY = [
+    {"problem_statement": "fast json  check", "title": 'ü "quoted" \n line', "agent": "A", "trl": 3,
+     "components": [{"a": 1, "b": [1, 2.5, None, "x"]}], "references": {"k": "v"}},
+    {"problem_statement": "fast json  check", "title": "t2", "validated_trl": 7.25, "components": [], "trl_citations": "plain"},
+]
+
+
+def test_listings_match_default_path(client, fake_client, monkeypatch):
+    r = client.post("/concepts", params={"bulk": "true"}, json=BODY)
+    assert r.status_code == 200, r.text
+    settings = get_settings()
+
+    def fetch():
+        return [
+            client.get("/concepts", params={"problem_statement": "fast json"}).json(),
+            client.post("/concepts/batch-lookup", json={"problem_statements": ["fast json check", "missing"]}).json(),
+            client.get("/concepts", params={"problem_statement": "fast json"}, headers={"accept": "application/x-ndjson"}).text,
+        ]
+
+    monkeypatch.setattr(settings, "FAST_JSON", False)
+    default = fetch()
+    monkeypatch.setattr(settings, "FAST_JSON", True)
+    fast = fetch()
+    assert [c["title"] for c in default[0]] == [b["title"] for b in BODY]
+    assert [len(group["concepts"]) for group in default[1]] == [2, 0]   # matched on the normalized statement
+    assert fast[0] == default[0]
+    assert fast[1] == default[1]
+    assert [json.loads(line) for line in fast[2].splitlines()] == [json.loads(line) for line in default[2].splitlines()]
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import http_ranges
+from http_ranges import RangeNotSatisfiable, content_disposition, requested_range
+
+ETAG = '"0x8DC1"'
+MODIFIED = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _request(headers: dict[str, str] | None = None) -> Request:
+    raw = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def _props(size: int, content_type: str | None = "application/pdf"):
+    return SimpleNamespace(
+        size=size,
+        etag=ETAG,
+        last_modified=MODIFIED,
+        content_settings=SimpleNamespace(content_type=content_type),
+    )
+
+
+@pytest.mark.parametrize("header, span", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+])
+def test_requested_range(header, span):
+    assert requested_range(_request({"range": header}), 100, ETAG) == span
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"range": "bytes=0-1,5-6"},            # multi-range: full body
+    {"range": "items=0-1"},
+    {"range": "bytes=a-b"},                # malformed: ignored
+    {"range": "bytes=0-9", "if-range": '"stale"'},
+])
+def test_requested_range_full_body(headers):
+    assert requested_range(_request(headers), 100, ETAG) is None
+
+
+def test_if_range_match_keeps_range():
+    assert requested_range(_request({"range": "bytes=0-0", "if-range": ETAG}), 100, ETAG) == (0, 0)
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=100-", 100),
+    ("bytes=5-2", 100),
+    ("bytes=-0", 100),
+    ("bytes=-10", 0),                      # suffix of an empty blob
+    ("bytes=0-", 0),
+])
+def test_requested_range_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        requested_range(_request({"range": header}), size, ETAG)
+
+
+def test_is_not_modified():
+    assert http_ranges.is_not_modified(_request({"if-none-match": f'W/"x", {ETAG}'}), ETAG, MODIFIED)
+    assert http_ranges.is_not_modified(_request({"if-none-match": "*"}), ETAG, MODIFIED)
+    assert not http_ranges.is_not_modified(_request({"if-none-match": '"x"'}), ETAG, MODIFIED)
+    later = format_datetime(MODIFIED + timedelta(hours=1), usegmt=True)
+    earlier = format_datetime(MODIFIED - timedelta(hours=1), usegmt=True)
+    assert http_ranges.is_not_modified(_request({"if-modified-since": later}), ETAG, MODIFIED)
+    assert not http_ranges.is_not_modified(_request({"if-modified-since": earlier}), ETAG, MODIFIED)
+    assert not http_ranges.is_not_modified(_request({"if-modified-since": "garbage"}), ETAG, MODIFIED)
+    # If-None-Match wins over If-Modified-Since
+    assert not http_ranges.is_not_modified(_request({"if-none-match": '"x"', "if-modified-since": later}), ETAG, MODIFIED)
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("proposal.pdf", 'inline; filename="proposal.pdf"'),
+    ("README", 'inline; filename="README"'),
+    ("résumé.pdf", "inline; filename=\"resume.pdf\"; filename*=UTF-8''r%C3%A9sum%C3%A9.pdf"),
+    ("提案.pdf", "inline; filename=\"proposal.pdf\"; filename*=UTF-8''%E6%8F%90%E6%A1%88.pdf"),
+    ('a "b".pdf', "inline; filename=\"a _b_.pdf\"; filename*=UTF-8''a%20%22b%22.pdf"),
+])
+def test_content_disposition(filename, expected):
+    value = content_disposition("inline", filename)
+    assert value == expected
+    value.encode("latin-1")   # Starlette encodes header values as latin-1
+
+
+def test_plan_download_full_and_partial():
+    status, headers, offset, length = http_ranges.plan_download(_request(), "proposals/1/abc-report.pdf", _props(100))
+    assert (status, offset, length) == (200, None, None)
+    assert headers["content-length"] == "100"
+    assert headers["content-type"] == "application/pdf"
+    assert headers["accept-ranges"] == "bytes"
+
+    status, headers, offset, length = http_ranges.plan_download(
+        _request({"range": "bytes=10-19"}), "proposals/1/abc-report.pdf", _props(100)
+    )
+    assert (status, offset, length) == (206, 10, 10)
+    assert headers["content-range"] == "bytes 10-19/100"
+    assert headers["content-length"] == "10"
+
+
+def test_plan_download_not_modified():
+    status, headers, _, _ = http_ranges.plan_download(
+        _request({"if-none-match": ETAG, "range": "bytes=0-9"}), "report.pdf", _props(100)
+    )
+    assert status == 304
+    assert set(headers) == {"etag", "last-modified"}
+
+
+def test_plan_download_guesses_generic_content_type():
+    _, headers, _, _ = http_ranges.plan_download(_request(), "report.pdf", _props(10, "application/octet-stream"))
+    assert headers["content-type"] == "application/pdf"
+
+
+def test_plan_download_empty_blob_suffix_is_416():
+    with pytest.raises(HTTPException) as exc:
+        http_ranges.plan_download(_request({"range": "bytes=-1"}), "empty.pdf", _props(0))
+    assert exc.value.status_code == 416
+    assert exc.value.headers["content-range"] == "bytes */0"
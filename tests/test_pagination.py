@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+
+from pagination import decode_cursor, encode_cursor, set_next_cursor, split_page
+
+
+def test_cursor_round_trip():
+    when = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    token = encode_cursor(when, 42)
+    assert "=" not in token
+    assert decode_cursor(token, datetime, int) == (when, 42)
+
+
+def test_cursor_round_trip_text():
+    token = encode_cursor(0.8125, "héllo / wörld")
+    assert decode_cursor(token, float, str) == (0.8125, "héllo / wörld")
+
+
+@pytest.mark.parametrize("token", ["", "not a cursor", encode_cursor(1), encode_cursor("x", 2, 3), encode_cursor("when", 1)])
+def test_invalid_cursor_is_400(token):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token, datetime, int)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("rows, limit, page, more", [
+    ([1, 2, 3], None, [1, 2, 3], False),
+    ([1, 2, 3], 3, [1, 2, 3], False),
+    ([1, 2, 3], 2, [1, 2], True),
+    ([], 5, [], False),
+])
+def test_split_page(rows, limit, page, more):
+    assert split_page(rows, limit) == (page, more)
+
+
+def test_set_next_cursor():
+    request = Request({
+        "type": "http", "method": "GET", "scheme": "http", "server": ("testserver", 80),
+        "path": "/concepts", "query_string": b"limit=2&cursor=old", "headers": [],
+    })
+    response = Response()
+    set_next_cursor(request, response, "abc")
+    assert response.headers["x-next-cursor"] == "abc"
+    assert response.headers["link"] == '<http://testserver/concepts?limit=2&cursor=abc>; rel="next"'
+
+    last = Response()
+    set_next_cursor(request, last, None)
+    assert "x-next-cursor" not in last.headers
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pytest
+
+import crud
+import main
+from storage import get_container_client
+
+
+@pytest.fixture
+def container(client):
+    fake = SimpleNamespace(container_name="proposals")
+    main.app.dependency_overrides[get_container_client] = lambda: fake
+    yield fake
+    main.app.dependency_overrides.pop(get_container_client, None)
+
+
+@pytest.mark.parametrize("route", ["/concepts/{id}/download", "/concepts/{id}/proposal/download-url"])
+def test_proposal_in_another_container_is_404(client, container, migrated, route):
+    with migrated.SessionLocal() as db:
+        concept = crud.create_concept(db, {
+            "problem_statement": "proposal elsewhere",
+            "title": "t",
+            "proposal_url": "https://other.blob.core.windows.net/elsewhere/1/x-report.pdf",
+        })
+    r = client.get(route.format(id=concept.id))
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Proposal file not found in storage"
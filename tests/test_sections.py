@@ -0,0 +1,95 @@
+import pytest
+
+import config
+import sections
+from sections import SectionGraph
+
+
+def _reachable(dependencies, start):
+    seen, todo = set(), [start]
+    while todo:
+        for nxt in dependencies.get(todo.pop(), ()):
+            if nxt not in seen:
+                seen.add(nxt)
+                todo.append(nxt)
+    return seen - {start}
+
+
+def _check_plan(dependencies, plan):
+    stage_of = {name: i for i, stage in enumerate(plan.stages) for name in stage}
+    assert list(stage_of) == list(plan.sections)
+    in_cycle = {name: cycle for cycle in plan.cycles for name in cycle}
+    for source in plan.sections:
+        for target in dependencies.get(source, ()):
+            if target not in stage_of:
+                continue
+            if in_cycle.get(source) is not None and target in in_cycle[source]:
+                assert stage_of[target] == stage_of[source]
+            else:
+                assert stage_of[target] > stage_of[source], (source, target)
+
+
+def test_downstream_matches_reachability():
+    for name in sections.graph.sections:
+        assert sections.graph.downstream(name) == _reachable(config.SECTION_DEPENDENCIES, name)
+
+
+@pytest.mark.parametrize("edited", [
+    ["problem_statement"],
+    ["concept_overview"],
+    ["technical_details"],
+    ["performance_targets", "title"],
+])
+def test_config_plans_are_valid(edited):
+    plan = sections.graph.plan(edited)
+    expected = set().union(*(_reachable(config.SECTION_DEPENDENCIES, e) for e in edited)) - set(edited)
+    assert set(plan.sections) == expected
+    assert plan.edited == tuple(sorted(edited, key=sections.graph.sections.index))
+    _check_plan(config.SECTION_DEPENDENCIES, plan)
+
+
+def test_cycles_are_one_stage():
+    deps = {"a": ["b"], "b": ["c"], "c": ["b", "d"], "d": []}
+    graph = SectionGraph(deps)
+    assert graph.cycles() == [("b", "c")]
+    plan = graph.plan(["a"])
+    assert plan.stages == (("b", "c"), ("d",))
+    assert plan.cycles == (("b", "c"),)
+
+
+def test_edited_section_breaks_its_cycle():
+    deps = {"a": ["b"], "b": ["c"], "c": ["a", "d"], "d": []}
+    plan = SectionGraph(deps).plan(["a"])
+    assert plan.stages == (("b",), ("c",), ("d",))
+    assert plan.cycles == ()
+    _check_plan(deps, plan)
+
+
+def test_parallel_stage_and_critical_path():
+    deps = {"root": ["x", "y"], "x": ["z"], "y": ["z"], "z": []}
+    plan = SectionGraph(deps).plan(["root"])
+    assert plan.stages == (("x", "y"), ("z",))
+    assert plan.sections == ("x", "y", "z")
+
+
+def test_leaf_edit_plans_nothing():
+    plan = SectionGraph({"a": ["b"]}).plan(["b"])
+    assert plan.sections == () and plan.stages == ()
+
+
+def test_plans_are_memoized():
+    graph = SectionGraph({"a": ["b"], "b": []})
+    assert graph.plan(["a"]) is graph.plan(("a", "a"))
+
+
+def test_unknown_section():
+    with pytest.raises(ValueError, match="Unknown section 'nope'"):
+        sections.graph.plan(["nope"])
+
+
+def test_regeneration_plan_endpoint(client):
+    r = client.get("/sections/regeneration-plan", params=[("edited", "technical_details")])
+    assert r.status_code == 200
+    body = r.json()
+    assert body["sections"] == list(sections.graph.plan(["technical_details"]).sections)
+    assert client.get("/sections/regeneration-plan", params={"edited": "nope"}).status_code == 400
@@ -0,0 +1,225 @@
+# timing.py
+"""Per-request hot-path timing: spans, Server-Timing and a sampling profiler.
+
+Code on the hot path wraps its slow calls in `span("embed")`,
+`span("blob")`, ... and DB time is added from the engine's cursor events
+(see metrics.instrument_engine).  The middleware sums the spans of each
+request into a `Server-Timing` header, e.g.
+
+    Server-Timing: embed;dur=212.4;desc="1 call", db;dur=8.9;desc="3 calls",
+                   view;dur=223.0, serialize;dur=4.2, total;dur=229.1
+
+where `view` is the endpoint function itself and `serialize` is the rest
+of FastAPI's handler (request validation plus response-model
+serialization).  Requests slower than TIMING_LOG_MIN_MS also get a
+one-line JSON log record with the same numbers.
+
+The sampling profiler is opt-in: PROFILER="always" profiles every
+request, PROFILER="header" only those sent with `X-Profile: 1`.  A
+background thread samples the stacks of the threads serving the request
+every PROFILE_INTERVAL_MS; requests slower than PROFILE_MIN_MS have their
+samples written to PROFILE_DIR in folded-stack format, which
+flamegraph.pl, speedscope and inferno read directly.  On the event-loop
+thread, samples can include other in-flight requests.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+from settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("uvicorn.error")
+
+PROFILE_HEADER = "x-profile"
+
+
+class Timings:
+    """Span totals for one request; shared by every thread working on it."""
+
+    def __init__(self):
+        self.spans: dict[str, list[float]] = {}     # name -> [seconds, calls]
+        self.threads: set[int] = {threading.get_ident()}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header(self, total: float) -> str:
+        parts = []
+        for name, (seconds, calls) in self.spans.items():
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if name not in ("view", "serialize"):
+                part += f';desc="{calls} call{"s" if calls != 1 else ""}"'
+            parts.append(part)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("request_timings", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add `seconds` to span `name` of the current request, if any."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as part of span `name`."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    timings.threads.add(threading.get_ident())
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+# ─── Route class: view vs. serialization time ─────────────────────────────────
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with span("view"):
+                return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            with span("view"):
+                return endpoint(*args, **kwargs)
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that splits handler time into `view` and `serialize` spans."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request):
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timings = _current.get()
+                if timings is not None:
+                    view = timings.spans.get("view", [0.0])[0]
+                    timings.add("serialize", max(time.perf_counter() - start - view, 0.0))
+
+        return timed_handler
+
+
+# ─── Sampling profiler ────────────────────────────────────────────────────────
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class Sampler:
+    """Samples the stacks of `timings.threads` until stopped."""
+
+    def __init__(self, timings: Timings, interval: float):
+        self.timings = timings
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for tid in list(self.timings.threads):
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, request: Request) -> Optional[str]:
+        if not self.samples:
+            return None
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = request.url.path.strip("/").replace("/", "_") or "root"
+        path = os.path.join(settings.PROFILE_DIR, f"{stamp}-{request.method}-{slug}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def _wants_profile(request: Request) -> bool:
+    if settings.PROFILER == "always":
+        return True
+    return settings.PROFILER == "header" and request.headers.get(PROFILE_HEADER) == "1"
+
+
+# ─── Middleware ───────────────────────────────────────────────────────────────
+async def middleware(request: Request, call_next):
+    """HTTP middleware: collect spans, emit Server-Timing, log and profile slow requests."""
+    timings = Timings()
+    token = _current.set(timings)
+    sampler = Sampler(timings, settings.PROFILE_INTERVAL_MS / 1000).start() if _wants_profile(request) else None
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        total = time.perf_counter() - start
+        _current.reset(token)
+        if sampler is not None:
+            sampler.stop()
+    # the header is sent before a streamed body, so it covers time-to-first-byte
+    response.headers["Server-Timing"] = timings.header(total)
+
+    total_ms = total * 1000
+    if total_ms >= settings.TIMING_LOG_MIN_MS:
+        logger.info(json.dumps({
+            "event": "request_timing",
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            **{f"{name}_ms": round(s * 1000, 1) for name, (s, _) in timings.spans.items()},
+        }))
+    if sampler is not None and total_ms >= settings.PROFILE_MIN_MS:
+        path = sampler.write(request)
+        if path:
+            logger.info(f"Profile for {request.method} {request.url.path} written to {path}")
+    return response